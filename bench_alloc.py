@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: alokacje i koszt jednego kroku w pętli kroków (stan ustalony RUN).
+
+Silnik na symulatorze z zegarem wirtualnym (bez zapisu zboczy), więc pętla
+kręci się tak szybko, jak pozwala CPU – czas ściany / liczba kroków X to
+narzut Pythona na krok. Po rozgrzewce:
+
+- sys.getallocatedblocks() przed i po oknie pomiaru – przyrost bloków,
+- tracemalloc: różnica migawek ograniczona do plików winder_*.py
+  (obiekty, które pętla tworzy i trzyma) oraz current/peak.
+
+    python3 bench_alloc.py --seconds 2 --out bench_alloc.json
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from bench_steploop import write_results
+from winder_engine_rpi import WinderEngineRPi, make_backend
+
+
+def _steps(eng, xrev):
+    return eng._turns_x * xrev + eng._x_steps_mod
+
+
+def start_engine(xrev, pitch, rpm, accel, wave):
+    be = make_backend("sim", virtual=True, record=False, x_steps_per_rev=xrev)
+    eng = WinderEngineRPi(backend=be, wave=wave)
+    eng.set_xrev(xrev)
+    eng.set_pitch(pitch)
+    eng.set_rpm(rpm)
+    eng.set_accel(accel)
+    eng.start_thread()
+    eng.start_job(10_000_000)
+    return eng
+
+
+def run_alloc(seconds, warmup, xrev, pitch, rpm, accel, wave):
+    eng = start_engine(xrev, pitch, rpm, accel, wave)
+    try:
+        time.sleep(warmup)
+
+        # 1) koszt kroku + przyrost bloków (bez tracemalloc – nie spowalnia pętli)
+        b0 = sys.getallocatedblocks()
+        s0 = _steps(eng, xrev)
+        t0 = time.perf_counter()
+        time.sleep(seconds)
+        t1 = time.perf_counter()
+        s1 = _steps(eng, xrev)
+        b1 = sys.getallocatedblocks()
+        steps = s1 - s0
+
+        # 2) tracemalloc: co zostaje zaalokowane w kodzie nawijarki
+        tracemalloc.start()
+        time.sleep(warmup)
+        snap0 = tracemalloc.take_snapshot()
+        cur0, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        ts0 = _steps(eng, xrev)
+        time.sleep(seconds)
+        ts1 = _steps(eng, xrev)
+        snap1 = tracemalloc.take_snapshot()
+        cur1, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        eng.shutdown()
+
+    filt = [tracemalloc.Filter(True, "*winder_*.py")]
+    diff = snap1.filter_traces(filt).compare_to(snap0.filter_traces(filt), "lineno")
+    grown = [d for d in diff if d.size_diff > 0 or d.count_diff > 0]
+    return {
+        "rpm": rpm,
+        "accel_rpm_s": accel,
+        "wave": wave,
+        "steps": steps,
+        "ns_per_step": round((t1 - t0) * 1e9 / steps, 1) if steps else None,
+        "allocated_blocks_delta": b1 - b0,
+        "blocks_per_1k_steps": round((b1 - b0) * 1000 / steps, 3) if steps else None,
+        "tracemalloc": {
+            "steps": ts1 - ts0,
+            "current_delta_bytes": cur1 - cur0,
+            "peak_over_start_bytes": peak - cur0,
+            "winder_size_diff_bytes": sum(d.size_diff for d in grown),
+            "winder_count_diff": sum(d.count_diff for d in grown),
+            "top": [str(d) for d in grown[:5]],
+        },
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Alokacje i ns/krok pętli kroków")
+    ap.add_argument("--seconds", type=float, default=2.0)
+    ap.add_argument("--warmup", type=float, default=0.5)
+    ap.add_argument("--xrev", type=int, default=6400)
+    ap.add_argument("--pitch", type=float, default=0.2)
+    ap.add_argument("--rpm", type=int, default=300)
+    ap.add_argument("--accel", type=float, default=0.0, help="z rampą (RPM/s) – wejście na prędkość w rozgrzewce")
+    ap.add_argument("--wave", action="store_true")
+    ap.add_argument("--out", default="bench_alloc.json")
+    args = ap.parse_args(argv)
+
+    r = run_alloc(args.seconds, args.warmup, args.xrev, args.pitch, args.rpm, args.accel, args.wave)
+    tm = r["tracemalloc"]
+    print(f"kroki={r['steps']}  {r['ns_per_step']} ns/krok  "
+          f"przyrost bloków={r['allocated_blocks_delta']} ({r['blocks_per_1k_steps']}/1k kroków)")
+    print(f"tracemalloc: winder_*.py +{tm['winder_size_diff_bytes']} B / +{tm['winder_count_diff']} obiektów, "
+          f"current Δ={tm['current_delta_bytes']} B, peak={tm['peak_over_start_bytes']} B")
+    for line in tm["top"]:
+        print("  ", line)
+    write_results(args.out, "step_alloc", [r], params=vars(args))
+    print(f"Zapisano: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark projektu cewki (winder_design): przegląd średnic (szereg IEC) ×
+upakowań × zwojów dla rosnącej liczby kandydatów – numpy vs pętla w Pythonie,
+ranking design_best() (jak /api/design): pierwsze liczenie vs trafienie w cache,
+samo best() na gotowym przeglądzie.
+
+    python3 bench_design.py --turns 10,100,1000 --out bench_design.json
+"""
+import argparse
+import time
+
+from bench_serial import _stats_us
+from bench_steploop import write_results
+import winder_design as wd
+
+
+def _timed(fn, repeat):
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def run_point(n_turns, packings, args):
+    turns = tuple(range(50, 50 + 10 * n_turns, 10))
+    key = (args.h, args.w, args.l, wd.WIRE_MM, packings, turns, float(args.rpm))
+    r = {"candidates": len(wd.WIRE_MM) * len(packings) * len(turns)}
+    if wd.np is not None:
+        r["numpy"] = _stats_us(_timed(lambda: wd._sweep_numpy(*key), args.repeat))
+    r["python"] = _stats_us(_timed(lambda: wd._sweep_python(*key), args.repeat))
+    r["cold"] = _stats_us(_timed(lambda: (wd._ranked.cache_clear(), wd.design_best(*key, args.ohm)),
+                                 args.repeat))
+    r["cached"] = _stats_us(_timed(lambda: wd.design_best(*key, args.ohm), args.repeat))
+    result = wd.design(*key)
+    r["best"] = _stats_us(_timed(lambda: wd.best(result, target_ohm=args.ohm), args.repeat))
+    return r
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Projekt cewki: czas przeglądu kandydatów")
+    ap.add_argument("--turns", default="10,100,1000", help="liczby wartości zwojów w przeglądzie")
+    ap.add_argument("--packing", default="0.8,0.9,1.0")
+    ap.add_argument("--h", type=float, default=10.0, help="wysokość okna karkasu [mm]")
+    ap.add_argument("--w", type=float, default=20.0, help="szerokość nawijania [mm]")
+    ap.add_argument("--l", type=float, default=60.0, help="obwód karkasu [mm]")
+    ap.add_argument("--rpm", type=int, default=300)
+    ap.add_argument("--ohm", type=float, default=2.0)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--out", default="bench_design.json")
+    args = ap.parse_args(argv)
+
+    packings = tuple(float(k) for k in args.packing.split(","))
+    results = []
+    for n in (int(x) for x in args.turns.split(",")):
+        r = run_point(n, packings, args)
+        results.append(r)
+        np_txt = f"numpy p50={r['numpy']['p50_us']}µs  " if "numpy" in r else "numpy: brak  "
+        print(f"{r['candidates']:>7,} kandydatów  {np_txt}python p50={r['python']['p50_us']}µs  "
+              f"design_best() pierwszy={r['cold']['p50_us']}µs cache={r['cached']['p50_us']}µs  "
+              f"best() p50={r['best']['p50_us']}µs")
+    write_results(args.out, "coil_design", results, params=vars(args), numpy=wd.np is not None)
+    print(f"Zapisano: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
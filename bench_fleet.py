@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark bramy floty (winder_fleet.Fleet) na lokalnie uruchomionych węzłach:
+N procesów winder_server_rpi.py z symulowanym GPIO (WINDER_BACKEND=sim,
+kolejne porty od --base-port), bez sprzętu.
+
+Mierzy dla każdego N:
+- czas jednego odpytania całej floty (równoległe GET /api/status),
+- zlecenia/s: --jobs-per-node krótkich zleceń na węzeł (total, rpm) w kolejce,
+  od wstawienia do zakończenia ostatniego – skalowanie z liczbą węzłów,
+- połączenia TCP vs zapytania (pula keep-alive; węzły pod waitress, gdy jest –
+  serwer deweloperski Flask zamyka połączenie po każdej odpowiedzi).
+
+    python3 bench_fleet.py --nodes 1,2,4,8 --out bench_fleet.json
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_serial import _stats_us
+from bench_steploop import write_results
+from winder_fleet import Fleet
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def spawn_nodes(n, base_port):
+    env = dict(os.environ, WINDER_BACKEND="sim")
+    env.setdefault("WINDER_HISTORY_DIR", tempfile.mkdtemp(prefix="winder-history-"))
+    env.pop("WINDER_ENGINE_PROCESS", None)
+    procs = []
+    for i in range(n):
+        env["PORT"] = str(base_port + i)
+        procs.append(subprocess.Popen([sys.executable, os.path.join(HERE, "winder_server_rpi.py")], env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    end = time.monotonic() + 15.0
+    for i in range(n):
+        while True:
+            try:
+                c = http.client.HTTPConnection("127.0.0.1", base_port + i, timeout=1.0)
+                c.request("GET", "/api/status")
+                c.getresponse().read()
+                c.close()
+                break
+            except OSError:
+                if time.monotonic() > end:
+                    raise RuntimeError(f"węzeł na porcie {base_port + i} nie wstał")
+                time.sleep(0.1)
+    return procs
+
+
+def run_round(n, args):
+    procs = spawn_nodes(n, args.base_port)
+    fleet = Fleet([(f"n{i}", f"http://127.0.0.1:{args.base_port + i}") for i in range(n)])
+    try:
+        fleet.fields()
+        # 1. odpytanie floty
+        fan = []
+        for _ in range(args.rounds):
+            t0 = time.monotonic()
+            fleet.fields()
+            fan.append(time.monotonic() - t0)
+            time.sleep(0.02)
+
+        # 2. zlecenia
+        jobs = n * args.jobs_per_node
+        t0 = time.monotonic()
+        for _ in range(jobs):
+            fleet.submit(args.total, params={"rpm": args.rpm})
+        end = t0 + args.timeout
+        while time.monotonic() < end:
+            with fleet._lock:
+                left = sum(1 for j in fleet.jobs.values() if j.state in ("queued", "running"))
+            if not left:
+                break
+            time.sleep(0.05)
+        wall = time.monotonic() - t0
+        with fleet._lock:
+            done = sum(1 for j in fleet.jobs.values() if j.state == "done")
+            failed = sum(1 for j in fleet.jobs.values() if j.state == "failed")
+        requests = sum(node.requests for node in fleet.nodes.values())
+        connects = sum(node.connects for node in fleet.nodes.values())
+        unchanged = sum(node.unchanged for node in fleet.nodes.values())
+    finally:
+        fleet.close()
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+    return {
+        "nodes": n,
+        "fanout": _stats_us(fan),
+        "jobs": jobs,
+        "jobs_done": done,
+        "jobs_failed": failed,
+        "jobs_per_sec": round(done / wall, 2) if wall > 0 else None,
+        "wall_s": round(wall, 2),
+        "requests": requests,
+        "tcp_connects": connects,
+        "status_unchanged": unchanged,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Brama floty na lokalnych węzłach z symulowanym GPIO")
+    ap.add_argument("--nodes", default="1,2,4,8", help="liczby węzłów, np. 1,4,8")
+    ap.add_argument("--jobs-per-node", type=int, default=4)
+    ap.add_argument("--total", type=int, default=1, help="zwojów na zlecenie")
+    ap.add_argument("--rpm", type=int, default=60)
+    ap.add_argument("--rounds", type=int, default=50, help="pomiarów odpytania floty")
+    ap.add_argument("--timeout", type=float, default=120.0, help="limit czasu na zlecenia [s]")
+    ap.add_argument("--base-port", type=int, default=5600)
+    ap.add_argument("--out", default="bench_fleet.json")
+    args = ap.parse_args(argv)
+
+    results = []
+    for n in (int(x) for x in args.nodes.split(",")):
+        r = run_round(n, args)
+        results.append(r)
+        f = r["fanout"]
+        print(f"{n:3d} węzłów  odpytanie floty p50={f.get('p50_us')}µs p99={f.get('p99_us')}µs  "
+              f"zlecenia {r['jobs_done']}/{r['jobs']} w {r['wall_s']} s = {r['jobs_per_sec']}/s  "
+              f"TCP {r['tcp_connects']} na {r['requests']} zapytań (stan bez zmian: {r['status_unchanged']})")
+    write_results(args.out, "fleet_gateway", results, params=vars(args))
+    print(f"Zapisano: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: jeden proces winder_server.py z wieloma nawijarkami – N wirtualnych
+maszyn (bench_serial.LoopbackFirmware na pty), każda z własnym portem,
+transportem i kanałem komend.
+
+Każdy "firmware" wysyła linie stanu z rosnącym X_turns co 1/--rate s; wątek per
+maszyna czeka na StatusHub.wait() i mierzy czas: zapis linii do pty → nowy stan
+widoczny w hubie (to samo, co dostaje /api/status, /api/events i /api/machines).
+Równolegle klient odpytuje zbiorcze /api/machines (czas odpowiedzi).
+
+    python3 bench_machines.py --machines 1,4,8,16 --seconds 3 --out bench_machines.json
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("WINDER_HISTORY_DIR", tempfile.mkdtemp(prefix="winder-history-"))
+
+from bench_serial import STATUS, LoopbackFirmware, _stats_us
+from bench_steploop import percentile, write_results
+import winder_server as ws
+
+
+def _wait_until(pred, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not pred() and time.monotonic() < end:
+        time.sleep(0.01)
+    return pred()
+
+
+def run_round(n, rate, seconds):
+    client = ws.app.test_client()
+    fws = [LoopbackFirmware() for _ in range(n)]
+    ids = [f"v{n}-{i}" for i in range(n)]
+    for mid, fw in zip(ids, fws):
+        client.post("/api/machines", json={"id": mid, "port": fw.path})
+        os.write(fw.master, b"UNO+CNC DDA bench\r\n")
+    ms = [ws.machines[mid] for mid in ids]
+    if not _wait_until(lambda: all(m.connected for m in ms)):
+        raise RuntimeError("nie wszystkie maszyny się połączyły")
+
+    count = int(rate * seconds)
+    sent = [[0.0] * count for _ in range(n)]
+    lat = [[] for _ in range(n)]
+    stop = threading.Event()
+
+    def feed(k):
+        fw, times, interval = fws[k], sent[k], 1.0 / rate
+        t_next = time.monotonic()
+        for i in range(count):
+            times[i] = time.monotonic()
+            os.write(fw.master, STATUS.format(n=i + 1).encode())
+            t_next += interval
+            time.sleep(max(0.0, t_next - time.monotonic()))
+
+    def watch(k):
+        hub, times, out = ms[k].hub, sent[k], lat[k]
+        seen, last = hub.status_version, 0
+        while not stop.is_set():
+            seen, st = hub.wait(seen, 0.2)
+            t = time.monotonic()
+            turns = st.get("current_turns") or 0
+            if turns > last:
+                out.append(t - times[turns - 1])
+                last = turns
+
+    poll = []
+
+    def poll_aggregate():
+        while not stop.is_set():
+            t0 = time.monotonic()
+            client.get("/api/machines")
+            poll.append(time.monotonic() - t0)
+            time.sleep(0.05)
+
+    watchers = [threading.Thread(target=watch, args=(k,), daemon=True) for k in range(n)]
+    watchers.append(threading.Thread(target=poll_aggregate, daemon=True))
+    feeders = [threading.Thread(target=feed, args=(k,), daemon=True) for k in range(n)]
+    for t in watchers:
+        t.start()
+    cpu0, t0 = time.process_time(), time.monotonic()
+    for t in feeders:
+        t.start()
+    for t in feeders:
+        t.join()
+    _wait_until(lambda: all(m.current_turns >= count for m in ms), timeout=2.0)
+    wall, cpu = time.monotonic() - t0, time.process_time() - cpu0
+    stop.set()
+    for t in watchers:
+        t.join()
+
+    for mid in ids:
+        ws.remove_machine(mid)
+    for fw in fws:
+        fw.close()
+
+    all_lat = [v for l in lat for v in l]
+    worst = sorted(percentile(sorted(l), 0.99) for l in lat if l)
+    return {
+        "machines": n,
+        "rate_hz": rate,
+        "lines_sent": n * count,
+        "states_seen": len(all_lat),
+        "lines_per_sec": round(n * count / wall),
+        "telemetry_latency": _stats_us(all_lat),
+        "worst_machine_p99_us": round(worst[-1] * 1e6, 1) if worst else None,
+        "aggregate_status": _stats_us(poll),
+        "cpu_percent": round(100.0 * cpu / wall, 1) if wall > 0 else None,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Wiele nawijarek w jednym serwerze: opóźnienie telemetrii")
+    ap.add_argument("--machines", default="1,4,8,16", help="liczby wirtualnych maszyn, np. 1,8")
+    ap.add_argument("--rate", type=float, default=50.0, help="linii stanu/s na maszynę")
+    ap.add_argument("--seconds", type=float, default=3.0, help="czas pomiaru na rundę [s]")
+    ap.add_argument("--out", default="bench_machines.json")
+    args = ap.parse_args(argv)
+
+    results = []
+    for n in (int(x) for x in args.machines.split(",")):
+        r = run_round(n, args.rate, args.seconds)
+        results.append(r)
+        lat, agg = r["telemetry_latency"], r["aggregate_status"]
+        print(f"{n:3d} maszyn  {r['lines_per_sec']:>6,} linii/s  linia→stan p50={lat.get('p50_us')}µs "
+              f"p99={lat.get('p99_us')}µs max={lat.get('max_us')}µs  najgorsza p99={r['worst_machine_p99_us']}µs  "
+              f"/api/machines p50={agg.get('p50_us')}µs  CPU={r['cpu_percent']}%")
+    write_results(args.out, "multi_machine", results, params=vars(args))
+    print(f"Zapisano: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: jitter pętli kroków bez i z równoległym ruchem /api/rpm.
+
+Dla każdego RPM dwa pomiary (bench_steploop.run_point): spokojny oraz
+z wątkami, które w kółko wysyłają POST /api/rpm (klient testowy Flask na
+winder_server_rpi). Bez Flaska wątki wołają eng.set_rpm() – to ta sama
+ścieżka, którą wykonuje endpoint.
+
+    python3 bench_params.py --rpm 60,120 --seconds 2 --threads 4 --rate 500 --out bench_params.json
+"""
+import argparse
+import threading
+import time
+
+import winder_engine_rpi
+from bench_steploop import run_point, write_results
+
+
+def make_rpm_load(rpm, threads, rate):
+    """Funkcja load(eng, stop_evt) dla run_point: `threads` wątków, łącznie ~rate żądań RPM/s."""
+    try:
+        import winder_server_rpi
+        client_factory = winder_server_rpi.app.test_client
+    except ImportError:
+        client_factory = None
+
+    counter = {"requests": 0, "mode": "flask" if client_factory else "direct"}
+    count_lock = threading.Lock()
+
+    def worker(eng, stop_evt):
+        client = client_factory() if client_factory else None
+        period = threads / rate if rate > 0 else 0.0
+        n = 0
+        while not stop_evt.is_set():
+            if client is not None:
+                client.post("/api/rpm", json={"rpm": rpm})
+            else:
+                eng.set_rpm(rpm)
+            n += 1
+            if period:
+                time.sleep(period)
+        with count_lock:
+            counter["requests"] += n
+
+    def load(eng, stop_evt):
+        winder_engine_rpi._engine = eng  # endpointy serwera trafiają w silnik z benchmarku
+        ts = [threading.Thread(target=worker, args=(eng, stop_evt), daemon=True) for _ in range(threads)]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+
+    return load, counter
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Jitter pętli kroków vs ruch /api/rpm")
+    ap.add_argument("--rpm", default="60,120,200")
+    ap.add_argument("--seconds", type=float, default=2.0)
+    ap.add_argument("--threads", type=int, default=4, help="liczba wątków wysyłających /api/rpm")
+    ap.add_argument("--rate", type=float, default=500.0, help="łączna liczba żądań/s (0 = bez limitu)")
+    ap.add_argument("--wave", action="store_true")
+    ap.add_argument("--out", default="bench_params.json")
+    args = ap.parse_args(argv)
+
+    results = []
+    for rpm in [int(v) for v in args.rpm.split(",") if v.strip()]:
+        quiet = run_point(rpm, args.seconds, wave=args.wave)
+        load, counter = make_rpm_load(rpm, args.threads, args.rate)
+        busy = run_point(rpm, args.seconds, wave=args.wave, load=load)
+        busy["rpm_requests"] = counter["requests"]
+        busy["rpm_requests_per_sec"] = round(counter["requests"] / busy["wall_sec"], 1)
+        busy["load_mode"] = counter["mode"]
+        for name, r in (("spokojnie", quiet), ("z /api/rpm", busy)):
+            d = r["deviation"]
+            print(f"rpm={rpm:5d} {name:11s} osiągnięte={r['achieved_x_sps'] or 0:9.1f}/s  "
+                  f"p50={d.get('p50_us')}µs  p99={d.get('p99_us')}µs  spóźnione={d['missed_deadlines']}")
+        print(f"            żądań /api/rpm: {busy['rpm_requests_per_sec']}/s ({busy['load_mode']})")
+        results.append({"rpm": rpm, "quiet": quiet, "rpm_traffic": busy})
+    write_results(args.out, "params_contention", results, params=vars(args))
+    print(f"Zapisano: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
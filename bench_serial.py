@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Benchmark: transport portu szeregowego (winder_serial.SerialTransport) vs
+dotychczasowy wątek z readline() + write() na każdą komendę – na pętli pty
+(po drugiej stronie prosty "firmware" w wątku, bez Arduino).
+
+Mierzy:
+- przepustowość linii stanu (linie/s) – firmware pisze N linii najszybciej, jak może,
+- opóźnienie linii (firmware → on_line) przy linii co --interval s [µs],
+- czas odpowiedzi na komendę "goal N" → "[goal] set N" (jak w 5.ino) [µs],
+- liczbę write() na pary "goal N" + "moton" (sklejanie komend),
+- potwierdzane komendy/s przez winder_commands.CommandChannel: po jednej
+  (request = wyślij i czekaj) vs pipelining (do MAX_INFLIGHT w locie).
+
+    python3 bench_serial.py --lines 50000 --out bench_serial.json
+"""
+import argparse
+import os
+import pty
+import select
+import threading
+import time
+
+import serial
+
+from bench_steploop import percentile, write_results
+from winder_commands import CommandChannel
+from winder_serial import SerialTransport
+
+STATUS = ("[state=RUN, rpm=200, X_turns={n}, X_turns_real={n}.000, x_steps=1234, "
+          "D11=0, ENDSTOP_Y=0, Y=1.250]\r\n")
+
+
+class LoopbackFirmware:
+    """Strona "Arduino" pętli pty: odpowiada na komendy i wysyła linie na żądanie."""
+
+    def __init__(self):
+        self.master, slave = pty.openpty()
+        self.path = os.ttyname(slave)
+        self._slave = slave
+        self.writes_seen = 0
+        self._stop = False
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        buf = b""
+        while not self._stop:
+            if not select.select([self.master], [], [], 0.05)[0]:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            self.writes_seen += 1
+            buf += data
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                cmd = line.decode().strip()
+                if cmd.startswith("goal "):
+                    os.write(self.master, f"[goal] set {cmd[5:]}\r\n".encode())
+                elif cmd.startswith("rpm "):
+                    os.write(self.master, f"RPM={cmd[4:]}\r\n".encode())
+                elif cmd in ("moton", "motoff"):
+                    os.write(self.master, f"MOTORS={cmd[3:].upper()}\r\n".encode())
+                elif cmd == "status":
+                    os.write(self.master, STATUS.format(n=0).encode())
+                elif cmd == "yzero":
+                    os.write(self.master, b"Y zeroed at left margin.\r\n")
+                elif cmd and not cmd.startswith(("pitch ", "bwidth ")):
+                    os.write(self.master, f"ERR: unknown cmd: {cmd}\r\n".encode())
+
+    def burst(self, n):
+        chunk = "".join(STATUS.format(n=i) for i in range(256)).encode()
+        for _ in range(n // 256):
+            os.write(self.master, chunk)
+        for i in range(n % 256):
+            os.write(self.master, STATUS.format(n=i).encode())
+
+    def paced(self, n, interval, sent):
+        for i in range(n):
+            sent[i] = time.monotonic()
+            os.write(self.master, f"[bench] seq={i}\r\n".encode())
+            time.sleep(interval)
+
+    def close(self):
+        """Zamknij obie strony – jak wyjęty kabel (czytający port dostaje błąd)."""
+        self._stop = True
+        self._thread.join()
+        for fd in (self.master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class LegacyReader:
+    """Dotychczasowy schemat: wątek z readline() (timeout=1) i write() per komenda."""
+
+    def __init__(self, port, on_line):
+        self.port = port
+        self.on_line = on_line
+        self._stop = False
+        self.writes = 0
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while not self._stop:
+            try:
+                line = self.port.readline().decode("utf-8", errors="ignore").rstrip("\r\n")
+            except (serial.SerialException, OSError, TypeError):
+                return
+            if line:
+                self.on_line(line, time.monotonic())
+
+    def send_many(self, cmds):
+        for cmd in cmds:
+            self.port.write((cmd + "\n").encode("utf-8"))
+            self.writes += 1
+
+    def close(self):
+        self._stop = True
+        self.port.cancel_read()
+
+
+def _stats_us(vals):
+    s = sorted(v * 1e6 for v in vals)
+    if not s:
+        return {}
+    return {"n": len(s), "p50_us": round(percentile(s, 0.50), 1), "p99_us": round(percentile(s, 0.99), 1),
+            "max_us": round(s[-1], 1), "mean_us": round(sum(s) / len(s), 1)}
+
+
+def run_mode(mode, lines, paced, interval, commands):
+    fw = LoopbackFirmware()
+    port = serial.Serial(fw.path, 115200, timeout=1)
+    got = []
+    cond = threading.Condition()
+
+    def on_line(line, t):
+        with cond:
+            got.append((line, time.monotonic()))
+            cond.notify()
+
+    def wait_for(n, timeout=60.0):
+        end = time.monotonic() + timeout
+        with cond:
+            while len(got) < n and time.monotonic() < end:
+                cond.wait(0.1)
+
+    link = SerialTransport(port, on_line).start() if mode == "transport" else LegacyReader(port, on_line)
+    try:
+        # 1. przepustowość
+        t0 = time.monotonic()
+        threading.Thread(target=fw.burst, args=(lines,), daemon=True).start()
+        wait_for(lines)
+        rate = len(got) / (got[-1][1] - t0) if got else 0.0
+
+        # 2. opóźnienie linii
+        got.clear()
+        sent = [0.0] * paced
+        fw.paced(paced, interval, sent)
+        wait_for(paced)
+        lat = [t - sent[int(l.rsplit("=", 1)[1])] for l, t in got if l.startswith("[bench] seq=")]
+
+        # 3. odpowiedź na komendę + sklejanie "goal N" + "moton"
+        got.clear()
+        writes_before = fw.writes_seen
+        rtt = []
+        for i in range(commands):
+            n0 = len(got)
+            t_cmd = time.monotonic()
+            link.send_many((f"goal {i}", "moton"))
+            wait_for(n0 + 2, timeout=2.0)
+            acks = [t for l, t in got[n0:] if l == f"[goal] set {i}"]
+            if acks:
+                rtt.append(acks[0] - t_cmd)
+        writes = fw.writes_seen - writes_before
+    finally:
+        link.close()
+        port.close()
+        fw.close()
+    return {
+        "mode": mode,
+        "lines_per_sec": round(rate),
+        "line_latency": _stats_us(lat),
+        "goal_ack_rtt": _stats_us(rtt),
+        "writes_per_goal_moton": round(writes / commands, 2) if commands else None,
+    }
+
+
+def run_channel(commands):
+    """Potwierdzane komendy/s: request() po jednej vs submit_many() z oknem w locie."""
+    fw = LoopbackFirmware()
+    port = serial.Serial(fw.path, 115200, timeout=1)
+    tr = SerialTransport(port, lambda line, t: ch.on_line(line, t)).start()
+    ch = CommandChannel(tr)
+    cmds = [f"goal {i}" if i % 2 else f"rpm {100 + i % 200}" for i in range(commands)]
+    try:
+        t0 = time.monotonic()
+        for c in cmds:
+            ch.request(c)
+        serial_rate = commands / (time.monotonic() - t0)
+        t0 = time.monotonic()
+        pend = ch.submit_many(cmds)
+        for p in pend:
+            p.wait(5.0)
+        pipe_rate = commands / (time.monotonic() - t0)
+        stats = ch.stats()
+    finally:
+        tr.close()
+        port.close()
+        fw.close()
+    return {
+        "mode": "channel",
+        "request_cmds_per_sec": round(serial_rate),
+        "pipelined_cmds_per_sec": round(pipe_rate),
+        "max_inflight": ch.max_inflight,
+        "commands": stats["commands"],
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Transport szeregowy na pętli pty: linie/s i opóźnienia")
+    ap.add_argument("--lines", type=int, default=50000, help="linii stanu w teście przepustowości")
+    ap.add_argument("--paced", type=int, default=500, help="linii w teście opóźnienia")
+    ap.add_argument("--interval", type=float, default=0.002, help="odstęp linii w teście opóźnienia [s]")
+    ap.add_argument("--commands", type=int, default=300, help="par goal+moton w teście odpowiedzi")
+    ap.add_argument("--out", default="bench_serial.json")
+    args = ap.parse_args(argv)
+
+    results = []
+    for mode in ("readline", "transport"):
+        r = run_mode(mode, args.lines, args.paced, args.interval, args.commands)
+        results.append(r)
+        lat, rtt = r["line_latency"], r["goal_ack_rtt"]
+        print(f"{mode:9s}  {r['lines_per_sec']:>9,} linii/s  linia p50={lat.get('p50_us')}µs "
+              f"p99={lat.get('p99_us')}µs  goal→ack p50={rtt.get('p50_us')}µs p99={rtt.get('p99_us')}µs  "
+              f"write/para={r['writes_per_goal_moton']}")
+    r = run_channel(args.commands)
+    results.append(r)
+    print(f"channel    potwierdzane komendy/s: po jednej {r['request_cmds_per_sec']:,}  "
+          f"pipelining (okno {r['max_inflight']}) {r['pipelined_cmds_per_sec']:,}")
+    for name, h in r["commands"].items():
+        print(f"  {name:6s} ack p50≤{h['p50_ms']} ms  p99≤{h['p99_ms']} ms  timeouty={h['timeouts']}")
+    write_results(args.out, "serial_transport", results, params=vars(args))
+    print(f"Zapisano: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
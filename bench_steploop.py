@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark generatora kroków WinderEngineRPi._run_loop (na symulowanym GPIO).
+
+Dla każdego RPM z listy uruchamia silnik na SimGpioBackend i mierzy:
+- osiągniętą częstotliwość kroków X (kroki/s) względem zadanej,
+- histogram odchyłek zbocza STEP od harmonogramu next_x_time,
+- przegapione terminy (krok spóźniony o więcej niż jeden interwał),
+- błąd proporcji krokówY/krokiX względem y_step_per_xstep,
+- zużycie CPU procesu.
+
+Wynik (JSON) trafia do pliku --out, żeby porównywać kolejne przebiegi.
+
+    python3 bench_steploop.py --rpm 60,120,200,300 --seconds 2 --out bench_steploop.json
+    python3 bench_steploop.py --virtual     # maks. przepustowość (zegar wirtualny)
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from winder_engine_rpi import WinderEngineRPi, make_backend, X_STEP, Y_STEP
+
+# Granice koszyków histogramu odchyłek [µs]
+HIST_BOUNDS_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def histogram(values_us, bounds=HIST_BOUNDS_US):
+    """Histogram |odchyłek| w koszykach '<b' oraz '>=ostatnia'."""
+    counts = [0] * (len(bounds) + 1)
+    for v in values_us:
+        v = abs(v)
+        for i, b in enumerate(bounds):
+            if v < b:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<{b}" for b in bounds] + [f">={bounds[-1]}"]
+    return dict(zip(labels, counts))
+
+
+def percentile(sorted_vals, q):
+    if not sorted_vals:
+        return None
+    i = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[i]
+
+
+def step_deviation_stats(edge_times, interval):
+    """
+    Spóźnienia kolejnych kroków względem harmonogramu t0 + k·interval
+    (tak liczy next_x_time w pętli). Żaden krok nie wychodzi przed swoim
+    terminem, więc t0 = min(t_k - k·interval). Zwraca statystyki [µs].
+    """
+    if len(edge_times) < 2:
+        return {"steps": len(edge_times), "missed_deadlines": 0, "histogram_us": histogram([])}
+    t0 = min(t - k * interval for k, t in enumerate(edge_times))
+    devs = [(t - (t0 + k * interval)) * 1e6 for k, t in enumerate(edge_times)]
+    interval_us = interval * 1e6
+    s = sorted(abs(d) for d in devs)
+    return {
+        "steps": len(edge_times),
+        "mean_abs_us": round(sum(s) / len(s), 3),
+        "p50_us": round(percentile(s, 0.50), 3),
+        "p99_us": round(percentile(s, 0.99), 3),
+        "max_us": round(s[-1], 3),
+        "missed_deadlines": sum(1 for d in devs if d > interval_us),
+        "histogram_us": histogram(devs),
+    }
+
+
+def make_engine(virtual, xrev, pitch, bwidth, rpm, wave=False):
+    be = make_backend("sim", virtual=virtual, record=True, x_steps_per_rev=xrev)
+    eng = WinderEngineRPi(backend=be, wave=wave)
+    eng.set_xrev(xrev)
+    eng.set_pitch(pitch)
+    eng.set_bwidth(bwidth)
+    eng.set_rpm(rpm)
+    return eng, be
+
+
+def run_point(rpm, seconds=2.0, virtual=False, xrev=6400, pitch=0.2, bwidth=21.85, load=None, wave=False):
+    """
+    Jeden punkt pomiarowy. load – opcjonalna funkcja load(eng, stop_event)
+    uruchamiana w osobnym wątku w trakcie pomiaru (np. ruch HTTP).
+    """
+    import threading
+
+    eng, be = make_engine(virtual, xrev, pitch, bwidth, rpm, wave)
+    eng.start_thread()
+    stop_evt = threading.Event()
+    load_thread = None
+    if load is not None:
+        load_thread = threading.Thread(target=load, args=(eng, stop_evt), daemon=True)
+        load_thread.start()
+
+    be.clear_edges()
+    wall0 = time.perf_counter()
+    cpu0 = time.process_time()
+    eng.run()
+    time.sleep(seconds)
+    eng._job = "PAUSE"
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+    stop_evt.set()
+    if load_thread is not None:
+        load_thread.join(timeout=2.0)
+    eng.shutdown()
+
+    interval = eng.params.x_interval_sec
+    x_edges = be.edges(X_STEP)
+    y_edges = be.edges(Y_STEP)
+    target_sps = 1.0 / interval
+    if len(x_edges) >= 2:
+        span = x_edges[-1] - x_edges[0]
+        achieved_sps = (len(x_edges) - 1) / span if span > 0 else None
+    else:
+        achieved_sps = None
+    wall_sps = len(x_edges) / wall if wall > 0 else None
+    ratio_target = eng.params.y_step_per_xstep
+    ratio = (len(y_edges) / len(x_edges)) if x_edges else None
+    ratio_err = ((ratio - ratio_target) / ratio_target) if (ratio is not None and ratio_target) else None
+
+    res = {
+        "rpm": rpm,
+        "virtual_clock": virtual,
+        "wave_mode": eng.wave_mode,
+        "target_x_sps": round(target_sps, 1),
+        "achieved_x_sps": round(achieved_sps, 1) if achieved_sps else None,
+        "wall_x_sps": round(wall_sps, 1) if wall_sps else None,
+        "x_steps": len(x_edges),
+        "y_steps": len(y_edges),
+        "y_per_x_target": ratio_target,
+        "y_per_x_actual": ratio,
+        "y_per_x_rel_error": ratio_err,
+        "cpu_percent": round(100.0 * cpu / wall, 1) if wall > 0 else None,
+        "wall_sec": round(wall, 3),
+    }
+    res["deviation"] = step_deviation_stats(x_edges, interval)
+    return res
+
+
+def bench_meta():
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def write_results(path, name, results, **extra):
+    doc = {"benchmark": name, "meta": bench_meta(), "results": results}
+    doc.update(extra)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark pętli kroków WinderEngineRPi")
+    ap.add_argument("--rpm", default="30,60,120,200,300,500", help="lista RPM, np. 60,120,300")
+    ap.add_argument("--seconds", type=float, default=2.0, help="czas pomiaru na punkt [s]")
+    ap.add_argument("--xrev", type=int, default=6400)
+    ap.add_argument("--pitch", type=float, default=0.2)
+    ap.add_argument("--bwidth", type=float, default=21.85)
+    ap.add_argument("--virtual", action="store_true", help="zegar wirtualny (maks. przepustowość)")
+    ap.add_argument("--wave", action="store_true", help="tryb prekompilowanych fragmentów (winder_wave)")
+    ap.add_argument("--out", default="bench_steploop.json")
+    args = ap.parse_args(argv)
+
+    results = []
+    for rpm in [int(v) for v in args.rpm.split(",") if v.strip()]:
+        r = run_point(rpm, args.seconds, args.virtual, args.xrev, args.pitch, args.bwidth, wave=args.wave)
+        d = r["deviation"]
+        print(f"rpm={rpm:5d}  cel={r['target_x_sps']:9.1f}/s  osiągnięte={r['achieved_x_sps'] or 0:9.1f}/s  "
+              f"p99={d.get('p99_us')}µs  spóźnione={d['missed_deadlines']}  CPU={r['cpu_percent']}%")
+        results.append(r)
+    write_results(args.out, "steploop", results, params=vars(args))
+    print(f"Zapisano: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
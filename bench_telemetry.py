@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parser telemetrii (winder_telemetry.parse_line) vs dotychczasowe
+7 wywołań re.search na linię (jak w winder4.py / winder_server.py).
+
+Wejście: zapisane logi z firmware (--log plik, jedna linia = jedna linia z portu;
+można podać kilka razy) albo – bez --log – syntetyczny log w formacie 5.ino
+(głównie linie stanu, do tego RPM=, [goal], kalibracja, komunikaty).
+Wynik: linie/s obu metod i liczba linii, na których wyniki się różnią.
+
+    python3 bench_telemetry.py --log sesja.log --repeat 20 --out bench_telemetry.json
+"""
+import argparse
+import random
+import re
+import time
+
+from bench_steploop import write_results
+from winder_telemetry import parse_line
+
+
+def legacy_parse(line):
+    """Dotychczasowy parser (kolejne re.search) – punkt odniesienia."""
+    out = {}
+    m = re.search(r"\[state=(\w+)", line)
+    if m:
+        out["state"] = m.group(1)
+    m = re.search(r"X_turns=(\d+)", line) or re.search(r"\bturns=(\d+)\b", line)
+    if m:
+        out["turns"] = int(m.group(1))
+    m = re.search(r"X_turns_real=([-\d\.]+)", line)
+    if m:
+        try:
+            out["turns_real"] = float(m.group(1))
+        except ValueError:
+            pass
+    m = re.search(r"(?i)\brpm=(\d+)\b", line)
+    if m:
+        out["rpm"] = int(m.group(1))
+    m = re.search(r"\bY=([-\d\.]+)", line)
+    if m:
+        try:
+            out["y"] = float(m.group(1))
+        except ValueError:
+            pass
+    m = re.search(r"\b(?:Y_HOME|ENDSTOP_Y)=(\d)\b", line)
+    if m:
+        out["endstop"] = int(m.group(1))
+    m = re.search(r"eff_w=([\d\.]+)\s*mm", line)
+    if m:
+        out["eff_w"] = float(m.group(1))
+    if "[goal] reached" in line:
+        out["goal_reached"] = True
+    return out
+
+
+def _as_dict(t):
+    return {k: v for k, v in t._asdict().items() if v is not None and k not in ("kind", "x_steps", "pitch")}
+
+
+def synthetic_log(n, seed=1):
+    """Log w formacie firmware 5.ino: linie stanu co ~0.5 s i sporadyczne komunikaty."""
+    rnd = random.Random(seed)
+    lines = []
+    turns, y, rpm = 0, 0.0, 200
+    for i in range(n):
+        r = rnd.random()
+        if r < 0.85:
+            turns += 1
+            y = round((y + 0.2) % 21.85, 3)
+            lines.append(f"[state=RUN, rpm={rpm}, X_turns={turns}, X_turns_real={turns - 0.056:.3f}, "
+                         f"x_steps={rnd.randrange(6400)}, D11=0, ENDSTOP_Y={1 if y < 0.2 else 0}, Y={y:.3f}]")
+        elif r < 0.90:
+            rpm = rnd.choice((120, 200, 300))
+            lines.append(f"RPM={rpm}")
+        elif r < 0.93:
+            lines.append(f"[goal] set {turns + 100}")
+            lines.append("[goal] reached")
+        elif r < 0.95:
+            lines.append("pitch=0.2000 mm | X_steps/rev=6400 | Y_steps/mm=800.000 | "
+                         "Y_steps/turn=160.000 | eff_w=21.850 mm | turns/layer≈109.25")
+        else:
+            lines.append(rnd.choice(("MOTORS=ON", "MOTORS=OFF", ">> RESUME", ">> STOP/PAUSE",
+                                     "Y zeroed at left margin.", "ERR: unknown cmd: foo")))
+    return lines
+
+
+def lines_per_sec(fn, lines, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for line in lines:
+            fn(line)
+    dt = time.perf_counter() - t0
+    return len(lines) * repeat / dt
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Przepustowość parsera telemetrii (linie/s)")
+    ap.add_argument("--log", action="append", help="plik z zapisanym logiem firmware (można kilka razy)")
+    ap.add_argument("--lines", type=int, default=20000, help="długość logu syntetycznego (bez --log)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--out", default="bench_telemetry.json")
+    args = ap.parse_args(argv)
+
+    if args.log:
+        lines = []
+        for path in args.log:
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                lines.extend(l.rstrip("\r\n") for l in f if l.strip())
+        source = args.log
+    else:
+        lines = synthetic_log(args.lines)
+        source = "synthetic"
+
+    mismatches = [l for l in lines if legacy_parse(l) != _as_dict(parse_line(l))]
+    old = lines_per_sec(legacy_parse, lines, args.repeat)
+    new = lines_per_sec(parse_line, lines, args.repeat)
+    result = {
+        "source": source,
+        "lines": len(lines),
+        "regex_lines_per_sec": round(old),
+        "parser_lines_per_sec": round(new),
+        "speedup": round(new / old, 2),
+        "mismatches": len(mismatches),
+        "mismatch_examples": mismatches[:5],
+    }
+    print(f"linii: {len(lines)}  regex: {old:,.0f}/s  parse_line: {new:,.0f}/s  "
+          f"(x{result['speedup']})  różnice: {len(mismatches)}")
+    for l in mismatches[:5]:
+        print("  ≠", l)
+    write_results(args.out, "telemetry_parser", [result], params=vars(args))
+    print(f"Zapisano: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""Testy nie zapisują historii ani kolejki zleceń w katalogu repozytorium."""
+import atexit
+import os
+import shutil
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="winder-test-")
+atexit.register(shutil.rmtree, _TMP, True)
+os.environ.setdefault("WINDER_HISTORY_DIR", os.path.join(_TMP, "history"))
+os.environ.setdefault("WINDER_QUEUE_DIR", os.path.join(_TMP, "queue"))
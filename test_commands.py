@@ -0,0 +1,137 @@
+"""
+Kanał komend (winder_commands): dopasowanie potwierdzeń, okno w locie, ponowienia:
+    python3 -m pytest -q test_commands.py
+"""
+import pytest
+
+from winder_commands import CommandChannel, CommandError, CommandRejected, CommandTimeout
+
+
+class FakeTransport:
+    def __init__(self):
+        self.out = []
+
+    def send(self, cmd):
+        self.out.append(cmd)
+
+    def send_many(self, cmds):
+        self.out.extend(cmds)
+
+
+class FakeTimers:
+    """Zadania odpalane ręcznie (fire) zamiast po czasie."""
+
+    def __init__(self):
+        self.due = []
+
+    def schedule(self, delay, fn, *args, tag=None):
+        self.due.append((fn, args))
+
+    def fire(self):
+        due, self.due = self.due, []
+        for fn, args in due:
+            fn(*args)
+
+
+def _channel(**kw):
+    tr, tm = FakeTransport(), FakeTimers()
+    return CommandChannel(tr, tm, **kw), tr, tm
+
+
+def test_ack_matches_oldest_pending():
+    ch, tr, _ = _channel()
+    a, b = ch.submit_many(["goal 100", "moton"])
+    assert tr.out == ["goal 100", "moton"]
+    ch.on_line("MOTORS=ON", t_rx=b.t_sent + 0.002)
+    assert b.wait(0) == "MOTORS=ON" and not a.done
+    ch.on_line("[goal] set 100")
+    assert a.wait(0) == "[goal] set 100"
+    assert ch.inflight == 0
+    assert ch.stats()["commands"]["moton"]["acked"] == 1
+
+
+def test_untracked_commands_finish_on_send():
+    ch, tr, _ = _channel()
+    p = ch.submit("pitch 0.2")
+    assert p.done and p.wait(0) is None and ch.inflight == 0
+
+
+def test_unknown_command_rejected():
+    ch, _, _ = _channel()
+    p = ch.submit("rpm 300")
+    ch.on_line("ERR: unknown cmd: rpm 300")
+    with pytest.raises(CommandRejected):
+        p.wait(0)
+
+
+def test_inflight_window_holds_backlog():
+    ch, tr, _ = _channel(max_inflight=2)
+    ps = ch.submit_many(["rpm 100", "rpm 200", "rpm 300"])
+    assert tr.out == ["rpm 100", "rpm 200"]
+    ch.on_line("RPM=100")
+    assert tr.out[-1] == "rpm 300" and ps[0].done
+
+
+def test_retry_then_timeout():
+    failed = []
+    ch, tr, tm = _channel(retries=1, on_fail=failed.append)
+    p = ch.submit("rpm 300")
+    tm.fire()                                   # pierwszy timeout → ponowienie
+    assert tr.out == ["rpm 300", "rpm 300"] and not p.done
+    tm.fire()                                   # drugi → CommandTimeout
+    with pytest.raises(CommandTimeout):
+        p.wait(0)
+    assert failed == [p] and ch.inflight == 0
+    assert ch.stats()["commands"]["rpm"]["timeouts"] == 1
+
+
+def test_late_ack_after_retry():
+    ch, tr, tm = _channel(retries=1)
+    p = ch.submit("rpm 300")
+    tm.fire()
+    ch.on_line("RPM=300")
+    assert p.wait(0) == "RPM=300"
+    tm.fire()                                   # stary timer – bez skutku
+    assert tr.out == ["rpm 300", "rpm 300"]
+
+
+def test_motoff_cancels_moton_retry():
+    """Spóźnione ponowienie moton nie włącza silników po nowszym motoff."""
+    ch, tr, tm = _channel(retries=1)
+    on = ch.submit("moton")
+    off = ch.submit("motoff")
+    tm.fire()
+    assert tr.out == ["moton", "motoff", "motoff"]      # motoff ponowione, moton nie
+    with pytest.raises(CommandError):
+        on.wait(0)
+    ch.on_line("MOTORS=OFF")
+    assert off.wait(0) == "MOTORS=OFF"
+
+
+def test_stop_drops_queued_moton():
+    ch, tr, _ = _channel(max_inflight=1)
+    ch.submit("rpm 300")
+    on = ch.submit("moton")                     # czeka w kolejce (okno pełne)
+    ch.submit("stop")
+    with pytest.raises(CommandError):
+        on.wait(0)
+    ch.on_line("RPM=300")
+    assert "moton" not in tr.out
+
+
+def test_power_on_zero_does_not_ack_yzero():
+    ch, _, _ = _channel()
+    p = ch.submit("yzero")
+    ch.on_line("Y zeroed by endstop (power-on).")
+    assert not p.done
+    ch.on_line("Y zeroed at left margin.")
+    assert p.wait(0) == "Y zeroed at left margin."
+
+
+def test_close_fails_pending():
+    ch, _, _ = _channel()
+    p = ch.submit("moton")
+    ch.close()
+    with pytest.raises(CommandError):
+        p.wait(0)
+    assert ch.submit("moton").error is not None
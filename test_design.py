@@ -0,0 +1,33 @@
+"""
+Projekt cewki (winder_design):
+    python3 -m pytest -q test_design.py
+"""
+import pytest
+
+import winder_design as wd
+
+
+def test_single_layer_candidate():
+    r = wd.design(10.0, 20.0, 50.0, wires=(0.5,), turns=(10,), rpm=100)
+    assert r["turns_per_layer"] == (int(20.0 / wd.effective_wire_mm(0.5)),)
+    assert r["layers"] == (1,) and r["fits"] == (True,)
+    assert r["length_m"][0] == pytest.approx(10 * (50.0 + 3.141592653589793 * wd.effective_wire_mm(0.5)) / 1000)
+    assert r["time_min"] == (0.1,)
+
+
+def test_best_rows_and_time_per_call():
+    a = wd.design_best(10, 20, 50, turns=(100, 200), rpm=100, target_ohm=1.0, limit=5)
+    b = wd.design_best(10, 20, 50, turns=(100, 200), rpm=200, target_ohm=1.0, limit=5)
+    assert a["candidates"] == len(wd.WIRE_MM) * 2 and len(a["designs"]) == 5
+    assert [r["wire"] for r in a["designs"]] == [r["wire"] for r in b["designs"]]
+    assert a["designs"][0]["time_min"] == 2 * b["designs"][0]["time_min"]
+    assert wd._ranked.cache_info().hits >= 1
+
+
+def test_design_args_range_bounded():
+    with pytest.raises(ValueError):
+        wd.design_args({"h": "10", "w": "20", "l": "50", "turns": "1:1000000000"})
+    with pytest.raises(ValueError):
+        wd.design_args({"h": "10", "w": "20", "l": "50", "turns": "0:10"})
+    out = wd.design_args({"h": "10", "w": "20", "l": "50", "turns": "100:200:50", "wires": "0.5"})
+    assert out["candidates"] == 3
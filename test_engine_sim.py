@@ -0,0 +1,79 @@
+"""
+Pętla kroków na symulowanym GPIO z zegarem wirtualnym (bez sprzętu):
+    python3 -m pytest -q test_engine_sim.py
+"""
+import time
+
+from winder_engine_rpi import WinderEngineRPi, make_backend, X_STEP, Y_STEP
+
+XREV = 400
+RPM = 300
+
+
+def _engine(**kw):
+    be = make_backend("sim", virtual=True, record=True, x_steps_per_rev=XREV)
+    eng = WinderEngineRPi(backend=be, wave=False)
+    eng.set_xrev(XREV)
+    eng.set_pitch(0.2)
+    eng.set_bwidth(10.0)
+    eng.set_rpm(RPM)
+    eng.set_accel(kw.get("accel", 0))
+    return eng, be
+
+
+def _wait(cond, timeout=20.0):
+    t_end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < t_end, "timeout"
+        time.sleep(0.01)
+
+
+def test_accel_enabled_while_cruising_keeps_speed():
+    """Włączenie rampy w trakcie jazdy bez rampy nie cofa wrzeciona do RAMP_START_RPM."""
+    eng, be = _engine(accel=0)
+    eng.start_thread()
+    try:
+        eng.run()
+        _wait(lambda: len(be.edges(X_STEP)) >= 2 * XREV)
+        eng.set_accel(300)
+        k = len(be.edges(X_STEP))
+        _wait(lambda: len(be.edges(X_STEP)) >= k + XREV)
+        eng.stop()
+        t = be.edges(X_STEP)[k:k + XREV]
+        cruise = 60.0 / (RPM * XREV)
+        assert max(b - a for a, b in zip(t, t[1:])) < 1.5 * cruise
+    finally:
+        eng.shutdown()
+
+
+def test_short_job_steps_and_pauses():
+    """Zlecenie N zwojów: dokładnie N × xrev kroków X, potem PAUSE (też z rampą)."""
+    for accel in (0, 600):
+        eng, be = _engine(accel=accel)
+        eng.start_thread()
+        try:
+            eng.start_job(5)
+            _wait(lambda: eng.get_status()["state"] == "PAUSE")
+            st = eng.get_status()
+            assert st["current_turns"] == 5
+            assert st["goals_reached"] == 1
+            assert len(be.edges(X_STEP)) == 5 * XREV
+            assert be.edges(Y_STEP)
+        finally:
+            eng.shutdown()
+
+
+def test_runtime_sim_does_not_record_edges():
+    """Backend serwera ("sim" bez record=True) nie zapisuje zboczy – pamięć nie rośnie."""
+    be = make_backend("sim", virtual=True, x_steps_per_rev=XREV)
+    eng = WinderEngineRPi(backend=be, wave=False)
+    eng.set_xrev(XREV)
+    eng.set_rpm(RPM)
+    eng.start_thread()
+    try:
+        eng.start_job(2)
+        _wait(lambda: eng.get_status()["state"] == "PAUSE")
+        assert eng.get_status()["current_turns"] == 2
+        assert len(be.edge_t) == 0
+    finally:
+        eng.shutdown()
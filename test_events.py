@@ -0,0 +1,65 @@
+"""
+LogRing (kursor since=) i StatusHub (wersja stanu / ETag):
+    python3 -m pytest -q test_events.py
+"""
+from winder_events import LogRing, StatusHub
+
+
+def test_since_cursor():
+    ring = LogRing(4)
+    for i in range(3):
+        ring.append(f"l{i}")
+    lines, first, last, lost = ring.since(0)
+    assert (lines, first, last, lost) == (["l0", "l1", "l2"], 1, 3, 0)
+    assert ring.since(3) == ([], 4, 3, 0)
+    ring.append("l3")
+    assert ring.since(3)[0] == ["l3"]
+
+
+def test_since_reports_lost_lines():
+    ring = LogRing(4)
+    for i in range(10):
+        ring.append(f"l{i}")
+    lines, first, last, lost = ring.since(2)
+    assert lines == ["l6", "l7", "l8", "l9"] and first == 7 and last == 10
+    assert lost == 4                        # linie 3..6 wypadły z bufora
+
+
+def test_since_limit_and_tail():
+    ring = LogRing(8)
+    for i in range(6):
+        ring.append(f"l{i}")
+    lines, _, cursor, _ = ring.since(0, limit=2)
+    assert lines == ["l0", "l1"] and cursor == 2
+    assert ring.since(cursor, limit=2)[0] == ["l2", "l3"]
+    assert ring.tail(2) == ["l4", "l5"]
+
+
+def test_clear_keeps_numbering():
+    ring = LogRing(4)
+    ring.append("a")
+    ring.clear()
+    assert ring.since(0)[0] == []
+    assert ring.append("b") == 2
+    assert ring.since(1)[0] == ["b"]
+
+
+def test_status_version_only_on_change():
+    hub = StatusHub()
+    hub.update({"state": "RUN", "turns": 1})
+    v1, body = hub.status_json()
+    hub.update({"state": "RUN", "turns": 1})
+    assert hub.status_json()[0] == v1
+    hub.update({"turns": 2})
+    v2, body2 = hub.status_json()
+    assert v2 > v1 and body2 != body
+
+
+def test_log_does_not_change_status_etag():
+    hub = StatusHub()
+    hub.update({"state": "RUN"})
+    v, body = hub.status_json()
+    for i in range(5):
+        hub.log(f"line {i}")
+    assert hub.status_json() == (v, body)
+    assert hub.log_seq == 5
@@ -0,0 +1,111 @@
+"""
+Historia telemetrii (winder_history): zapis rozrzedzony, segmenty, zapytania, LTTB / min-max:
+    python3 -m pytest -q test_history.py
+"""
+import math
+import os
+import time
+
+import pytest
+
+from winder_history import HistoryStore, Segment, lttb, query_args
+
+T0 = float(int(time.time()) - 3600)   # w oknie retencji (stare segmenty są usuwane)
+
+
+def _store(tmp_path, **kw):
+    return HistoryStore(str(tmp_path), **kw)
+
+
+def test_thinning_and_state_change(tmp_path):
+    h = _store(tmp_path, min_interval=0.2, heartbeat=10.0)
+    h.new_segment("job")
+    assert h.append("RUN", turns=1, t=T0)
+    assert not h.append("RUN", turns=2, t=T0 + 0.1)        # za gęsto
+    assert h.append("PAUSE", turns=2, t=T0 + 0.15)         # zmiana stanu – zawsze
+    assert h.append("PAUSE", turns=3, t=T0 + 0.5)
+    assert not h.append("PAUSE", turns=3, t=T0 + 5.0)      # bez zmian przed heartbeat
+    assert h.append("PAUSE", turns=3, t=T0 + 11.0)
+    assert (h.appended, h.skipped) == (4, 2)
+    h.close()
+
+
+def test_query_minmax_and_state(tmp_path):
+    h = _store(tmp_path, min_interval=0.0)
+    h.new_segment("job")
+    for i in range(100):
+        h.append("RUN" if i < 50 else "PAUSE", turns=i, y=i / 10, t=T0 + i)
+    out = h.query(T0, T0 + 99, points=10, fields=("turns", "y"))
+    assert out["in_window"] == 100 and len(out["t"]) == 10
+    assert out["series"]["turns"]["min"][0] == 0 and out["series"]["turns"]["max"][-1] == 99
+    assert out["state"] == [[T0, "RUN"], [T0 + 50, "PAUSE"]]
+    h.close()
+
+
+def test_query_lttb_keeps_endpoints(tmp_path):
+    h = _store(tmp_path, min_interval=0.0)
+    h.new_segment("job")
+    for i in range(1000):
+        h.append("RUN", turns=i, rpm=math.sin(i / 20), t=T0 + i)
+    s = h.query(T0 + 10, T0 + 900, points=50, mode="lttb", fields=("rpm",))["series"]["rpm"]
+    assert len(s["t"]) == 50
+    assert s["t"][0] == T0 + 10 and s["t"][-1] == T0 + 900
+    h.close()
+
+
+def test_lttb_endpoints_and_peak():
+    pts = [(float(i), 0.0) for i in range(100)]
+    pts[37] = (37.0, 10.0)                     # pojedynczy szczyt musi przetrwać redukcję
+    out = lttb(pts, 10)
+    assert len(out) == 10 and out[0] == pts[0] and out[-1] == pts[-1]
+    assert (37.0, 10.0) in out
+    assert lttb(pts[:5], 10) == pts[:5]
+
+
+def test_reload_segments_after_restart(tmp_path):
+    h = _store(tmp_path, min_interval=0.0)
+    h.new_segment("first")
+    for i in range(10):
+        h.append("RUN", turns=i, t=T0 + i)
+    h.new_segment("second")
+    h.append("RUN", turns=0, t=T0 + 20)
+    h.close()
+    h2 = _store(tmp_path)
+    segs = h2.segments()
+    assert [(s["label"], s["count"]) for s in segs] == [("first", 10), ("second", 1)]
+    out = h2.query(T0, T0 + 30, points=100, fields=("turns",))
+    assert out["in_window"] == 11
+
+
+def test_unclosed_segment_readable_after_crash(tmp_path):
+    """Aktywny segment bez close() (awaria) – licznik z nagłówka, plik większy niż dane."""
+    h = _store(tmp_path, min_interval=0.0)
+    h.new_segment("crash")
+    for i in range(5):
+        h.append("RUN", turns=i, t=T0 + i)
+    path = h._seg.path
+    h._seg.mm.flush()
+    seg = Segment(path)
+    assert seg.count == 5 and seg.time_at(4) == T0 + 4 and seg.label == "crash"
+    seg.close()
+    h.close()
+
+
+def test_corrupt_segment_skipped(tmp_path):
+    (tmp_path / "0000000000001.wts").write_bytes(b"")
+    (tmp_path / "0000000000002.wts").write_bytes(b"junk" * 32)
+    assert _store(tmp_path).segments() == []
+
+
+def test_query_args(tmp_path):
+    h = _store(tmp_path, min_interval=0.0)
+    h.new_segment("job")
+    for i in range(10):
+        h.append("RUN", turns=i, t=T0 + i)
+    sid = h.segments()[0]["id"]
+    assert query_args(h, {"job": sid, "points": "5"})["in_window"] == 10
+    for bad in ({"job": "nope"}, {"from": str(T0 + 5), "to": str(T0)}, {"mode": "avg"}, {"fields": "x"}):
+        with pytest.raises(ValueError):
+            query_args(h, bad)
+    h.close()
+    assert os.listdir(tmp_path)
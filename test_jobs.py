@@ -0,0 +1,85 @@
+"""
+Kolejka zleceń (winder_jobs): receptury, kolejność, zapis i odczyt po restarcie:
+    python3 -m pytest -q test_jobs.py
+"""
+import json
+import os
+
+import pytest
+
+from winder_jobs import JobQueue, recipe_commands, recipe_from, section_plan
+
+
+def test_section_plan():
+    assert section_plan(10, 3) == [4, 3, 3]
+    assert section_plan(10, 0) == []
+
+
+def test_recipe_from_validates():
+    r = recipe_from({"total": "100", "sections": 4, "rpm": "300", "pitch": 0.2})
+    assert r["total"] == 100 and r["plan"] == [25, 25, 25, 25]
+    assert r["rpm"] == 300 and r["xrev"] is None
+    assert recipe_commands(r) == ["rpm 300", "pitch 0.2"]
+    assert recipe_from({"plan": [30, 20]})["total"] == 50
+    for bad in ({"total": 0}, {"total": "abc"}, {"total": 50, "plan": [30, 30]},
+                {"total": 10, "pitch": 0}, {"total": 10, "xrev": 0}):
+        with pytest.raises(ValueError):
+            recipe_from(bad)
+
+
+def test_start_finish_order(tmp_path):
+    q = JobQueue(str(tmp_path / "queue.json"))
+    a = q.add(recipe_from({"total": 10}))
+    b = q.add(recipe_from({"total": 20}))
+    assert q.start_next()["id"] == a["id"]
+    assert q.start_next() is None                       # najwyżej jedno running
+    assert q.current()["id"] == a["id"] and q.next_queued()["id"] == b["id"]
+    assert q.finish(jid=b["id"]) is None                # nie to zlecenie
+    assert q.finish()["state"] == "done"
+    assert q.summary() == {"queue_current": None, "queue_next": b["id"], "queue_len": 1}
+
+
+def test_running_job_requeued_after_restart(tmp_path):
+    path = str(tmp_path / "queue.json")
+    q = JobQueue(path)
+    a = q.add(recipe_from({"total": 10}))
+    q.start_next()
+    q2 = JobQueue(path)                                 # restart w trakcie zlecenia
+    assert q2.current() is None
+    assert q2.next_queued()["id"] == a["id"] and q2.next_queued()["t_started"] is None
+    assert q2.add(recipe_from({"total": 5}))["id"] != a["id"]
+
+
+def test_leftover_tmp_does_not_replace_queue(tmp_path):
+    """Zanik zasilania w trakcie zapisu: zostaje plik .tmp, główny plik jest cały."""
+    path = str(tmp_path / "queue.json")
+    q = JobQueue(path)
+    a = q.add(recipe_from({"total": 10}))
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write('{"jobs": [{"id": "9", "sta')
+    q2 = JobQueue(path)
+    assert [j["id"] for j in q2.as_dict()["jobs"]] == [a["id"]]
+    q2.add(recipe_from({"total": 5}))                   # następny zapis nadpisuje .tmp
+    assert not os.path.exists(path + ".tmp")
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)["jobs"]) == 2
+
+
+def test_truncated_file_starts_empty(tmp_path, capsys):
+    path = tmp_path / "queue.json"
+    path.write_text('{"jobs": [', encoding="utf-8")
+    q = JobQueue(str(path))
+    assert q.as_dict() == {"jobs": []}
+    assert "[queue]" in capsys.readouterr().out
+    assert q.add(recipe_from({"total": 10}))["id"] == "1"
+
+
+def test_remove_and_move(tmp_path):
+    q = JobQueue(str(tmp_path / "queue.json"))
+    a, b, c = (q.add(recipe_from({"total": n})) for n in (1, 2, 3))
+    assert q.move(c["id"], 0)["id"] == c["id"]
+    assert q.next_queued()["id"] == c["id"]
+    assert q.remove(b["id"])["state"] == "cancelled"
+    q.start_next()
+    assert q.remove(c["id"]) is None                    # już ruszyło
+    assert q.summary()["queue_len"] == 1
@@ -0,0 +1,99 @@
+"""
+Lista portów w tle (winder_ports.PortWatcher) i powrót po zerwaniu łącza (Machine._resync):
+    python3 -m pytest -q test_ports.py
+"""
+import os
+import struct
+import threading
+import time
+
+import winder_ports
+from winder_ports import PortWatcher
+
+
+def test_refresh_reports_diff():
+    listing = ["/dev/ttyACM0"]
+    w = PortWatcher(list_fn=lambda: list(listing))
+    seen = []
+    w.subscribe(lambda added, removed: seen.append((added, removed)))
+    assert w.refresh() == ["/dev/ttyACM0"]
+    listing[:] = ["/dev/ttyUSB0"]
+    w.refresh()
+    w.refresh()                                   # bez zmian – bez powiadomienia
+    assert seen == [({"/dev/ttyACM0"}, set()), ({"/dev/ttyUSB0"}, {"/dev/ttyACM0"})]
+    assert w.ports() == ["/dev/ttyUSB0"]
+
+
+def test_list_error_keeps_last_ports():
+    listing = ["/dev/ttyACM0"]
+
+    def list_fn():
+        if not listing:
+            raise OSError("sysfs")
+        return list(listing)
+
+    w = PortWatcher(list_fn=list_fn)
+    w.refresh()
+    listing.clear()
+    assert w.refresh() == ["/dev/ttyACM0"]
+
+
+def test_subscriber_error_does_not_stop_others():
+    w = PortWatcher(list_fn=lambda: ["/dev/ttyACM0"])
+    seen = []
+    w.subscribe(lambda a, r: 1 / 0)
+    w.subscribe(lambda a, r: seen.append(a))
+    w.refresh()
+    assert seen == [{"/dev/ttyACM0"}]
+
+
+def test_tty_names_from_inotify_buffer():
+    def event(name):
+        raw = name.encode() + b"\0" * (16 - len(name))
+        return struct.pack("iIII", 1, winder_ports.IN_CREATE, 0, len(raw)) + raw
+
+    assert winder_ports._tty_names(event("ttyACM0") + event("sda1") + event("ttyUSB1")) == \
+        ["ttyACM0", "ttyUSB1"]
+
+
+def test_hotplug_in_watched_dir(tmp_path):
+    """Nowy węzeł tty w obserwowanym katalogu → subskrybent dostaje go bez odpytywania."""
+    w = PortWatcher(dev=str(tmp_path),
+                    list_fn=lambda: [n for n in os.listdir(tmp_path) if n.startswith("tty")])
+    got = threading.Event()
+    w.subscribe(lambda added, removed: "ttyACM0" in added and got.set())
+    w.start()
+    time.sleep(0.1)
+    (tmp_path / "ttyACM0").touch()
+    assert got.wait(winder_ports.POLL_SEC + winder_ports.SETTLE_SEC + 2.0)
+    assert w.ports() == ["ttyACM0"]
+
+
+def _machine():
+    from winder_server import Machine
+
+    m = Machine("test-resync")
+    sent = []
+    m.send = lambda *cmds: sent.extend(cmds) or []
+    m.last_goal = 100
+    m.resync = {"port": "/dev/ttyACM0", "turns": 40, "t_lost": time.monotonic()}
+    return m, sent
+
+
+def test_resync_after_arduino_reset_rearms_remaining_turns():
+    m, sent = _machine()
+    m._resync(0)                                  # licznik od zera – zostało 60 zwojów
+    assert sent == ["goal 60"] and m.last_goal == 60 and m.resync is None
+
+
+def test_resync_without_reset_keeps_goal():
+    m, sent = _machine()
+    m._resync(45)
+    assert sent == ["goal 100"] and m.last_goal == 100
+
+
+def test_resync_after_finished_goal_sends_nothing():
+    m, sent = _machine()
+    m.resync["turns"] = 100
+    m._resync(0)
+    assert sent == [] and m.resync is None
@@ -0,0 +1,44 @@
+"""
+Tablice rampy i RampPlanner (winder_ramp):
+    python3 -m pytest -q test_ramp.py
+"""
+from winder_ramp import RAMP_MAX_STEPS, RampPlanner, min_accel, ramp_table
+
+
+def test_table_decreasing_to_cruise():
+    for profile in ("trap", "scurve"):
+        t = ramp_table(300, 300, 400, profile)
+        assert t and all(a >= b for a, b in zip(t, t[1:]))
+        assert abs(60.0 / (t[-1] * 400) - 300) < 1.0
+
+
+def test_no_ramp():
+    assert ramp_table(300, 0, 400) == ()
+    assert ramp_table(10, 300, 400) == ()   # poniżej RAMP_START_RPM
+
+
+def test_long_ramp_is_capped():
+    """Małe przyspieszenie przy wysokich obrotach nie buduje milionów kroków."""
+    for profile in ("trap", "scurve"):
+        assert min_accel(3000, 6400, profile) > 10
+        t = ramp_table(3000, 10, 6400, profile)
+        assert len(t) <= RAMP_MAX_STEPS
+        assert abs(60.0 / (t[-1] * 6400) - 3000) < 5.0
+
+
+def test_retarget_while_cruising_without_table():
+    """Rampa włączona w trakcie jazdy bez rampy: start od bieżącej prędkości, nie od zera."""
+    cruise = 60.0 / (300 * 400)
+    r = RampPlanner((), cruise)
+    r.fresh = False                      # pętla już kroczyła
+    r.retarget(ramp_table(300, 300, 400), cruise)
+    assert r.cruising
+    assert r.next_interval() == cruise
+
+
+def test_retarget_after_reset_starts_from_table():
+    table = ramp_table(300, 300, 400)
+    r = RampPlanner((), 0.0)
+    r.reset()
+    r.retarget(table, 60.0 / (300 * 400))
+    assert r.i == 0 and r.next_interval() == table[0]
@@ -0,0 +1,88 @@
+"""
+Prędkość i ETA (winder_rate) na próbkach z podanym czasem (bez zegara):
+    python3 -m pytest -q test_rate.py
+"""
+import pytest
+
+from winder_rate import RATE_WINDOW, RateEstimator, fmt_eta, plan_left
+
+
+def _feed(est, t0, t1, turns0, per_s, dt=0.1):
+    """Próbki co dt od t0 do t1 przy stałej prędkości per_s; zwraca (t, zwoje) ostatniej."""
+    n = round((t1 - t0) / dt)
+    for i in range(n + 1):
+        t = t0 + i * dt
+        est.add(turns0 + per_s * (t - t0), t=t)
+    return t, turns0 + per_s * (t - t0)
+
+
+def test_slope_gives_measured_rpm():
+    est = RateEstimator()
+    assert est.rate(t=0.0) is None
+    t, _ = _feed(est, 0.0, 2.0, 0, 5.0)
+    assert est.rate(t=t) == pytest.approx(5.0)
+    assert est.fields(10, t=t)["measured_rpm"] == pytest.approx(300.0)
+
+
+def test_ewma_follows_speed_change():
+    est = RateEstimator()
+    t, turns = _feed(est, 0.0, 3.0, 0, 5.0)
+    est.add(turns + 1.0, t=t + 0.1)                     # jedna szybsza próbka nie przestawia wyniku
+    assert 5.0 < est.rate(t=t + 0.1) < 6.0
+    t, _ = _feed(est, t + 0.1, t + 10.0, turns + 1.0, 10.0)
+    assert est.rate(t=t) == pytest.approx(10.0, rel=0.01)
+
+
+def test_counter_reset_keeps_progress():
+    est = RateEstimator()
+    t, _ = _feed(est, 0.0, 4.0, 0, 5.0)                 # 20 zwojów
+    _feed(est, t + 0.1, t + 4.1, 0, 5.0)                # licznik od zera, kolejne 20
+    assert est.throughput(t=t + 4.1) == pytest.approx(40.0 / (t + 4.1))
+    assert est.rate(t=t + 4.1) == pytest.approx(5.0)
+
+
+def test_throughput_includes_pause():
+    est = RateEstimator()
+    _feed(est, 0.0, 10.0, 0, 5.0)                       # 50 zwojów w 10 s
+    _feed(est, 10.1, 20.0, 50, 0.0)                     # postój 10 s
+    assert est.throughput(t=20.0) == pytest.approx(2.5, rel=0.01)
+    assert est.fields(50, t=20.0)["turns_per_min"] == pytest.approx(150.0, rel=0.01)
+
+
+def test_idle_before_start_not_counted():
+    est = RateEstimator()
+    _feed(est, 0.0, 30.0, 0, 0.0)                       # stoi przed startem
+    assert est.throughput(t=30.0) is None
+    t, _ = _feed(est, 30.1, 40.0, 0, 5.0)
+    assert est.throughput(t=t) == pytest.approx(5.0, rel=0.05)
+
+
+def test_rate_drops_to_zero_without_samples():
+    est = RateEstimator()
+    t, _ = _feed(est, 0.0, 2.0, 0, 5.0)
+    assert est.rate(t=t + RATE_WINDOW + 0.1) == 0.0
+    assert est.fields(10, goal=100, t=t + RATE_WINDOW + 0.1)["eta_goal_s"] is None
+
+
+def test_plan_left():
+    assert plan_left(None, 100) is None
+    assert plan_left(40, 100, [100, 50, 50], 0) == 160  # bieżąca sekcja + dwie następne
+    assert plan_left(100, 100, [100, 50, 50], 1) == 100  # cel osiągnięty, ptr na następnej
+    assert plan_left(100, 100, [100], 1) == 0
+
+
+def test_fmt_eta():
+    assert fmt_eta(None) == "—"
+    assert fmt_eta(123) == "2:03"
+    assert fmt_eta(3723) == "1:02:03"
+
+
+def test_fields_eta():
+    est = RateEstimator()
+    t, _ = _feed(est, 0.0, 10.0, 0, 5.0)                # 50 zwojów, 5 zw/s
+    f = est.fields(50, goal=100, plan=[100, 100], section_ptr=0, sections_mode=True, t=t)
+    assert f["eta_goal_s"] == 10 and f["eta_section_s"] == 10
+    assert f["eta_plan_s"] == 30
+    f = est.fields(50, goal=100, t=t)
+    assert f["eta_section_s"] is None and f["eta_plan_s"] == 10
+    assert est.fields(100, goal=100, t=t)["eta_goal_s"] == 0
@@ -0,0 +1,58 @@
+"""
+Koło czasowe (winder_sched.TimerWheel):
+    python3 -m pytest -q test_sched.py
+"""
+import threading
+import time
+
+from winder_sched import TimerWheel
+
+
+def _wait(cond, timeout=2.0):
+    t_end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < t_end, "timeout"
+        time.sleep(0.002)
+
+
+def test_fires_in_delay_order():
+    wheel = TimerWheel(tick=0.002, slots=8)
+    out = []
+    for d, v in ((0.03, "c"), (0.004, "a"), (0.012, "b")):   # 0.03 s > jeden obrót koła (16 ms)
+        wheel.schedule(d, out.append, v)
+    _wait(lambda: len(out) == 3)
+    assert out == ["a", "b", "c"]
+    assert wheel.pending() == 0
+
+
+def test_not_before_delay():
+    wheel = TimerWheel(tick=0.002)
+    fired = threading.Event()
+    t0 = time.monotonic()
+    wheel.schedule(0.02, fired.set)
+    assert fired.wait(2.0)
+    assert time.monotonic() - t0 >= 0.018
+
+
+def test_cancel_tag():
+    wheel = TimerWheel(tick=0.002)
+    out = []
+    wheel.schedule(0.02, out.append, "job", tag="job")
+    wheel.schedule(0.02, out.append, "job2", tag="job")
+    wheel.schedule(0.02, out.append, "stop", tag="stop")
+    assert wheel.pending("job") == 2
+    assert wheel.cancel_tag("job") == 2
+    assert wheel.cancel_tag("job") == 0
+    assert wheel.pending("job") == 0 and wheel.pending("stop") == 1
+    _wait(lambda: out and not wheel._by_tag)  # indeks tagów sprzątnięty po wykonaniu
+    assert out == ["stop"]
+
+
+def test_single_timer_cancel():
+    wheel = TimerWheel(tick=0.002)
+    out = []
+    t = wheel.schedule(0.01, out.append, 1, tag="x")
+    t.cancel()
+    assert wheel.pending("x") == 0
+    _wait(lambda: not wheel._by_tag)          # slot minął – zadanie wypadło z indeksu
+    assert out == []
@@ -0,0 +1,57 @@
+"""
+Parser linii telemetrii (winder_telemetry.parse_line):
+    python3 -m pytest -q test_telemetry.py
+"""
+from winder_telemetry import is_ready_line, parse_line
+
+STATUS = "[state=RUN, rpm=300, X_turns=12, X_turns_real=11.944, x_steps=320, D11=0, ENDSTOP_Y=1, Y=1.250]"
+
+
+def test_status_line():
+    t = parse_line(STATUS)
+    assert t.kind == "status"
+    assert (t.state, t.rpm, t.turns, t.turns_real, t.x_steps, t.endstop, t.y) == \
+        ("RUN", 300, 12, 11.944, 320, 1, 1.25)
+    assert t.pitch is None and t.goal_reached is None
+
+
+def test_status_line_bad_value_skipped():
+    t = parse_line("[state=PAUSE, rpm=abc, X_turns=5]")
+    assert t.kind == "status" and t.state == "PAUSE" and t.rpm is None and t.turns == 5
+
+
+def test_goal_and_rpm_fast_paths():
+    assert parse_line("[goal] reached").goal_reached is True
+    t = parse_line("RPM=250")
+    assert t.kind == "rpm" and t.rpm == 250
+
+
+def test_bad_rpm_falls_back_to_text():
+    assert parse_line("RPM=").kind == "text"
+
+
+def test_calibration_line():
+    t = parse_line("pitch=0.2000 mm | X_steps/rev=6400 | Y_steps/mm=800 | eff_w=21.850 mm | rpm=200")
+    assert t.kind == "calib"
+    assert (t.pitch, t.eff_w, t.rpm) == (0.2, 21.85, 200)
+
+
+def test_legacy_key_value_line():
+    t = parse_line("turns=42 Y_HOME=1 Rpm=120")
+    assert t.kind == "kv" and (t.turns, t.endstop, t.rpm) == (42, 1, 120)
+
+
+def test_text_lines():
+    for line in ("MOTORS=ON", "Y zeroed at left margin.", "", "foo=bar"):
+        t = parse_line(line)
+        assert t.kind == "text" and t.state is None
+
+
+def test_unterminated_status_is_not_status():
+    assert parse_line("[state=RUN, rpm=300").kind != "status"
+
+
+def test_ready_line():
+    assert is_ready_line("UNO+CNC DDA. Użyj: ...")
+    assert is_ready_line(STATUS)
+    assert not is_ready_line("MOTORS=ON")
@@ -1,13 +1,20 @@
 import tkinter as tk
 from tkinter import filedialog
 from tkinter import ttk
+import os
 import serial
-import serial.tools.list_ports
-import threading
 import time
-import re
 import platform
 
+from winder_commands import CommandChannel
+from winder_design import WIRE_MM, design_args, effective_wire_mm
+from winder_history import HISTORY_DIR, HistoryStore
+from winder_ports import PortWatcher
+from winder_rate import RateEstimator, fmt_eta
+from winder_sched import TimerWheel
+from winder_serial import CONNECT_PROBE, CONNECT_TIMEOUT, SerialTransport
+from winder_telemetry import is_ready_line, parse_line
+
 # Czcionka monospace: Windows / macOS / Linux (RPi)
 if platform.system() == "Windows":
     FONT_MONO = "Consolas"
@@ -16,16 +23,9 @@ elif platform.system() == "Darwin":
 else:
     FONT_MONO = "DejaVu Sans Mono"  # standard na Raspberry Pi OS / Linux
 
-# --- Parametry estymacji emalii (dla wyliczania pitch) ---
-ENAMEL_REL = 0.08   # +8% średnicy
-ENAMEL_MIN = 0.01   # min. +0.01 mm łącznie
-
-def effective_wire_mm(bare_mm: float) -> float:
-    """Zwróć efektywną średnicę (drut + emalia)."""
-    if bare_mm <= 0:
-        return 0.0
-    added = max(ENAMEL_MIN, ENAMEL_REL * bare_mm)
-    return bare_mm + added
+DESIGN_COLUMNS = (("wire", "drut [mm]"), ("packing", "upak."), ("turns", "zwoje"),
+                  ("turns_per_layer", "zw./warstwę"), ("layers", "warstwy"), ("build_mm", "wys. [mm]"),
+                  ("length_m", "drut [m]"), ("resistance_ohm", "R [Ω]"), ("time_min", "czas [min]"))
 
 
 class CoilWinderGUI:
@@ -36,9 +36,17 @@ class CoilWinderGUI:
         # --- stan połączenia/portu ---
         self.serial_port = None
         self.is_connected = False
-        self.read_thread = None
+        self.connecting = False  # port otwarty, czekamy na baner / linię stanu firmware
+        self._connect_after = []
+        self._connect_t0 = 0.0
+        self._resync = None      # po zerwaniu łącza: (port, zwoje, t) – auto-reconnect
+        self.port_watcher = PortWatcher()  # lista portów w tle (inotify na /dev)
+        self.transport = None  # SerialTransport: wątek odczytu + kolejka zapisu
+        self.channel = None    # CommandChannel: potwierdzenia komend (timeouty na self.timers)
+        self.timers = TimerWheel()
         self.log_buffer = []
         self.last_sent = {}
+        self.history = HistoryStore(os.path.join(HISTORY_DIR, "gui"))  # próbki stanu na dysku (mmap)
 
         # --- stan procesu/telemetrii ---
         self.current_state = "IDLE"
@@ -48,6 +56,7 @@ class CoilWinderGUI:
         self.eff_w = None
         self.turns_per_layer = None
         self.current_rpm = None  # śledzenie rpm z firmware
+        self.speed = RateEstimator()  # zmierzone RPM / ETA z próbek zwojów (enkoder)
 
         # krańcówka Y i widoczność tylko przed startem
         self.endstop_raw = None
@@ -59,6 +68,7 @@ class CoilWinderGUI:
         self.section_plan = []
         self.section_ptr = 0
         self.last_goal_set = None
+        self._delayed = []  # id z root.after (motoff / następna sekcja) – STOP je anuluje
 
         # zapobiegam NameError jeśli kod używa reverse_x_var
         self.reverse_x_var = tk.BooleanVar(value=False)
@@ -71,7 +81,7 @@ class CoilWinderGUI:
         self.port_variable = tk.StringVar()
         self.port_menu = tk.OptionMenu(connection_frame, self.port_variable, "—")
         self.port_menu.pack(side=tk.LEFT, fill="x", expand=True)
-        tk.Button(connection_frame, text="Odśwież", command=self.refresh_ports).pack(side=tk.LEFT, padx=5)
+        tk.Button(connection_frame, text="Odśwież", command=lambda: self.refresh_ports(force=True)).pack(side=tk.LEFT, padx=5)
         self.connect_button = tk.Button(connection_frame, text="Połącz", command=self.toggle_connection)
         self.connect_button.pack(side=tk.LEFT, padx=5)
 
@@ -93,6 +103,8 @@ class CoilWinderGUI:
         tab_adv = ttk.Frame(notebook)
         notebook.add(tab_basic, text="Sterowanie")
         notebook.add(tab_adv, text="Ustawienia zaawansowane")
+        tab_design = ttk.Frame(notebook)
+        notebook.add(tab_design, text="Projekt cewki")
 
         # === Sterowanie ===
         controls = tk.LabelFrame(tab_basic, text="Sterowanie", padx=10, pady=10)
@@ -224,6 +236,39 @@ class CoilWinderGUI:
         for c in range(3):
             adv.grid_columnconfigure(c, weight=1)
 
+        # === Projekt cewki (winder_design) – karkas z zakładki Sterowanie ===
+        design = tk.LabelFrame(tab_design, text="Projekt cewki (wymiary karkasu: wys. = okno, szer., dł. = obwód)",
+                               padx=10, pady=10)
+        design.pack(padx=0, pady=0, fill="x")
+
+        tk.Label(design, text="Druty [mm] (puste = szereg IEC):").grid(row=0, column=0, sticky="w", padx=5, pady=4)
+        self.design_wires_entry = tk.Entry(design, width=24)
+        self.design_wires_entry.grid(row=0, column=1, sticky="ew", padx=5)
+        tk.Label(design, text="Upakowania:").grid(row=0, column=2, sticky="e", padx=5)
+        self.design_packing_entry = tk.Entry(design, width=12); self.design_packing_entry.insert(0, "0.9,1.0")
+        self.design_packing_entry.grid(row=0, column=3, sticky="w", padx=5)
+
+        tk.Label(design, text="Zwoje (lista / od:do:krok):").grid(row=1, column=0, sticky="w", padx=5, pady=4)
+        self.design_turns_entry = tk.Entry(design, width=24)
+        self.design_turns_entry.grid(row=1, column=1, sticky="ew", padx=5)
+        tk.Label(design, text="R docelowa [Ω]:").grid(row=1, column=2, sticky="e", padx=5)
+        self.design_ohm_entry = tk.Entry(design, width=12)
+        self.design_ohm_entry.grid(row=1, column=3, sticky="w", padx=5)
+
+        tk.Button(design, text="Oblicz", command=self.run_design).grid(row=2, column=0, padx=5, pady=4, sticky="w")
+        self.design_info_var = tk.StringVar(value=f"Puste zwoje = całość z zakładki Sterowanie; {len(WIRE_MM)} średnic w szeregu.")
+        tk.Label(design, textvariable=self.design_info_var, anchor="w").grid(row=2, column=1, columnspan=3, sticky="w")
+
+        self.design_tree = ttk.Treeview(design, columns=[c for c, _ in DESIGN_COLUMNS], show="headings", height=8)
+        for c, title in DESIGN_COLUMNS:
+            self.design_tree.heading(c, text=title)
+            self.design_tree.column(c, width=80, anchor="e")
+        self.design_tree.grid(row=3, column=0, columnspan=4, sticky="ew", padx=5, pady=4)
+        self.design_tree.bind("<Double-1>", lambda e: self.apply_design())
+        self.design_rows = {}
+        for c in range(4):
+            design.grid_columnconfigure(c, weight=1)
+
         # Pasek informacji (X_turns_real z enkodera gdy firmware 5)
         self.info_var = tk.StringVar(value="eff_w: —  |  zwojów/warstwę: —  |  X_zwoje: 0  |  stan: IDLE")
         tk.Label(root, textvariable=self.info_var, anchor="w").pack(padx=10, pady=(0, 5), fill="x")
@@ -243,20 +288,43 @@ class CoilWinderGUI:
         self.update_ui_state()
         self._recalc_sections()
         self._update_endstop_indicator()
+        # lista portów w tle; podłączenie / powrót kabla aktualizuje menu (i wznawia łącze)
+        self.port_watcher.subscribe(lambda added, removed:
+                                    self.root.after(0, self._on_ports_changed, added, removed))
+        self.port_watcher.start()
+        self.refresh_ports()
         root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
     # ---------- Utility ----------
-    def refresh_ports(self):
-        ports = [p.device for p in serial.tools.list_ports.comports()]
+    def refresh_ports(self, force=False):
+        """Menu portów z listy PortWatcher (force – odczytaj system teraz)."""
+        ports = self.port_watcher.refresh() if force else self.port_watcher.ports()
+        current = self.port_variable.get()
         menu = self.port_menu["menu"]
         menu.delete(0, "end")
         if ports:
             for port in ports:
                 menu.add_command(label=port, command=lambda v=port: self.port_variable.set(v))
-            self.port_variable.set(ports[0])
+            self.port_variable.set(current if current in ports else ports[0])
         else:
             self.port_variable.set("Brak portów")
 
+    def _on_ports_changed(self, added, removed):
+        if not (self.is_connected or self.connecting):
+            self.refresh_ports()
+        if self._resync is not None and self._resync[0] in added:
+            self._try_reconnect()
+
+    def _try_reconnect(self):
+        if self._resync is None or self.is_connected or self.connecting:
+            return
+        if self._resync[0] not in self.port_watcher.ports():
+            return                # czekamy na zdarzenie z PortWatcher
+        self.port_variable.set(self._resync[0])
+        self._open_port(self._resync[0])
+        if not self.connecting:   # port jeszcze się nie otwiera (udev) – ponów
+            self.root.after(1000, self._try_reconnect)
+
     def update_ui_state(self):
         state = tk.NORMAL if self.is_connected else tk.DISABLED
         for w in self.command_widgets:
@@ -314,6 +382,43 @@ class CoilWinderGUI:
         self.pitch_entry.insert(0, f"{new_pitch:.5f}")
         self.set_pitch()
 
+    # ---------- Projekt cewki ----------
+    def run_design(self):
+        """Przegląd drut × upakowanie × zwoje dla karkasu z GUI; najlepsze kandydaty w tabeli."""
+        args = {"h": self.bobbin_h_entry.get().strip(), "w": self.bobbin_w_entry.get().strip(),
+                "l": self.bobbin_l_entry.get().strip(), "wires": self.design_wires_entry.get().strip(),
+                "packing": self.design_packing_entry.get().strip(),
+                "turns": self.design_turns_entry.get().strip() or self.total_turns_entry.get().strip(),
+                "rpm": self.rpm_entry.get().strip(), "ohm": self.design_ohm_entry.get().strip(), "limit": 50}
+        t0 = time.perf_counter()
+        try:
+            out = design_args(args)
+        except ValueError as e:
+            self.log_message(f"Błąd projektu: {e}")
+            return
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.design_tree.delete(*self.design_tree.get_children())
+        self.design_rows = {}
+        for row in out["designs"]:
+            values = ["—" if row[c] is None else (f"{row[c]:.4g}" if isinstance(row[c], float) else row[c])
+                      for c, _ in DESIGN_COLUMNS]
+            self.design_rows[self.design_tree.insert("", tk.END, values=values)] = row
+        self.design_info_var.set(f"{out['candidates']} kandydatów, mieści się {out['fitting']} – {ms:.1f} ms"
+                                 f"{'' if out['numpy'] else ' (bez numpy)'}; dwuklik = zastosuj")
+
+    def apply_design(self):
+        """Zastosuj zaznaczony projekt: drut, upakowanie (→ pitch) i całość zwojów."""
+        sel = self.design_tree.selection()
+        row = self.design_rows.get(sel[0]) if sel else None
+        if row is None:
+            return
+        for entry, value in ((self.wire_entry, row["wire"]), (self.packing_entry, row["packing"]),
+                             (self.total_turns_entry, row["turns"])):
+            entry.delete(0, tk.END)
+            entry.insert(0, str(value))
+        self._recalc_sections()
+        self.recalc_pitch_from_inputs()
+
     # ---------- Pasek info + krańcówka ----------
     def _update_info_label(self):
         eff = f"{self.eff_w:.3f} mm" if self.eff_w is not None else "—"
@@ -321,7 +426,15 @@ class CoilWinderGUI:
         x_txt = str(self.current_turns)
         if self.current_turns_real is not None:
             x_txt += f" (enc: {self.current_turns_real:.2f})"
-        self.info_var.set(f"eff_w: {eff}  |  zwojów/warstwę: {tpl}  |  X_zwoje: {x_txt}  |  stan: {self.current_state}")
+        sp = self.speed.fields(self.current_turns, self.last_goal_set, self.section_plan, self.section_ptr,
+                               self.sections_mode)
+        rpm = f"{sp['measured_rpm']:.0f}" if sp["measured_rpm"] is not None else "—"
+        eta = f"ETA cel: {fmt_eta(sp['eta_goal_s'])}"
+        if self.sections_mode:
+            eta += f"  sekcja: {fmt_eta(sp['eta_section_s'])}"
+        eta += f"  całość: {fmt_eta(sp['eta_plan_s'])}"
+        self.info_var.set(f"eff_w: {eff}  |  zwojów/warstwę: {tpl}  |  X_zwoje: {x_txt}  |  stan: {self.current_state}"
+                          f"  |  RPM zmierz.: {rpm}  zw/min: {sp['turns_per_min'] or '—'}  |  {eta}")
 
     def _update_endstop_indicator(self):
         if not self.has_started and self.current_state != "RUN":
@@ -387,36 +500,81 @@ class CoilWinderGUI:
 
     # ---------- Serial ----------
     def toggle_connection(self):
-        if not self.is_connected:
-            port = self.port_variable.get()
-            if port in ("Brak portów", "—", "", None):
-                self.log_message("Błąd: wybierz poprawny port.")
-                return
-            try:
-                self.serial_port = serial.Serial(port, 115200, timeout=1)
-                time.sleep(2)
-                self.is_connected = True
-                self.connect_button.config(text="Rozłącz")
-                self.status_var.set(f"Połączono: {port}")
-                self.log_message(f"Połączono z {port}")
-                self._send_raw("motoff")
-                self.has_started = False
-                self.endstop_raw = None
-                self.current_y = None
-                self.current_rpm = None
-                self.current_turns = 0
-                self.current_turns_real = None
-                self.last_sent = {}
-                self._update_endstop_indicator()
-                self.update_ui_state()
-                self.read_thread = threading.Thread(target=self.read_from_serial, daemon=True)
-                self.read_thread.start()
-            except serial.SerialException as e:
-                self.log_message(f"Błąd połączenia: {e}")
+        if self.is_connected or self.connecting or self._resync is not None:
+            self._resync = None   # operator rozłącza – bez automatycznego powrotu
+            self.disconnect()
+            return
+        port = self.port_variable.get()
+        if port in ("Brak portów", "—", "", None):
+            self.log_message("Błąd: wybierz poprawny port.")
+            return
+        self._open_port(port)
+
+    def _open_port(self, port):
+        try:
+            self.serial_port = serial.Serial(port, 115200, timeout=1)
+        except serial.SerialException as e:
+            self.log_message(f"Błąd połączenia: {e}")
+            return
+        # bez sleep(2): gotowe, gdy przyjdzie baner albo linia stanu (_handle_line → _connect_ready)
+        self.connecting = True
+        self._connect_t0 = time.monotonic()
+        self.transport = SerialTransport(self.serial_port, self._on_serial_line,
+                                         self._on_serial_error).start()
+        self.channel = CommandChannel(self.transport, self.timers, on_fail=self._on_command_fail)
+        tr = self.transport
+        self._connect_after = [
+            self.root.after(int(CONNECT_PROBE * 1000), lambda: tr.send("status")),
+            self.root.after(int(CONNECT_TIMEOUT * 1000), self._connect_timeout),
+        ]
+        self.connect_button.config(text="Przerwij")
+        self.status_var.set(f"Łączenie: {port}…")
+        self.log_message(f"Łączenie z {port}…")
+
+    def _connect_ready(self):
+        self._cancel_connect_timers()
+        self.connecting = False
+        self.is_connected = True
+        port = self.port_variable.get()
+        self.connect_button.config(text="Rozłącz")
+        self.status_var.set(f"Połączono: {port}")
+        self.log_message(f"Połączono z {port} ({time.monotonic() - self._connect_t0:.2f} s)")
+        if self._resync is not None:
+            self._send_raw("motoff", "status")  # odpowiedź (linia stanu) → _resync_goal()
         else:
+            self._send_raw("motoff")
+        self.has_started = False
+        self.endstop_raw = None
+        self.current_y = None
+        self.current_rpm = None
+        self.current_turns = 0
+        self.current_turns_real = None
+        self.last_sent = {}
+        self._update_endstop_indicator()
+        self.update_ui_state()
+
+    def _connect_timeout(self):
+        self._connect_after = []
+        if self.connecting:
+            self.log_message("Brak odpowiedzi firmware – sprawdź port i prędkość.")
             self.disconnect()
+            if self._resync is not None:
+                self.root.after(1000, self._try_reconnect)
+
+    def _cancel_connect_timers(self):
+        for after_id in self._connect_after:
+            self.root.after_cancel(after_id)
+        self._connect_after = []
 
     def disconnect(self):
+        self._cancel_connect_timers()
+        self.connecting = False
+        if self.channel is not None:
+            self.channel.close()
+            self.channel = None
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
         if self.serial_port and self.serial_port.is_open:
             try:
                 self.serial_port.close()
@@ -433,57 +591,73 @@ class CoilWinderGUI:
         self.current_rpm = None
         self.current_turns = 0
         self.current_turns_real = None
+        self.speed = RateEstimator()
         self._update_endstop_indicator()
 
-    def read_from_serial(self):
-        while self.is_connected and self.serial_port and self.serial_port.is_open:
-            try:
-                line = self.serial_port.readline().decode("utf-8", errors="ignore").rstrip("\r\n")
-                if line:
-                    self.log_message(line)
-                    self.root.after(0, lambda l=line: self._handle_line(l))
-            except (serial.SerialException, OSError) as e:
-                errno = getattr(e, "errno", None)
-                if errno == 9:
-                    self.root.after(0, self.disconnect); break
-                self.log_message(f"Błąd portu szeregowego: {e}")
-                self.root.after(0, self.disconnect); break
+    def _on_serial_line(self, line, t_rx):
+        # wątek transportu – do Tk tylko przez after()
+        channel = self.channel
+        if channel is not None:
+            channel.on_line(line, t_rx)
+        self.log_message(line)
+        self.root.after(0, self._handle_line, line)
+
+    def _on_serial_error(self, e):
+        if getattr(e, "errno", None) != 9:
+            self.log_message(f"Błąd portu szeregowego: {e}")
+        self.root.after(0, self._on_link_lost)
+
+    def _on_link_lost(self):
+        """Zerwane łącze (kabel USB): rozłącz i czekaj, aż port wróci (PortWatcher)."""
+        if self.is_connected and self._resync is None:
+            self._resync = (self.port_variable.get(), self.current_turns, time.monotonic())
+        self.disconnect()
+        if self._resync is not None:
+            port = self._resync[0]
+            self.log_message(f"Czekam na {port} – połączę ponownie automatycznie")
+            self.connect_button.config(text="Przerwij")
+            if port in self.port_watcher.ports():
+                self.root.after(1000, self._try_reconnect)
+
+    def _resync_goal(self, turns_now):
+        """Pierwsza linia stanu po powrocie łącza: uzbrój z powrotem cel (jak _resync w serwerze)."""
+        _, lost_turns, t_lost = self._resync
+        self._resync = None
+        goal = None
+        if self.last_goal_set is not None and turns_now is not None:
+            left = self.last_goal_set - lost_turns
+            if left > 0:
+                # po resecie Arduino licznik zwojów startuje od 0
+                goal = self.last_goal_set if turns_now >= lost_turns else turns_now + left
+                self.last_goal_set = goal
+                self._send_raw(f"goal {goal}")
+        self.log_message(f"Połączenie przywrócone po {time.monotonic() - t_lost:.1f} s – "
+                         f"cel {goal if goal is not None else '—'}")
 
     def _handle_line(self, line: str):
-        m_state = re.search(r"\[state=(\w+)", line)
-        if m_state:
-            self.current_state = m_state.group(1)
-
-        m_turns = re.search(r"X_turns=(\d+)", line) or re.search(r"\bturns=(\d+)\b", line)
-        if m_turns:
-            try: self.current_turns = int(m_turns.group(1))
-            except ValueError: pass
-
-        m_turns_real = re.search(r"X_turns_real=([-\d\.]+)", line)
-        if m_turns_real:
-            try: self.current_turns_real = float(m_turns_real.group(1))
-            except ValueError: self.current_turns_real = None
-
-        m_rpm = re.search(r"(?i)\brpm=(\d+)\b", line)
-        if m_rpm:
-            try: self.current_rpm = int(m_rpm.group(1))
-            except ValueError:
-                self.current_rpm = None
-
-        m_y = re.search(r"\bY=([-\d\.]+)", line)
-        if m_y:
-            try: self.current_y = float(m_y.group(1))
-            except ValueError: pass
-
-        m_home = re.search(r"\b(?:Y_HOME|ENDSTOP_Y)=(\d)\b", line)
-        if m_home:
-            try: self.endstop_raw = int(m_home.group(1))
-            except ValueError: self.endstop_raw = None
-
-        m_eff = re.search(r"eff_w=([\d\.]+)\s*mm", line)
-        if m_eff:
-            try: self.eff_w = float(m_eff.group(1))
-            except ValueError: pass
+        if self.connecting and is_ready_line(line):
+            self._connect_ready()
+        t = parse_line(line)
+        if t.kind == "status" and self._resync is not None and self.is_connected:
+            self._resync_goal(t.turns)
+        if t.state is not None:
+            self.current_state = t.state
+        if t.turns is not None:
+            self.current_turns = t.turns
+        if t.turns_real is not None:
+            self.current_turns_real = t.turns_real
+        if t.rpm is not None:
+            self.current_rpm = t.rpm
+        if t.y is not None:
+            self.current_y = t.y
+        if t.endstop is not None:
+            self.endstop_raw = t.endstop
+        if t.eff_w is not None:
+            self.eff_w = t.eff_w
+        if t.kind == "status":
+            self.speed.add(self.current_turns if self.current_turns_real is None else self.current_turns_real)
+            self.history.append(self.current_state, self.current_turns, self.current_turns_real,
+                                self.current_y, self.current_rpm, self.endstop_raw)
 
         try:
             pitch = float(self.pitch_entry.get().strip())
@@ -493,7 +667,7 @@ class CoilWinderGUI:
             pass
 
         # --- Reakcja na osiągnięcie celu ---
-        if "[goal] reached" in line:
+        if t.goal_reached:
             if self.sections_mode and self.section_ptr < len(self.section_plan):
                 self.section_ptr += 1
                 self._update_sections_progress_ui()
@@ -502,38 +676,47 @@ class CoilWinderGUI:
                     self._send_raw("motoff")
                     self._send_raw("yzero")
                     if self.auto_next_var.get():
-                        self.root.after(300, self.resume_sections_or_plain)
+                        self._delay(300, self.resume_sections_or_plain)
                     else:
                         self.log_message("[sekcje] Koniec sekcji. Y=0. Wciśnij WZNÓW, aby zacząć następną sekcję.")
                 else:
-                    self.root.after(120, lambda: self._send_raw("motoff"))
+                    self._delay(120, lambda: self._send_raw("motoff"))
             else:
-                self.root.after(120, lambda: self._send_raw("motoff"))
+                self._delay(120, lambda: self._send_raw("motoff"))
 
         self._update_info_label()
         self._update_endstop_indicator()
 
     # ---------- Komendy ----------
-    def _send_raw(self, cmd: str):
-        if not (self.is_connected and self.serial_port and self.serial_port.is_open):
-            return
-        try:
-            self.serial_port.write((cmd + "\n").encode("utf-8"))
-        except serial.SerialException as e:
-            self.log_message(f"Błąd wysyłania: {e}")
-            self.disconnect()
+    def _delay(self, ms, fn):
+        self._delayed.append(self.root.after(ms, fn))
+
+    def _cancel_delayed(self):
+        for after_id in self._delayed:
+            self.root.after_cancel(after_id)
+        self._delayed = []
+
+    def _on_command_fail(self, p):
+        self.log_message(f"[cmd] {p.error}")
+
+    def _send_raw(self, *cmds: str):
+        """Komendy do Arduino; kilka naraz idzie jednym zapisem, potwierdzenia śledzi self.channel."""
+        if self.is_connected and self.channel is not None:
+            self.channel.submit_many(cmds)
 
     def send_command(self, command: str):
         self.log_message(f">>> {command}")
         low = command.strip().lower()
 
         if low in ("run", "resume"):
+            self._cancel_delayed()  # spóźniony motoff nie może zatrzymać startu
             self._send_raw("moton")
             self.has_started = True
             self.last_sent = {}
             self._update_endstop_indicator()
         elif low == "stop":
-            self.root.after(120, lambda: self._send_raw("motoff"))
+            self._cancel_delayed()  # STOP wygrywa z zaplanowanym startem następnej sekcji
+            self._delay(120, lambda: self._send_raw("motoff"))
             self.last_sent = {}
 
         if command.startswith("rpm "):
@@ -650,6 +833,7 @@ class CoilWinderGUI:
             if not plan or max(plan) <= 0:
                 self.log_message("Błąd: nieprawidłowy plan sekcji.")
                 return
+            self.history.new_segment(f"total={total} sections={sections}")
             self.sections_mode = True
             self.section_plan = plan
             self.section_ptr = 0
@@ -661,6 +845,7 @@ class CoilWinderGUI:
             self._send_raw(f"goal {first_goal}")
             self.send_command("run")
         else:
+            self.history.new_segment(f"total={total}")
             self.last_goal_set = total
             self.sections_progress_var.set("Sekcje: —")
             self.log_message(f"[całość] Start: auto-stop po {total} zwojach.")
@@ -697,6 +882,7 @@ class CoilWinderGUI:
     # ---------- Zamknięcie ----------
     def on_closing(self):
         self.disconnect()
+        self.history.close()
         self.root.destroy()
 
 
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Kanał komend z potwierdzeniami (pipelining) – nad winder_serial.SerialTransport.
+
+Firmware 5.ino potwierdza komendy jedną linią, w kolejności wykonania:
+
+    goal N   → "[goal] set N"       rpm N  → "RPM=..."
+    moton    → "MOTORS=ON"          motoff → "MOTORS=OFF"
+    yzero    → "Y zeroed at ..."    nieznana → "ERR: unknown cmd: ..."
+
+("Y zeroed by endstop (power-on)." przychodzi sam z siebie – nie potwierdza yzero.)
+
+CommandChannel wysyła komendy bez czekania na odpowiedź, ale w locie trzyma
+najwyżej max_inflight potwierdzanych komend (bufor RX Arduino ma 64 B);
+reszta czeka w kolejce i rusza, gdy przychodzą potwierdzenia. Każda przychodząca
+linia jest dopasowywana do najstarszej pasującej komendy w locie. Brak
+potwierdzenia przez timeout → ponowne wysłanie (retries), potem CommandTimeout;
+"ERR: unknown cmd" → CommandRejected. Komendy spoza tabeli (pitch, bwidth, ...)
+idą w tej samej kolejności, ale nie są śledzone.
+
+Nowsza komenda przeciwna (motoff/stop wobec moton/start i odwrotnie) zastępuje
+starszą: czekająca w kolejce nie zostanie wysłana, a ta w locie nie będzie już
+ponawiana – spóźnione ponowienie moton nie włączy silników po STOP.
+
+Czas odpowiedzi (wysłanie → przyjście linii potwierdzenia, znacznik czasu
+z transportu) trafia do histogramu per komenda – stats() dla /api/commands.
+"""
+import collections
+import threading
+import time
+
+from winder_sched import TimerWheel
+
+ACK_TIMEOUT = 0.5      # [s] na potwierdzenie (USB + pętla firmware z zapasem)
+ACK_RETRIES = 1        # ponowne wysłanie przed CommandTimeout (komendy są idempotentne)
+MAX_INFLIGHT = 4       # potwierdzanych komend w locie
+LATENCY_BOUNDS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# komenda → początek linii potwierdzenia ("goal" liczony osobno – zawiera N)
+ACK_PREFIX = {
+    "rpm": "RPM=",
+    "moton": "MOTORS=ON",
+    "motoff": "MOTORS=OFF",
+    "yzero": "Y zeroed at",
+}
+REJECT_PREFIX = "ERR: unknown cmd: "
+_ON, _OFF = ("moton", "start"), ("motoff", "stop")
+# komenda → komendy, które unieważnia (jeszcze niewysłane / niepotwierdzone)
+SUPERSEDES = dict([(c, _OFF) for c in _ON] + [(c, _ON) for c in _OFF])
+
+
+class CommandError(Exception):
+    pass
+
+
+class CommandTimeout(CommandError):
+    pass
+
+
+class CommandRejected(CommandError):
+    pass
+
+
+def ack_prefix(cmd):
+    """Początek linii potwierdzającej cmd albo None (komenda niepotwierdzana)."""
+    name, _, arg = cmd.partition(" ")
+    if name == "goal":
+        return f"[goal] set {arg.strip()}"
+    return ACK_PREFIX.get(name)
+
+
+class LatencyHistogram:
+    """Histogram czasów odpowiedzi [ms] w stałych przedziałach + liczniki błędów."""
+
+    __slots__ = ("counts", "n", "total", "max", "timeouts", "rejected", "retries")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.timeouts = 0
+        self.rejected = 0
+        self.retries = 0
+
+    def add(self, ms):
+        i = 0
+        for b in LATENCY_BOUNDS_MS:
+            if ms < b:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.n += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q):
+        """Górna granica przedziału z kwantylem q (przybliżenie z histogramu)."""
+        if not self.n:
+            return None
+        need = q * self.n
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= need and c:
+                return LATENCY_BOUNDS_MS[i] if i < len(LATENCY_BOUNDS_MS) else round(self.max, 3)
+        return round(self.max, 3)
+
+    def as_dict(self):
+        labels = [f"<{b}" for b in LATENCY_BOUNDS_MS] + [f">={LATENCY_BOUNDS_MS[-1]}"]
+        return {
+            "acked": self.n,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "mean_ms": round(self.total / self.n, 3) if self.n else None,
+            "p50_ms": self.quantile(0.50),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max, 3) if self.n else None,
+            "histogram_ms": dict(zip(labels, self.counts)),
+        }
+
+
+class PendingCommand:
+    __slots__ = ("cmd", "name", "prefix", "t_sent", "tries", "ack", "error", "superseded", "_done")
+
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.name = cmd.partition(" ")[0]
+        self.prefix = ack_prefix(cmd)
+        self.t_sent = None
+        self.tries = 0
+        self.ack = None
+        self.error = None
+        self.superseded = None      # nowsza komenda przeciwna – bez ponowień
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Czekaj na potwierdzenie; zwraca linię potwierdzenia (None dla komend niepotwierdzanych)."""
+        if not self._done.wait(timeout):
+            raise CommandTimeout(f"Brak potwierdzenia: {self.cmd}")
+        if self.error is not None:
+            raise self.error
+        return self.ack
+
+
+class CommandChannel:
+    def __init__(self, transport, timers=None, timeout=ACK_TIMEOUT, retries=ACK_RETRIES,
+                 max_inflight=MAX_INFLIGHT, on_fail=None):
+        self.transport = transport
+        self.timers = timers if timers is not None else TimerWheel()
+        self.timeout = timeout
+        self.retries = retries
+        self.max_inflight = max_inflight
+        self.on_fail = on_fail          # on_fail(PendingCommand) – timeout / odrzucenie
+        self._lock = threading.Lock()
+        self._backlog = collections.deque()
+        self._inflight = []
+        self._closed = False
+        self.sent = 0
+        self.stats_by_cmd = {}
+
+    def submit(self, cmd):
+        return self.submit_many((cmd,))[0]
+
+    def submit_many(self, cmds):
+        """Dodaj komendy do kolejki (w tej kolejności); zwraca listę PendingCommand."""
+        pend = [PendingCommand(c) for c in cmds]
+        with self._lock:
+            if self._closed:
+                for p in pend:
+                    self._finish(p, error=CommandError(f"Port zamknięty: {p.cmd}"))
+                return pend
+            for p in pend:
+                self._supersede(p)
+                self._backlog.append(p)
+            self._pump()
+        return pend
+
+    def request(self, cmd, timeout=None):
+        """submit + wait: linia potwierdzenia albo wyjątek CommandError."""
+        p = self.submit(cmd)
+        return p.wait(timeout if timeout is not None else self.timeout * (self.retries + 1) + 0.5)
+
+    def on_line(self, line, t_rx=None):
+        """Linia z portu (wątek transportu) – dopasuj do komendy w locie."""
+        if not self._inflight:
+            return
+        t = t_rx if t_rx is not None else time.monotonic()
+        with self._lock:
+            reject = line.startswith(REJECT_PREFIX)
+            bad = line[len(REJECT_PREFIX):].strip() if reject else None
+            for i, p in enumerate(self._inflight):
+                if (p.cmd == bad) if reject else line.startswith(p.prefix):
+                    del self._inflight[i]
+                    h = self._hist(p.name)
+                    if reject:
+                        h.rejected += 1
+                        self._finish(p, error=CommandRejected(line))
+                    else:
+                        h.add((t - p.t_sent) * 1000.0)
+                        self._finish(p, ack=line)
+                    self._pump()
+                    break
+            else:
+                return
+        if reject and self.on_fail is not None:
+            self.on_fail(p)
+
+    def close(self):
+        """Odrzuć wszystko, co czeka (rozłączenie)."""
+        with self._lock:
+            self._closed = True
+            left = self._inflight + list(self._backlog)
+            self._inflight = []
+            self._backlog.clear()
+            for p in left:
+                self._finish(p, error=CommandError(f"Port zamknięty: {p.cmd}"))
+
+    @property
+    def inflight(self):
+        return len(self._inflight)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "inflight": len(self._inflight),
+                "queued": len(self._backlog),
+                "commands": {k: h.as_dict() for k, h in sorted(self.stats_by_cmd.items())},
+            }
+
+    # --- wewnętrzne (pod self._lock) ---
+    def _hist(self, name):
+        h = self.stats_by_cmd.get(name)
+        if h is None:
+            h = self.stats_by_cmd[name] = LatencyHistogram()
+        return h
+
+    def _supersede(self, new):
+        """new unieważnia starsze komendy przeciwne: z kolejki wypadają, w locie – bez ponowień."""
+        names = SUPERSEDES.get(new.name)
+        if not names:
+            return
+        for p in [p for p in self._backlog if p.name in names]:
+            self._backlog.remove(p)
+            self._finish(p, error=CommandError(f"Zastąpiona przez {new.cmd}: {p.cmd}"))
+        for p in self._inflight:
+            if p.name in names:
+                p.superseded = new.cmd
+
+    def _finish(self, p, ack=None, error=None):
+        p.ack = ack
+        p.error = error
+        p._done.set()
+
+    def _pump(self):
+        """Wyślij z kolejki tyle, ile mieści okno – jednym send_many (jeden zapis)."""
+        out = []
+        backlog, inflight = self._backlog, self._inflight
+        now = time.monotonic()
+        while backlog and (backlog[0].prefix is None or len(inflight) < self.max_inflight):
+            p = backlog.popleft()
+            p.t_sent = now
+            p.tries = 1
+            out.append(p.cmd)
+            if p.prefix is None:
+                self._finish(p)
+            else:
+                inflight.append(p)
+                self.timers.schedule(self.timeout, self._expire, p, 1)
+        if out:
+            self.sent += len(out)
+            self.transport.send_many(out)
+
+    def _expire(self, p, tries):
+        failed = False
+        with self._lock:
+            if p.done or p.tries != tries or p not in self._inflight:
+                return
+            if p.superseded is not None:
+                # wysłana raz, potwierdzenie nie przyszło – nie ponawiaj po nowszej komendzie przeciwnej
+                self._inflight.remove(p)
+                self._finish(p, error=CommandError(f"Zastąpiona przez {p.superseded}: {p.cmd}"))
+                self._pump()
+                return
+            h = self._hist(p.name)
+            if p.tries <= self.retries:
+                p.tries += 1
+                p.t_sent = time.monotonic()
+                h.retries += 1
+                self.sent += 1
+                self.transport.send(p.cmd)
+                self.timers.schedule(self.timeout, self._expire, p, p.tries)
+            else:
+                self._inflight.remove(p)
+                h.timeouts += 1
+                self._finish(p, error=CommandTimeout(f"Brak potwierdzenia: {p.cmd}"))
+                self._pump()
+                failed = True
+        if failed and self.on_fail is not None:
+            self.on_fail(p)
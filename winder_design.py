@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Projekt cewki na karkasie: przegląd (sweep) średnic drutu × upakowań × liczby
+zwojów – dla każdego kandydata zwojów/warstwę, warstwy, wysokość uzwojenia
+(czy mieści się w karkasie), długość drutu, rezystancja DC i czas nawijania.
+
+Wymiary karkasu jak w GUI [mm]:
+- szer. (bobbin_w) – szerokość nawijania (to samo co bwidth dla firmware),
+- wys.  (bobbin_h) – dostępna wysokość uzwojenia (od rdzenia do krawędzi),
+- dł.   (bobbin_l) – obwód karkasu, tj. długość pierwszego zwoju.
+
+Skok (osiowo) i grubość warstwy (promieniowo) = (drut + emalia) × upakowanie,
+tak samo jak pitch liczony w GUI; każda warstwa wydłuża zwój o 2π × grubość.
+
+Z numpy cały przegląd to kilka operacji na tablicach (tysiące kandydatów
+w milisekundach); bez numpy te same wzory w pętli – wtedy limit kandydatów
+jest dużo niższy (pętla blokuje wątek żądania / GUI). W cache (per krotka
+wejściowa, bez rpm) są tylko liczności i najlepsze wiersze rankingu, nie cały
+przegląd; czas nawijania zależy tylko od rpm, więc jest doliczany przy każdym
+wywołaniu.
+"""
+import math
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# --- Parametry estymacji emalii (dla wyliczania pitch) ---
+ENAMEL_REL = 0.08   # +8% średnicy
+ENAMEL_MIN = 0.01   # min. +0.01 mm łącznie
+
+RHO_CU = 0.01724    # rezystywność miedzi w 20 °C [Ω·mm²/m]
+# średnice nominalne drutu nawojowego [mm] (szereg IEC 60317)
+WIRE_MM = (0.05, 0.063, 0.071, 0.08, 0.09, 0.1, 0.112, 0.125, 0.14, 0.16, 0.18, 0.2, 0.224, 0.25,
+           0.28, 0.315, 0.355, 0.4, 0.45, 0.5, 0.56, 0.63, 0.71, 0.8, 0.9, 1.0, 1.12, 1.25, 1.4,
+           1.6, 1.8, 2.0)
+FIELDS = ("wire", "packing", "turns", "turns_per_layer", "layers", "build_mm", "fits",
+          "length_m", "resistance_ohm", "time_min")
+MAX_CANDIDATES = 200_000 if np is not None else 10_000   # bez numpy ~0.5 s na 10k
+
+
+def effective_wire_mm(bare_mm: float) -> float:
+    """Zwróć efektywną średnicę (drut + emalia)."""
+    if bare_mm <= 0:
+        return 0.0
+    added = max(ENAMEL_MIN, ENAMEL_REL * bare_mm)
+    return bare_mm + added
+
+
+def _key(bobbin_h, bobbin_w, bobbin_l, wires, packings, turns):
+    key = (float(bobbin_h), float(bobbin_w), float(bobbin_l), tuple(float(d) for d in wires),
+           tuple(float(k) for k in packings), tuple(int(t) for t in turns))
+    if len(key[3]) * len(key[4]) * len(key[5]) > MAX_CANDIDATES:
+        raise ValueError(f"Za dużo kandydatów (max {MAX_CANDIDATES})")
+    return key
+
+
+def design(bobbin_h, bobbin_w, bobbin_l, wires=WIRE_MM, packings=(1.0,), turns=(100,), rpm=0):
+    """
+    Przegląd wszystkich kombinacji wires × packings × turns; kolumny (krotki)
+    o nazwach z FIELDS. Kandydat bez choćby jednego zwoju na warstwę ma
+    layers = 0 i NaN w polach zależnych; time_min = NaN przy rpm <= 0.
+    Bez cache – do rankingu służy design_best.
+    """
+    return _sweep(*_key(bobbin_h, bobbin_w, bobbin_l, wires, packings, turns), float(rpm))
+
+
+def design_best(bobbin_h, bobbin_w, bobbin_l, wires=WIRE_MM, packings=(1.0,), turns=(100,), rpm=0,
+                target_ohm=None, limit=20, only_fits=True):
+    """
+    Ranking jak best() + liczności: {"candidates", "fitting", "designs"}.
+    Z cache przy powtórce (inne rpm – ten sam wpis, time_min liczony od nowa).
+    """
+    candidates, fitting, rows = _ranked(*_key(bobbin_h, bobbin_w, bobbin_l, wires, packings, turns),
+                                        target_ohm, limit, only_fits)
+    rpm = float(rpm)
+    designs = [dict(r, time_min=r["turns"] / rpm if rpm > 0 else None) for r in rows]
+    return {"candidates": candidates, "fitting": fitting, "designs": designs}
+
+
+@lru_cache(maxsize=16)
+def _ranked(h, w, l0, wires, packings, turns, target_ohm, limit, only_fits):
+    """Liczności i najlepsze wiersze (bez czasu) – cache trzyma tylko top-N, nie cały przegląd."""
+    result = _sweep(h, w, l0, wires, packings, turns, 0.0)
+    return len(result["wire"]), sum(result["fits"]), tuple(best(result, target_ohm, limit, only_fits))
+
+
+def _sweep(h, w, l0, wires, packings, turns, rpm):
+    if np is not None:
+        return _sweep_numpy(h, w, l0, wires, packings, turns, rpm)
+    return _sweep_python(h, w, l0, wires, packings, turns, rpm)
+
+
+def _sweep_numpy(h, w, l0, wires, packings, turns, rpm):
+    d, k, t = (a.ravel() for a in np.meshgrid(np.array(wires), np.array(packings),
+                                              np.array(turns, dtype=np.float64), indexing="ij"))
+    eff = d + np.maximum(ENAMEL_MIN, ENAMEL_REL * d)
+    p = eff * k
+    tpl = np.floor(w / p + 1e-9)
+    ok = (tpl >= 1) & (t > 0)
+    tpl_safe = np.where(ok, tpl, 1.0)
+    n = np.where(ok, np.ceil(t / tpl_safe), 0.0)
+    full = np.maximum(n - 1.0, 0.0)
+    last = t - full * tpl_safe
+    # warstwa i (od 0): zwój o długości l0 + 2π·p·(i + 0.5); pełne warstwy 0..n-2 + ostatnia
+    length_mm = tpl_safe * (full * l0 + math.pi * p * full * full) + last * (l0 + 2.0 * math.pi * p * (n - 0.5))
+    length_m = np.where(ok, length_mm / 1000.0, np.nan)
+    build = np.where(ok, n * p, np.nan)
+    res = RHO_CU * length_m / (math.pi * d * d / 4.0)
+    minutes = t / rpm if rpm > 0 else np.full(t.shape, np.nan)
+    cols = (d, k, t.astype(np.int64), np.where(ok, tpl, 0).astype(np.int64), n.astype(np.int64),
+            build, ok & (build <= h + 1e-9), length_m, res, minutes)
+    return {name: tuple(c.tolist()) for name, c in zip(FIELDS, cols)}
+
+
+def _sweep_python(h, w, l0, wires, packings, turns, rpm):
+    out = {name: [] for name in FIELDS}
+    nan = float("nan")
+    for d in wires:
+        eff = effective_wire_mm(d)
+        for k in packings:
+            p = eff * k
+            tpl = int(w / p + 1e-9) if p > 0 else 0
+            for t in turns:
+                if tpl >= 1 and t > 0:
+                    n = -(-t // tpl)
+                    full = n - 1
+                    last = t - full * tpl
+                    length_m = (tpl * (full * l0 + math.pi * p * full * full)
+                                + last * (l0 + 2.0 * math.pi * p * (n - 0.5))) / 1000.0
+                    build = n * p
+                    res = RHO_CU * length_m / (math.pi * d * d / 4.0)
+                else:
+                    n, length_m, build, res = 0, nan, nan, nan
+                row = (d, k, t, tpl if n else 0, n, build, bool(n) and build <= h + 1e-9,
+                       length_m, res, t / rpm if rpm > 0 else nan)
+                for name, v in zip(FIELDS, row):
+                    out[name].append(v)
+    return {name: tuple(v) for name, v in out.items()}
+
+
+def best(result, target_ohm=None, limit=20, only_fits=True):
+    """
+    Najlepsze wiersze przeglądu jako listy słowników (NaN → None): z target_ohm
+    – najbliższa rezystancja, inaczej najgrubszy drut (najmniejsza rezystancja).
+    """
+    res = result["resistance_ohm"]
+    idx = [i for i, fits in enumerate(result["fits"]) if fits or not only_fits]
+    if target_ohm is not None:
+        idx.sort(key=lambda i: abs(res[i] - target_ohm) if result["layers"][i] else math.inf)
+    else:
+        idx.sort(key=lambda i: (-result["wire"][i], res[i] if result["layers"][i] else math.inf))
+    rows = []
+    for i in idx[:limit]:
+        row = {}
+        for name in FIELDS:
+            v = result[name][i]
+            row[name] = None if isinstance(v, float) and math.isnan(v) else v
+        rows.append(row)
+    return rows
+
+
+def _floats(txt, default):
+    if txt in (None, ""):
+        return default
+    return tuple(float(v) for v in str(txt).split(",") if v.strip())
+
+
+def _turns(txt, default):
+    """
+    Lista zwojów: "100,200" albo zakres "od:do:krok" (do włącznie) – jako range,
+    bez rozwijania: liczność sprawdza design_args przed budową krotki.
+    """
+    if txt in (None, ""):
+        return default
+    if ":" in str(txt):
+        parts = [int(float(v)) for v in str(txt).split(":")]
+        if len(parts) == 2:
+            parts.append(1)
+        if len(parts) != 3 or parts[2] <= 0:
+            raise ValueError
+        return range(parts[0], parts[1] + 1, parts[2])
+    return tuple(int(float(v)) for v in str(txt).split(",") if v.strip())
+
+
+def design_args(args):
+    """
+    /api/design z parametrów zapytania: h, w, l (karkas [mm]), wires (lista mm,
+    domyślnie szereg IEC), packing (lista), turns (lista albo od:do:krok),
+    rpm, ohm (docelowa rezystancja), limit, all=1 (też niemieszczące się).
+    ValueError z opisem przy złych parametrach.
+    """
+    try:
+        h, w, l0 = (float(args.get(k) or 0) for k in ("h", "w", "l"))
+        wires = _floats(args.get("wires"), WIRE_MM)
+        packings = _floats(args.get("packing"), (1.0,))
+        turns = _turns(args.get("turns"), (100,))
+        rpm = float(args.get("rpm") or 0)
+        ohm = float(args["ohm"]) if args.get("ohm") not in (None, "") else None
+        limit = max(1, min(int(args.get("limit") or 20), 1000))
+    except (TypeError, ValueError):
+        raise ValueError("Parametry projektu muszą być liczbami (turns: lista albo od:do:krok)")
+    if h <= 0 or w <= 0 or l0 <= 0:
+        raise ValueError("Wymiary karkasu (h, w, l) muszą być > 0")
+    if not wires or min(wires) <= 0 or not packings or not all(0 < k <= 1.0 for k in packings):
+        raise ValueError("Średnice drutu > 0, upakowanie w (0,1]")
+    if isinstance(turns, range):
+        # z granic – len(range) nie mieści się w ssize_t dla olbrzymich zakresów
+        n_turns, lo = max(0, -(-(turns.stop - turns.start) // turns.step)), turns.start
+    else:
+        n_turns, lo = len(turns), min(turns, default=0)
+    if not n_turns or lo <= 0:
+        raise ValueError("Zwoje muszą być > 0")
+    if len(wires) * len(packings) * n_turns > MAX_CANDIDATES:
+        raise ValueError(f"Za dużo kandydatów (max {MAX_CANDIDATES})")
+    out = design_best(h, w, l0, wires, packings, turns, rpm, ohm, limit, args.get("all") not in ("1", "true"))
+    out["numpy"] = np is not None
+    return out
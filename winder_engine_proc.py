@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Silnik nawijarki (WinderEngineRPi) w osobnym procesie.
+
+Serwer WWW (Flask, wiele wątków) i pętla kroków nie dzielą wtedy GIL-a:
+- komendy idą do procesu silnika przez bezblokadową kolejkę SPSC w pamięci
+  współdzielonej (CommandRing),
+- liczniki i stan zlecenia proces silnika publikuje co STATUS_PERIOD_SEC
+  w bloku multiprocessing.shared_memory (StatusBlock, seqlock) –
+  /api/status czyta go bez czekania na silnik.
+
+Włączenie w serwerze: WINDER_ENGINE_PROCESS=1 (patrz get_engine()).
+"""
+import json
+import multiprocessing as mp
+import os
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+from winder_ramp import ACCEL_MIN_RPM_S
+
+STATUS_PERIOD_SEC = 0.02
+RING_SLOTS = 256
+RING_SLOT_SIZE = 256
+
+_JOBS = ("IDLE", "RUN", "PAUSE")
+_PROFILES = ("trap", "scurve")
+
+
+class CommandRing:
+    """
+    Kolejka SPSC (jeden producent, jeden konsument) w pamięci współdzielonej.
+    Nagłówek: head (zapisuje tylko producent), tail (zapisuje tylko konsument);
+    sloty: u16 długość + JSON. Żadnych blokad między procesami – producent
+    najpierw wpisuje slot, potem przesuwa head. Wiele wątków po stronie serwera
+    serializuje się lokalnym Lockiem (w swoim procesie).
+    """
+
+    _HDR = struct.Struct("<QQ")
+    _LEN = struct.Struct("<H")
+
+    def __init__(self, name=None, create=False):
+        size = self._HDR.size + RING_SLOTS * RING_SLOT_SIZE
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.buf = self.shm.buf
+        if create:
+            self._HDR.pack_into(self.buf, 0, 0, 0)
+        self._put_lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def put(self, cmd, *args):
+        """Wstaw komendę. False gdy kolejka pełna (silnik nie nadąża / nie działa)."""
+        data = json.dumps([cmd, *args], separators=(",", ":")).encode("utf-8")
+        if len(data) > RING_SLOT_SIZE - self._LEN.size:
+            raise ValueError(f"Komenda za długa: {cmd}")
+        with self._put_lock:
+            head, tail = self._HDR.unpack_from(self.buf, 0)
+            if head - tail >= RING_SLOTS:
+                return False
+            off = self._HDR.size + (head % RING_SLOTS) * RING_SLOT_SIZE
+            self._LEN.pack_into(self.buf, off, len(data))
+            self.buf[off + 2:off + 2 + len(data)] = data
+            struct.pack_into("<Q", self.buf, 0, head + 1)
+        return True
+
+    def get_all(self):
+        """Zdejmij wszystkie oczekujące komendy (strona konsumenta)."""
+        head, tail = self._HDR.unpack_from(self.buf, 0)
+        out = []
+        while tail < head:
+            off = self._HDR.size + (tail % RING_SLOTS) * RING_SLOT_SIZE
+            (n,) = self._LEN.unpack_from(self.buf, off)
+            out.append(json.loads(bytes(self.buf[off + 2:off + 2 + n])))
+            tail += 1
+        struct.pack_into("<Q", self.buf, 8, tail)
+        return out
+
+    def close(self, unlink=False):
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class StatusBlock:
+    """
+    Stan silnika w pamięci współdzielonej z seqlockiem: pisarz zwiększa seq
+    (nieparzysty = w trakcie zapisu), wpisuje pola, zwiększa seq ponownie.
+    Czytelnik kopiuje pola i sprawdza, czy seq się nie zmienił – nigdy nie czeka.
+    """
+
+    _SEQ = struct.Struct("<Q")
+    # job, sections_mode, wave_mode, endstop, profile, auto_next, rt, rt_fifo, rt_mlock,
+    # gc_disabled | turns, y_pos, enc, goal, last_goal, goals_reached | section_ptr, plan_len, rpm, pid,
+    # rt_prio, rt_cpu | pitch, eff_w, ycal, accel, heartbeat | timer: waits, late_waits,
+    # pulses | sleep_overshoot_us, err_mean_us, err_max_us, pulse_mean_us, pulse_max_us
+    _DATA = struct.Struct("<10B6xqqqqqqiiiiiidddddqqqddddd")
+
+    def __init__(self, name=None, create=False):
+        self.shm = shared_memory.SharedMemory(name=name, create=create,
+                                              size=self._SEQ.size + self._DATA.size)
+        self.buf = self.shm.buf
+        if create:
+            self.buf[:] = bytes(len(self.buf))
+        self._last = None
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, values):
+        (seq,) = self._SEQ.unpack_from(self.buf, 0)
+        self._SEQ.pack_into(self.buf, 0, seq + 1)
+        self._DATA.pack_into(self.buf, self._SEQ.size, *values)
+        self._SEQ.pack_into(self.buf, 0, seq + 2)
+
+    def read(self, retries=8):
+        """Spójna kopia pól albo ostatnia dobra (gdy pisarz akurat zapisuje)."""
+        for _ in range(retries):
+            (s1,) = self._SEQ.unpack_from(self.buf, 0)
+            if s1 & 1:
+                continue
+            values = self._DATA.unpack_from(self.buf, self._SEQ.size)
+            (s2,) = self._SEQ.unpack_from(self.buf, 0)
+            if s1 == s2:
+                if s1 == 0:
+                    return None  # silnik jeszcze nic nie opublikował
+                self._last = values
+                return values
+        return self._last
+
+    def close(self, unlink=False):
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _status_values(eng):
+    """Pola StatusBlock z bieżącego stanu silnika (w procesie silnika)."""
+    p = eng.params
+    with eng._enc_lock:
+        enc = eng._enc_ticks
+    rt = eng._rt_info
+    gc_guard = eng._gc_guard
+    tm = eng.backend.timer_report()
+    return (
+        _JOBS.index(eng._job) if eng._job in _JOBS else 0,
+        1 if eng.sections_mode else 0,
+        1 if eng.wave_mode else 0,
+        1 if eng._endstop_y() else 0,
+        _PROFILES.index(p.ramp_profile) if p.ramp_profile in _PROFILES else 0,
+        1 if eng.auto_next_section else 0,
+        1 if rt.get("enabled") else 0,
+        1 if rt.get("sched") == "SCHED_FIFO" else 0,
+        1 if rt.get("mlock") else 0,
+        1 if gc_guard.enabled and gc_guard.held else 0,
+        eng._turns_x,
+        0 if eng._y_zero_req else eng._y_pos_steps,
+        enc,
+        eng._goal_turns,
+        eng.last_goal if eng.last_goal is not None else -1,
+        eng.goals_reached,
+        eng.section_ptr,
+        len(eng.section_plan),
+        p.rpm,
+        os.getpid(),
+        rt.get("priority", 0),
+        rt["cpu"][0] if rt.get("cpu") else -1,
+        p.pitch_mm,
+        p.eff_w_mm,
+        p.y_steps_per_mm,
+        p.accel_rpm_s,
+        time.time(),
+    ) + (
+        (tm["waits"], tm["late_waits"], tm["pulses"], tm["sleep_overshoot_us"],
+         tm["err_mean_us"] or 0.0, tm["err_max_us"], tm["pulse_mean_us"] or 0.0, tm["pulse_max_us"])
+        if tm else (0, 0, 0, 0.0, 0.0, 0.0, 0.0, 0.0)
+    )
+
+
+def _engine_main(ring_name, status_name, backend_kind):
+    """Główna funkcja procesu silnika: pętla kroków + obsługa kolejki + publikacja stanu."""
+    from winder_engine_rpi import WinderEngineRPi, make_backend
+
+    ring = CommandRing(ring_name)
+    status = StatusBlock(status_name)
+    eng = WinderEngineRPi(backend=make_backend(backend_kind) if backend_kind else None)
+    eng.start_thread()
+    allowed = EngineProcess.COMMANDS
+    try:
+        while True:
+            for cmd in ring.get_all():
+                name, args = cmd[0], cmd[1:]
+                if name == "shutdown":
+                    return
+                if name in allowed:
+                    try:
+                        getattr(eng, name)(*args)
+                    except Exception as e:
+                        print(f"[engine] {name}{tuple(args)}: {e}")
+            status.write(_status_values(eng))
+            time.sleep(STATUS_PERIOD_SEC)
+    finally:
+        eng.shutdown()
+        ring.close()
+        status.close()
+
+
+class EngineProcess:
+    """
+    Pełnomocnik silnika w procesie serwera – to samo API co WinderEngineRPi
+    (set_*, run/stop/resume, start_job, get_status...), ale komendy idą przez
+    CommandRing, a get_status() czyta StatusBlock.
+    """
+
+    COMMANDS = frozenset((
+        "set_rpm", "set_pitch", "set_bwidth", "set_xrev", "set_ycal", "set_accel",
+        "goal", "run", "stop", "resume", "yzero", "start_job", "resume_or_next",
+    ))
+
+    def __init__(self, backend_kind=None):
+        self._ring = CommandRing(create=True)
+        self._status = StatusBlock(create=True)
+        self._backend_kind = backend_kind
+        self._proc = None
+
+    def start(self):
+        ctx = mp.get_context("spawn")  # bez fork – serwer ma już wątki
+        self._proc = ctx.Process(target=_engine_main, name="winder-engine", daemon=True,
+                                 args=(self._ring.name, self._status.name, self._backend_kind))
+        self._proc.start()
+        return self
+
+    @property
+    def pid(self):
+        return self._proc.pid if self._proc else None
+
+    def _send(self, cmd, *args):
+        if not self._ring.put(cmd, *args):
+            raise RuntimeError("Kolejka komend silnika pełna")
+
+    def __getattr__(self, name):
+        if name in EngineProcess.COMMANDS:
+            return lambda *args: self._send(name, *args)
+        raise AttributeError(name)
+
+    def set_accel(self, v, profile=None):
+        if 0 < float(v) < ACCEL_MIN_RPM_S:   # jak WinderEngineRPi.set_accel – błąd wraca do serwera
+            raise ValueError(f"Przyspieszenie: 0 (bez rampy) albo co najmniej {ACCEL_MIN_RPM_S:g} RPM/s")
+        if profile is not None and profile not in _PROFILES:
+            raise ValueError(f"Nieznany profil: {profile}")  # jak WinderEngineRPi.set_accel
+        self._send("set_accel", v, profile)
+
+    def get_status(self):
+        from winder_engine_rpi import ENC_TICKS_PER_REV
+
+        v = self._status.read()
+        alive = bool(self._proc and self._proc.is_alive())
+        if v is None:
+            return {"connected": alive, "state": "IDLE", "engine_process": True,
+                    "engine_alive": alive, "log": []}
+        (job, sections_mode, wave_mode, endstop, profile, auto_next, rt, rt_fifo, rt_mlock,
+         gc_disabled, turns, y_pos, enc, goal, last_goal, goals_reached, section_ptr, plan_len, rpm, pid,
+         rt_prio, rt_cpu, pitch, eff_w, ycal, accel, heartbeat, t_waits, t_late, t_pulses,
+         t_over, t_err_mean, t_err_max, t_pulse_mean, t_pulse_max) = v
+        return {
+            "connected": alive,
+            "state": _JOBS[job],
+            "current_turns": turns,
+            "current_turns_real": round(enc / ENC_TICKS_PER_REV, 3) if ENC_TICKS_PER_REV else None,
+            "current_y": round(y_pos / ycal, 3) if ycal else None,
+            "current_rpm": rpm,
+            "goal_turns": goal if goal > 0 else None,
+            "goals_reached": goals_reached,
+            "accel_rpm_s": accel,
+            "ramp_profile": _PROFILES[profile],
+            "eff_w": eff_w,
+            "turns_per_layer": round(eff_w / pitch, 2) if pitch > 0 else None,
+            "endstop": endstop,
+            "sections_mode": bool(sections_mode),
+            "section_ptr": section_ptr,
+            "section_plan_len": plan_len,
+            "wave_mode": bool(wave_mode),
+            "timer": {
+                "sleep_overshoot_us": t_over,
+                "waits": t_waits,
+                "late_waits": t_late,
+                "err_mean_us": t_err_mean,
+                "err_max_us": t_err_max,
+                "pulses": t_pulses,
+                "pulse_mean_us": t_pulse_mean,
+                "pulse_max_us": t_pulse_max,
+            } if t_waits or t_pulses or t_over else None,
+            "rt": {
+                "enabled": bool(rt),
+                "sched": "SCHED_FIFO" if rt_fifo else "SCHED_OTHER",
+                "priority": rt_prio,
+                "cpu": [rt_cpu] if rt_cpu >= 0 else None,
+                "mlock": bool(rt_mlock),
+                "gc_disabled": bool(gc_disabled),
+            },
+            "engine_process": True,
+            "engine_alive": alive,
+            "engine_pid": pid,
+            "status_age_sec": round(max(0.0, time.time() - heartbeat), 3),
+            "log": [],
+        }
+
+    def shutdown(self):
+        if self._ring.buf is None:
+            return  # już zamknięty (shutdown() + atexit)
+        self._ring.put("shutdown")
+        if self._proc is not None:
+            self._proc.join(timeout=3.0)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        self._ring.close(unlink=True)
+        self._status.close(unlink=True)
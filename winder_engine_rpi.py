@@ -4,16 +4,15 @@ Silnik sterownika nawijarki – **tylko Raspberry Pi, bez Arduino**.
 Sterowanie silnikami krokowymi i odczyt enkodera/krańcówki przez GPIO.
 Użyj: winder_server_rpi.py (serwer WWW) lub zaimportuj tę klasę.
 """
+import os
 import threading
-import time
 import math
+from collections import namedtuple
 
-try:
-    import RPi.GPIO as GPIO
-    GPIO_AVAILABLE = True
-except (ImportError, RuntimeError):
-    GPIO_AVAILABLE = False
-    GPIO = None
+from winder_gpio import GPIO_AVAILABLE, HIGH, LOW, PigpioBackend, RpiGpioBackend, SimGpioBackend
+from winder_wave import WAVE_CHUNK_SEC, WaveChunk, WaveState, compile_chunk
+from winder_ramp import ACCEL_MIN_RPM_S, PROFILES, RampPlanner, ramp_table
+from winder_rt import GcGuard, apply_rt, rt_from_env
 
 # --- Piny BCM (RPi 40-pin) – dostosuj do swojego okablowania ---
 X_STEP = 17
@@ -27,10 +26,61 @@ PIN_Y_MIN = 26   # krańcówka Y (LOW = zwarta do GND)
 
 ENC_TICKS_PER_REV = 18
 STEP_PULSE_US = 2e-6  # 2 µs impuls kroku
+WAIT_SLICE_SEC = 0.01  # dłuższe odstępy między krokami (niskie RPM) czekane kawałkami
+DDA_SCALE = 1_000_000  # rozdzielczość licznika DDA: 1e-6 kroku Y na obrót
+
+
+def dda_ratio(y_steps_per_mm, pitch_mm, x_steps_per_rev):
+    """
+    Proporcja DDA X→Y jako ułamek całkowity num/den (skrócony):
+    na każdy krok X akumulator += num, a każde przekroczenie den to krok Y.
+    Po x_steps_per_rev krokach X wychodzi dokładnie Y_steps/turn – bez dryfu floata.
+    """
+    num = int(round(y_steps_per_mm * pitch_mm * DDA_SCALE))
+    den = x_steps_per_rev * DDA_SCALE if x_steps_per_rev > 0 else 1
+    if num <= 0:
+        return 0, 1
+    g = math.gcd(num, den)
+    return num // g, den // g
+
+
+def layer_limit_steps(eff_w_mm, y_steps_per_mm):
+    """Punkt odbicia warstwy w krokach Y: y_mm >= eff_w ⇔ y_pos >= ceil(eff_w·ycal)."""
+    return math.ceil(round(eff_w_mm * y_steps_per_mm, 6))
+
+
+def make_backend(kind=None, **kwargs):
+    """
+    Utwórz backend GPIO: "rpi" (RPi.GPIO), "pigpio" (DMA) lub "sim" (symulacja).
+    Domyślnie WINDER_BACKEND z env, a bez niego: rpi gdy RPi.GPIO jest dostępne,
+    inaczej symulacja w czasie rzeczywistym. Symulacja domyślnie bez zapisu zboczy
+    (serwer pracuje godzinami – zapis rośnie bez końca); benchmarki i testy podają record=True.
+    """
+    kind = kind or os.environ.get("WINDER_BACKEND") or ("rpi" if GPIO_AVAILABLE else "sim")
+    if kind == "rpi":
+        return RpiGpioBackend()
+    if kind == "pigpio":
+        return PigpioBackend(**kwargs)
+    if kind == "sim":
+        kwargs.setdefault("virtual", False)
+        kwargs.setdefault("record", False)
+        kwargs.setdefault("enc_ticks_per_rev", ENC_TICKS_PER_REV)
+        return SimGpioBackend(X_STEP, X_DIR, Y_STEP, Y_DIR, EN_PIN, ENC_A, ENC_B, PIN_Y_MIN, **kwargs)
+    raise ValueError(f"Nieznany backend GPIO: {kind}")
+
+
+# Niezmienny komplet parametrów ruchu. _recalc_derived buduje nowy obiekt i
+# publikuje go jednym przypisaniem (self._params) – pętla kroków przejmuje go
+# na granicy kroku / fragmentu, bez blokady.
+MotionParams = namedtuple("MotionParams", (
+    "rpm", "x_steps_per_rev", "x_dir_sign", "y_steps_per_mm", "pitch_mm", "eff_w_mm",
+    "y_steps_per_turn", "y_step_per_xstep", "dda_num", "dda_den", "y_limit_steps",
+    "x_interval_sec", "accel_rpm_s", "ramp_profile", "ramp",
+))
 
 
 class WinderEngineRPi:
-    def __init__(self):
+    def __init__(self, backend=None, wave=None, rt=None):
         self._lock = threading.Lock()
         self._running = False
         self._thread = None
@@ -43,14 +93,18 @@ class WinderEngineRPi:
         self._eff_w_mm = 21.85
         self._x_dir_sign = 1
         self._rpm = 200
+        # Rampa X: przyspieszenie [RPM/s] (0 = start od razu pełną prędkością) i profil
+        self._accel_rpm_s = float(os.environ.get("WINDER_ACCEL", 0) or 0)
+        self._ramp_profile = "trap"
 
-        # Stan ruchu
-        self._y_acc = 0.0
+        # Stan ruchu – zapisywany tylko przez wątek pętli kroków
+        self._y_acc = 0  # akumulator DDA (całkowity, jednostka 1/dda_den kroku Y)
         self._y_dir_sign = 1
         self._y_pos_steps = 0
         self._x_steps_mod = 0
         self._turns_x = 0
         self._goal_turns = -1
+        self._y_zero_req = False  # yzero() z innego wątku – wykona pętla
 
         # Encoder
         self._enc_ticks = 0
@@ -66,72 +120,122 @@ class WinderEngineRPi:
         self.section_plan = []
         self.section_ptr = 0
         self.last_goal = None
+        self.goals_reached = 0   # licznik osiągniętych celów – koniec zlecenia bez śledzenia RUN
         self.auto_next_section = False
 
-        self._y_steps_per_turn = 0.0
-        self._y_step_per_xstep = 0.0
-        self._x_interval_sec = 0.00005
+        self._params = None
         self._recalc_derived()
         self._gpio_ready = False
-        if GPIO_AVAILABLE:
-            self._setup_gpio()
+        self._gpio = backend if backend is not None else make_backend()
+        # Tryb "wave": ruch kompilowany do fragmentów (winder_wave) zamiast impulsu na krok.
+        if wave is None:
+            env = os.environ.get("WINDER_WAVE")
+            wave = (env == "1") if env is not None else self._gpio.hardware_wave
+        if wave and not self._gpio.wave_capable():
+            print(f"[wave] backend {self._gpio.name} nie nadaje fragmentów w tle – pętla krok po kroku")
+            wave = False
+        self.wave_mode = bool(wave)
+        # Tryb RT (winder_rt): None = wyłączony, inaczej {"priority": .., "cpu": ..}
+        # – ustawiany przez wątek pętli na starcie; _rt_info = co faktycznie uzyskano.
+        self._rt = rt if rt is not None else rt_from_env()
+        self._rt_info = {"enabled": False}
+        self._gc_guard = GcGuard(self._rt is not None)
+        self._setup_gpio()
 
     def _setup_gpio(self):
-        GPIO.setwarnings(False)
-        GPIO.setmode(GPIO.BCM)
+        gpio = self._gpio
         for pin in (X_STEP, X_DIR, Y_STEP, Y_DIR, EN_PIN):
-            GPIO.setup(pin, GPIO.OUT)
-            GPIO.output(pin, GPIO.LOW)
-        GPIO.setup(PIN_Y_MIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(ENC_A, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.setup(ENC_B, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        self._enc_prev_a = GPIO.input(ENC_A)
+            gpio.setup_output(pin, LOW)
+        gpio.setup_input(PIN_Y_MIN, pull_up=True)
+        gpio.setup_input(ENC_A, pull_up=True)
+        gpio.setup_input(ENC_B, pull_up=True)
+        self._enc_prev_a = gpio.input(ENC_A)
         try:
-            GPIO.add_event_detect(ENC_A, GPIO.BOTH, callback=self._enc_callback, bouncetime=1)
+            gpio.add_edge_callback(ENC_A, self._enc_callback)
         except Exception:
             pass
-        GPIO.output(EN_PIN, GPIO.HIGH)  # na start silniki wyłączone
+        gpio.output(EN_PIN, HIGH)  # na start silniki wyłączone
         self._gpio_ready = True
 
+    @property
+    def backend(self):
+        return self._gpio
+
+    def _enable(self, on):
+        if self._gpio_ready:
+            self._gpio.output(EN_PIN, LOW if on else HIGH)
+
     def _enc_callback(self, channel):
-        a = GPIO.input(ENC_A)
+        a = self._gpio.input(ENC_A)
         with self._enc_lock:
             if a != self._enc_prev_a:
                 self._enc_prev_a = a
                 if not a:  # zbocze opadające A
-                    b = GPIO.input(ENC_B)
+                    b = self._gpio.input(ENC_B)
                     direction = -1 if b else 1  # dostosuj jeśli kierunek odwrotny
                     self._enc_ticks += direction
 
     def _recalc_derived(self):
-        self._y_steps_per_turn = self._y_steps_per_mm * self._pitch_mm
+        """Zbuduj MotionParams z bieżących nastaw i opublikuj (wołać pod self._lock)."""
+        y_steps_per_turn = self._y_steps_per_mm * self._pitch_mm
         if self._x_steps_per_rev > 0:
-            self._y_step_per_xstep = self._y_steps_per_turn / self._x_steps_per_rev
+            y_step_per_xstep = y_steps_per_turn / self._x_steps_per_rev
         else:
-            self._y_step_per_xstep = 0.0
+            y_step_per_xstep = 0.0
+        num, den = dda_ratio(self._y_steps_per_mm, self._pitch_mm, self._x_steps_per_rev)
         sps = self._rpm * self._x_steps_per_rev / 60.0
         if sps < 1.0:
             sps = 1.0
-        self._x_interval_sec = 1.0 / sps
+        self._params = MotionParams(
+            rpm=self._rpm,
+            x_steps_per_rev=self._x_steps_per_rev,
+            x_dir_sign=self._x_dir_sign,
+            y_steps_per_mm=self._y_steps_per_mm,
+            pitch_mm=self._pitch_mm,
+            eff_w_mm=self._eff_w_mm,
+            y_steps_per_turn=y_steps_per_turn,
+            y_step_per_xstep=y_step_per_xstep,
+            dda_num=num,
+            dda_den=den,
+            y_limit_steps=layer_limit_steps(self._eff_w_mm, self._y_steps_per_mm),
+            x_interval_sec=1.0 / sps,
+            accel_rpm_s=self._accel_rpm_s,
+            ramp_profile=self._ramp_profile,
+            ramp=ramp_table(self._rpm, self._accel_rpm_s, self._x_steps_per_rev, self._ramp_profile),
+        )
+
+    @property
+    def params(self):
+        """Aktualny (niezmienny) komplet parametrów ruchu."""
+        return self._params
 
     def _y_mm(self):
-        return self._y_pos_steps / self._y_steps_per_mm
+        return self._y_pos_steps / self._params.y_steps_per_mm
 
     def _step_pulse(self, pin):
-        if not self._gpio_ready or not GPIO_AVAILABLE:
+        if not self._gpio_ready:
             return
-        GPIO.output(pin, GPIO.HIGH)
-        time.sleep(STEP_PULSE_US)
-        GPIO.output(pin, GPIO.LOW)
+        self._gpio.pulse(pin, STEP_PULSE_US)
 
     def _endstop_y(self):
-        if not self._gpio_ready or not GPIO_AVAILABLE:
+        if not self._gpio_ready:
             return False
-        return GPIO.input(PIN_Y_MIN) == GPIO.LOW
+        return self._gpio.input(PIN_Y_MIN) == LOW
+
+    def _warm_ramp(self, rpm=None, xrev=None, accel=None, profile=None):
+        """
+        Zbuduj tablicę rampy dla nowych nastaw przed self._lock – długa budowa
+        nie wstrzymuje pętli kroków ani /api/status; _recalc_derived trafia w cache.
+        """
+        ramp_table(self._rpm if rpm is None else rpm,
+                   self._accel_rpm_s if accel is None else accel,
+                   self._x_steps_per_rev if xrev is None else xrev,
+                   self._ramp_profile if profile is None else profile)
 
     def set_rpm(self, v):
+        v = max(1, min(5000, int(v)))
+        self._warm_ramp(rpm=v)
         with self._lock:
-            v = max(1, min(5000, int(v)))
             self._rpm = v
             self._recalc_derived()
 
@@ -147,17 +251,15 @@ class WinderEngineRPi:
             if v <= 0:
                 return
             self._eff_w_mm = float(v)
+            self._recalc_derived()
 
     def set_xrev(self, v):
+        v = int(v)
+        sign = -1 if v < 0 else 1
+        v = max(1, abs(v))
+        self._warm_ramp(xrev=v)
         with self._lock:
-            v = int(v)
-            if v < 0:
-                self._x_dir_sign = -1
-                v = abs(v)
-            else:
-                self._x_dir_sign = 1
-            if v < 1:
-                v = 1
+            self._x_dir_sign = sign
             self._x_steps_per_rev = v
             self._recalc_derived()
 
@@ -168,9 +270,27 @@ class WinderEngineRPi:
             self._y_steps_per_mm = float(v)
             self._recalc_derived()
 
-    def goal(self, n):
+    def set_accel(self, v, profile=None):
+        """
+        Przyspieszenie/hamowanie wrzeciona [RPM/s]; 0 = bez rampy, inaczej
+        >= ACCEL_MIN_RPM_S (ValueError). profile: trap | scurve.
+        """
+        v = float(v)
+        if v < 0:
+            return
+        if 0 < v < ACCEL_MIN_RPM_S:
+            raise ValueError(f"Przyspieszenie: 0 (bez rampy) albo co najmniej {ACCEL_MIN_RPM_S:g} RPM/s")
+        if profile is not None and profile not in PROFILES:
+            raise ValueError(f"Nieznany profil: {profile}")
+        self._warm_ramp(accel=v, profile=profile)
         with self._lock:
-            self._goal_turns = n if n > 0 else -1
+            if profile is not None:
+                self._ramp_profile = profile
+            self._accel_rpm_s = v
+            self._recalc_derived()
+
+    def goal(self, n):
+        self._goal_turns = n if n > 0 else -1
 
     def run(self):
         with self._lock:
@@ -181,35 +301,35 @@ class WinderEngineRPi:
             self._enc_ticks = 0
             self._recalc_derived()
             self._job = "RUN"
-        if self._gpio_ready and GPIO_AVAILABLE:
-            GPIO.output(EN_PIN, GPIO.LOW)
+        self._enable(True)
 
     def stop(self):
         with self._lock:
             self._job = "PAUSE"
-        if self._gpio_ready and GPIO_AVAILABLE:
-            time.sleep(0.12)
-            GPIO.output(EN_PIN, GPIO.HIGH)
+        if self._gpio_ready:
+            self._gpio.sleep(0.12)
+            self._enable(False)
 
     def resume(self):
         with self._lock:
             if self._job == "RUN":
                 return
             self._job = "RUN"
-        if self._gpio_ready and GPIO_AVAILABLE:
-            GPIO.output(EN_PIN, GPIO.LOW)
+        self._enable(True)
 
     def yzero(self):
-        with self._lock:
+        if self._thread is None:
             self._y_pos_steps = 0
+        else:
+            self._y_zero_req = True  # pozycję Y zmienia tylko wątek pętli
 
     def get_status(self):
-        with self._lock:
-            job = self._job
-            turns = self._turns_x
-            y_pos = self._y_pos_steps
-            eff_w = self._eff_w_mm
-            pitch = self._pitch_mm
+        p = self._params
+        job = self._job
+        turns = self._turns_x
+        y_pos = 0 if self._y_zero_req else self._y_pos_steps
+        eff_w = p.eff_w_mm
+        pitch = p.pitch_mm
         with self._enc_lock:
             enc = self._enc_ticks
         turns_per_layer = (eff_w / pitch) if pitch > 0 else None
@@ -220,88 +340,272 @@ class WinderEngineRPi:
             "state": job,
             "current_turns": turns,
             "current_turns_real": round(real_turns, 3) if real_turns is not None else None,
-            "current_y": round(y_pos / self._y_steps_per_mm, 3) if self._y_steps_per_mm else None,
-            "current_rpm": self._rpm,
+            "current_y": round(y_pos / p.y_steps_per_mm, 3) if p.y_steps_per_mm else None,
+            "current_rpm": p.rpm,
+            "goal_turns": self._goal_turns if self._goal_turns > 0 else None,
+            "goals_reached": self.goals_reached,
+            "accel_rpm_s": p.accel_rpm_s,
+            "ramp_profile": p.ramp_profile,
             "eff_w": eff_w,
             "turns_per_layer": round(turns_per_layer, 2) if turns_per_layer is not None else None,
             "endstop": 1 if endstop else 0,
             "sections_mode": self.sections_mode,
             "section_ptr": self.section_ptr,
             "section_plan_len": len(self.section_plan),
+            "wave_mode": self.wave_mode,
+            "timer": self._gpio.timer_report(),
+            "rt": dict(self._rt_info, gc_disabled=self._gc_guard.held and self._gc_guard.enabled),
             "log": [],
         }
 
+    def _check_y_home(self):
+        """One-shot Y zero z krańcówki (jak w firmware) + zaległe yzero()."""
+        if self._y_zero_req:
+            self._y_zero_req = False
+            self._y_pos_steps = 0
+        if self._endstop_y():
+            if self._y_home_armed and not self._y_home_done:
+                self._y_pos_steps = 0
+                self._y_home_done = True
+                self._y_home_armed = False
+        else:
+            self._y_home_done = False
+
     def _run_loop(self):
-        self._recalc_derived()
-        next_x_time = time.perf_counter()
+        if self._rt is not None:
+            self._rt_info = apply_rt(**self._rt)
+            for err in self._rt_info["errors"]:
+                print(f"[rt] {err}")
+        self._gpio.calibrate_timer()  # po ustawieniu RT – przestrzał sleep() w docelowych warunkach
+        try:
+            if self.wave_mode:
+                self._run_loop_wave()
+            else:
+                self._run_loop_step()
+        finally:
+            self._gc_guard.release()
+
+    def _run_loop_step(self):
+        """
+        Pętla krok-po-kroku. Stan ruchu trzymany w zmiennych lokalnych (zapis do
+        self po każdym kroku – dla get_status), parametry rozpakowane przy zmianie
+        MotionParams, DIR wysyłany tylko przy zmianie, krańcówka czytana tylko
+        w bezczynności i przy ruchu Y w stronę zera, dopóki bazowanie jest uzbrojone.
+        W stanie ustalonym pętla nie tworzy trwałych obiektów (bench_alloc.py).
+        """
+        gpio = self._gpio
+        clock = gpio.clock
+        sleep = gpio.sleep
+        wait_until = gpio.wait_until
+        output = gpio.output
+        pulse = gpio.pulse
+        input_ = gpio.input
+        p = None
+        ramp = RampPlanner()
+        gc_guard = self._gc_guard
+        active = False
+        next_x_time = clock()
+        x_mod = turns = y_acc = y_pos = 0
+        y_dir = 1
+        xrev = num = den = y_limit = 0
+        interval = 0.0
         while self._running:
-            job = self._job
-            # One-shot Y zero z krańcówki
-            if self._y_home_armed and not self._y_home_done and self._endstop_y():
-                with self._lock:
-                    self._y_pos_steps = 0
-                    self._y_home_done = True
-                    self._y_home_armed = False
-            elif not self._endstop_y():
-                self._y_home_done = False
-
-            if job != "RUN":
-                next_x_time = time.perf_counter()
-                time.sleep(0.05)
+            if self._job != "RUN":
+                active = False
+                gc_guard.release()
+                self._check_y_home()
+                sleep(0.05)
                 continue
-
-            now = time.perf_counter()
+            if not active:
+                # Start / wznowienie: przejmij stan (run() mógł go wyzerować) i parametry
+                gc_guard.hold()
+                self._check_y_home()
+                x_mod = self._x_steps_mod
+                turns = self._turns_x
+                y_acc = self._y_acc
+                y_dir = self._y_dir_sign
+                y_pos = self._y_pos_steps
+                output(Y_DIR, HIGH if y_dir > 0 else LOW)
+                p = None
+                ramp.reset()
+                next_x_time = clock()  # bez serii zaległych kroków po przestoju
+                active = True
+
+            q = self._params
+            if q is not p:
+                # Granica kroku: nowe parametry (bez blokady)
+                if p is not None and q.dda_den != p.dda_den:
+                    y_acc = y_acc * q.dda_den // p.dda_den  # zachowaj ułamek kroku
+                if p is None or q.x_dir_sign != p.x_dir_sign:
+                    output(X_DIR, HIGH if q.x_dir_sign > 0 else LOW)
+                if p is None:
+                    ramp.table, ramp.n, ramp.cruise = q.ramp, len(q.ramp), q.x_interval_sec
+                    ramp.fresh = False   # pierwszy krok po starcie idzie w tej iteracji
+                else:
+                    ramp.retarget(q.ramp, q.x_interval_sec)
+                p = q
+                xrev = p.x_steps_per_rev
+                num = p.dda_num
+                den = p.dda_den
+                y_limit = p.y_limit_steps
+                interval = p.x_interval_sec
+            ramp_on = ramp.table
+
+            if self._y_zero_req:
+                self._y_zero_req = False
+                y_pos = self._y_pos_steps = 0
+
+            now = clock()
             if now < next_x_time:
-                time.sleep(min(0.001, next_x_time - now))
+                if next_x_time - now > WAIT_SLICE_SEC:
+                    sleep(WAIT_SLICE_SEC / 2)  # co jakiś czas sprawdź stop / yzero
+                    continue
+                wait_until(next_x_time)
+
+            goal = self._goal_turns
+            if ramp_on:
+                next_x_time += ramp.next_interval((goal - turns) * xrev - x_mod if goal > 0 else None)
+            else:
+                next_x_time += interval
+
+            pulse(X_STEP, STEP_PULSE_US)
+            x_mod += 1
+            if x_mod >= xrev:
+                x_mod -= xrev
+                turns += 1
+                self._turns_x = turns
+                if goal > 0 and turns >= goal:
+                    self._x_steps_mod = x_mod
+                    self._y_acc = y_acc
+                    self._job = "PAUSE"
+                    self._enable(False)
+                    active = False
+                    self._on_goal_reached()
+                    continue
+            self._x_steps_mod = x_mod
+
+            y_acc += num
+            while y_acc >= den:
+                y_acc -= den
+                if y_dir > 0:
+                    if y_pos >= y_limit:
+                        y_dir = self._y_dir_sign = -1
+                        output(Y_DIR, LOW)
+                elif y_pos <= 0:
+                    y_dir = self._y_dir_sign = 1
+                    output(Y_DIR, HIGH)
+                y_pos += y_dir
+                pulse(Y_STEP, STEP_PULSE_US)
+                if y_dir < 0 and self._y_home_armed and input_(PIN_Y_MIN) == LOW:
+                    self._check_y_home()
+                    y_pos = self._y_pos_steps
+                else:
+                    self._y_pos_steps = y_pos
+            self._y_acc = y_acc
+
+    def _run_loop_wave(self):
+        """
+        Pętla trybu "wave": kompiluje po WAVE_CHUNK_SEC ruchu i przekazuje
+        fragment do backendu (play_waveform). Parametry przejmowane raz na fragment.
+        """
+        gpio = self._gpio
+        clock = gpio.clock
+        sleep = gpio.sleep
+        pins = (X_STEP, X_DIR, Y_STEP, Y_DIR)
+        pulse_ns = int(STEP_PULSE_US * 1e9)
+        chunk = WaveChunk()
+        st = WaveState()
+        p = self._params
+        ramp = RampPlanner(p.ramp, p.x_interval_sec)
+        gc_guard = self._gc_guard
+        t0 = clock()
+        while self._running:
+            self._check_y_home()
+            if self._job != "RUN":
+                gc_guard.release()
+                sleep(0.05)
+                t0 = clock()
+                ramp.reset()
                 continue
+            if not gc_guard.held:
+                gc_guard.hold()
+                t0 = clock()
+
+            q = self._params
+            if q is not p:
+                if q.dda_den != p.dda_den:
+                    self._y_acc = self._y_acc * q.dda_den // p.dda_den
+                p = q
+                ramp.retarget(p.ramp, p.x_interval_sec)
+            st.x_steps_mod = self._x_steps_mod
+            st.turns = self._turns_x
+            st.y_acc = self._y_acc
+            st.y_dir = self._y_dir_sign
+            st.y_pos = self._y_pos_steps
+            n = max(1, int(WAVE_CHUNK_SEC / p.x_interval_sec))
+            compile_chunk(chunk, st, n, int(round(p.x_interval_sec * 1e9)), pulse_ns,
+                          p.x_steps_per_rev, p.x_dir_sign, p.dda_num, p.dda_den,
+                          p.y_limit_steps, self._goal_turns, ramp if ramp.table else None)
+            ramp.fresh = False   # fragment ma kroki – retarget już od bieżącej prędkości
+
+            now = clock()
+            if t0 < now - WAVE_CHUNK_SEC:
+                t0 = now  # po przestoju (np. GC) nie nadrabiaj serią kroków
+            gpio.play_waveform(chunk.t_ns, chunk.ops, t0, pins, chunk.duration_ns)
+            t0 += chunk.duration_ns * 1e-9
+
+            self._x_steps_mod = st.x_steps_mod
+            self._turns_x = st.turns
+            self._y_acc = st.y_acc
+            self._y_dir_sign = st.y_dir
+            self._y_pos_steps = st.y_pos
+            if chunk.goal_reached:
+                self._job = "PAUSE"
+                gpio.wait_waveform()
+                self._enable(False)
+                self._on_goal_reached()
+
+    def start_job(self, total, sections=0, auto_next=False, plan=None):
+        """Start zlecenia: całość albo podział na sekcje (jak START w GUI); plan – gotowa lista zwojów na sekcję."""
+        self.auto_next_section = bool(auto_next)
+        self.sections_mode = False
+        self.section_plan = []
+        self.section_ptr = 0
+        self.last_goal = None
+        if plan:
+            plan = [int(v) for v in plan]
+        elif sections > 0:
+            per = total // sections
+            rem = total % sections
+            plan = [per + (1 if i < rem else 0) for i in range(sections)]
+        if plan:
+            self.sections_mode = True
+            self.section_plan = plan
+            self.section_ptr = 0
+            self.last_goal = plan[0]
+            self.goal(plan[0])
+        else:
+            self.goal(total)
+        self.run()
 
-            interval = getattr(self, "_x_interval_sec", 0.00005)
-            next_x_time += interval
-
-            # Kierunek X
-            if self._gpio_ready and GPIO_AVAILABLE:
-                GPIO.output(X_DIR, GPIO.HIGH if self._x_dir_sign > 0 else GPIO.LOW)
-                self._step_pulse(X_STEP)
-
-            with self._lock:
-                self._x_steps_mod += 1
-                if self._x_steps_per_rev and self._x_steps_mod >= self._x_steps_per_rev:
-                    self._x_steps_mod -= self._x_steps_per_rev
-                    self._turns_x += 1
-                    if self._goal_turns > 0 and self._turns_x >= self._goal_turns:
-                        self._job = "PAUSE"
-                        if GPIO_AVAILABLE:
-                            GPIO.output(EN_PIN, GPIO.HIGH)
-                        self._on_goal_reached()
-                        continue
-
-                self._y_acc += self._y_step_per_xstep
-
-            while self._y_acc >= 1.0:
-                self._y_acc -= 1.0
-                y_mm = self._y_mm()
-                with self._lock:
-                    if self._y_dir_sign > 0 and y_mm >= self._eff_w_mm:
-                        self._y_dir_sign = -1
-                    elif self._y_dir_sign < 0 and y_mm <= 0.0:
-                        self._y_dir_sign = 1
-                    direction = self._y_dir_sign
-                    self._y_pos_steps += direction
-                if self._gpio_ready and GPIO_AVAILABLE:
-                    GPIO.output(Y_DIR, GPIO.HIGH if direction > 0 else GPIO.LOW)
-                    self._step_pulse(Y_STEP)
+    def resume_or_next(self):
+        """WZNÓW: w trybie sekcji start następnej sekcji, inaczej zwykłe resume."""
+        if self.sections_mode and self.section_ptr < len(self.section_plan):
+            self._start_next_section()
+        else:
+            self.resume()
 
     def _on_goal_reached(self):
         """Wywołane gdy goal osiągnięty – dla sekcji / auto-next."""
+        self.goals_reached += 1
         if self.sections_mode and self.section_ptr < len(self.section_plan):
             self.section_ptr += 1
             if self.section_ptr < len(self.section_plan):
-                time.sleep(0.12)
-                if GPIO_AVAILABLE:
-                    GPIO.output(EN_PIN, GPIO.HIGH)
+                self._gpio.sleep(0.12)
+                self._enable(False)
                 self.yzero()
                 if self.auto_next_section:
-                    time.sleep(0.3)
+                    self._gpio.sleep(0.3)
                     self._start_next_section()
             else:
                 pass  # koniec wszystkich sekcji
@@ -316,8 +620,7 @@ class WinderEngineRPi:
             self.last_goal = self._turns_x + next_size
             self._goal_turns = self.last_goal
             self._job = "RUN"
-        if GPIO_AVAILABLE:
-            GPIO.output(EN_PIN, GPIO.LOW)
+        self._enable(True)
 
     def start_thread(self):
         if self._thread is not None:
@@ -329,15 +632,10 @@ class WinderEngineRPi:
     def shutdown(self):
         self._running = False
         self._job = "PAUSE"
-        if self._gpio_ready and GPIO_AVAILABLE:
-            GPIO.output(EN_PIN, GPIO.HIGH)
+        self._enable(False)
         if self._thread:
             self._thread.join(timeout=2.0)
-        if GPIO_AVAILABLE:
-            try:
-                GPIO.cleanup()
-            except Exception:
-                pass
+        self._gpio.cleanup()
 
 
 # Singleton dla serwera
@@ -346,6 +644,14 @@ _engine = None
 def get_engine():
     global _engine
     if _engine is None:
-        _engine = WinderEngineRPi()
-        _engine.start_thread()
+        if os.environ.get("WINDER_ENGINE_PROCESS") == "1":
+            # silnik w osobnym procesie (winder_engine_proc) – bez wspólnego GIL-a z serwerem
+            import atexit
+            from winder_engine_proc import EngineProcess
+
+            _engine = EngineProcess(os.environ.get("WINDER_BACKEND")).start()
+            atexit.register(_engine.shutdown)
+        else:
+            _engine = WinderEngineRPi()
+            _engine.start_thread()
     return _engine
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Strumień zmian stanu dla przeglądarek (Server-Sent Events) – wspólny dla
+winder_server.py (Arduino) i winder_server_rpi.py (GPIO).
+
+StatusHub trzyma bieżący stan (słownik pól jak w /api/status), a linie logu
+LogRing (bufor cykliczny z numerami linii – ten sam obsługuje /api/log?since=).
+Serwer wywołuje update(...) / log(line), a każdy klient /api/events dostaje:
+
+    event: status   data: {tylko pola, które się zmieniły}   (pierwszy raz – wszystkie)
+    event: log      data: {"seq": n, "lines": [...], "reset": bool}
+
+Ten sam stan służy /api/status: status_json() zwraca wersję (rośnie przy każdej
+zmianie pól stanu) i gotowe bajty JSON, budowane raz na wersję i wspólne dla
+wszystkich klientów – z ETagiem "epoka-wersja" serwer odpowiada 304, gdy nic się
+nie zmieniło. Linie logu mają własny licznik (log_ring.last_seq, nagłówek
+X-Log-Seq) – w trakcie nawijania przychodzą ciągle i nie mogą unieważniać ETagu.
+
+Zmiany nie są kolejkowane per klient: klient pamięta, co już wysłał, i po
+wybudzeniu liczy różnicę do bieżącego stanu. Wolny klient (słabe WiFi) dostaje
+więc po prostu rzadsze, zbiorcze różnice – pamięć nie rośnie, a zmiany
+z okna min_interval są sklejane w jedno zdarzenie. Jeśli klient zgubi linie
+logu (wypadły z bufora), dostaje "reset": true z tym, co zostało.
+"""
+import json
+import threading
+import time
+
+SSE_MIN_INTERVAL = 0.1      # maks. ~10 zdarzeń/s na klienta (sklejanie zmian)
+SSE_KEEPALIVE = 15.0        # komentarz ": ping" – proxy/telefony nie zrywają połączenia
+SSE_LOG_BACKLOG = 30        # ile ostatnich linii logu dostaje nowy klient
+STATUS_DEMAND_SEC = 5.0     # poller działa jeszcze tyle po ostatnim /api/status
+
+_MISSING = object()
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class LogRing:
+    """
+    Bufor cykliczny linii logu o stałym rozmiarze. Każda linia dostaje kolejny
+    numer seq (od 1, nie resetowany przez clear()); linia seq leży w _buf[seq % size].
+    since(cursor) zwraca linie po cursor i informację o luce, gdy część linii
+    wypadła już z bufora – klient wie, że coś stracił.
+    """
+
+    def __init__(self, size=200):
+        self.size = size
+        self._buf = [None] * size
+        self._lock = threading.Lock()
+        self.last_seq = 0           # numer ostatniej linii
+        self._first = 1             # najstarszy numer jeszcze w buforze
+
+    def append(self, line):
+        with self._lock:
+            seq = self.last_seq + 1
+            self._buf[seq % self.size] = line
+            self.last_seq = seq
+            if seq - self._first >= self.size:
+                self._first = seq - self.size + 1
+            return seq
+
+    def clear(self):
+        """Opróżnij bufor (np. nowe połączenie) – numeracja biegnie dalej."""
+        with self._lock:
+            self._first = self.last_seq + 1
+
+    @property
+    def first_seq(self):
+        return self._first
+
+    def since(self, cursor=0, limit=None):
+        """
+        Linie o numerach > cursor (najstarsze pierwsze, maks. limit).
+        Zwraca (linie, seq pierwszej zwróconej, seq ostatniej zwróconej = nowy cursor,
+        liczba utraconych linii między cursor a buforem).
+        """
+        with self._lock:
+            first, last = self._first, self.last_seq
+            start = max(cursor + 1, first)
+            lost = max(0, first - cursor - 1) if cursor < last else 0
+            end = last if limit is None else min(last, start + limit - 1)
+            buf, size = self._buf, self.size
+            lines = [buf[i % size] for i in range(start, end + 1)]
+        return lines, start, max(cursor, end), lost
+
+    def tail(self, n):
+        """Ostatnie n linii."""
+        with self._lock:
+            first, last = max(self._first, self.last_seq - n + 1), self.last_seq
+            return [self._buf[i % self.size] for i in range(first, last + 1)]
+
+
+class StatusHub:
+    def __init__(self, log=None, min_interval=SSE_MIN_INTERVAL, keepalive=SSE_KEEPALIVE):
+        self._cond = threading.Condition()
+        self._state = {}
+        self._version = 0           # stan lub log (budzi klientów SSE)
+        self.status_version = 0     # tylko pola stanu (ETag /api/status); log – log_ring.last_seq
+        self.epoch = f"{int(time.time()):x}"   # ETag z poprzedniego uruchomienia nie pasuje
+        self._json = b"{}"
+        self._json_version = 0
+        self._updated_at = 0.0
+        self._demand_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self.log_ring = log if log is not None else LogRing()
+        self.min_interval = min_interval
+        self.keepalive = keepalive
+        self.clients = 0
+        self._poller = None
+
+    def update(self, fields):
+        """Nowe wartości pól stanu; klienci są budzeni tylko przy faktycznej zmianie."""
+        with self._cond:
+            state = self._state
+            changed = False
+            for k, v in fields.items():
+                if state.get(k, _MISSING) != v:
+                    state[k] = v
+                    changed = True
+            self._updated_at = time.monotonic()
+            if changed:
+                self._version += 1
+                self.status_version += 1
+                self._cond.notify_all()
+
+    def log(self, line):
+        """Nowa linia logu – budzi klientów SSE, ale nie zmienia wersji stanu (ETag)."""
+        self.log_ring.append(line)
+        with self._cond:
+            self._version += 1
+            self._cond.notify_all()
+
+    @property
+    def log_seq(self):
+        return self.log_ring.last_seq
+
+    def status_json(self, refresh=None, max_age=0.0):
+        """
+        (wersja, bajty JSON) bieżącego stanu – serializacja raz na wersję.
+        refresh/max_age: gdy stan starszy niż max_age [s] (poller śpi bez
+        klientów), najpierw update(refresh()) – jeden raz dla równoległych żądań.
+        """
+        self._demand_at = time.monotonic()
+        if refresh is not None and self._demand_at - self._updated_at > max_age:
+            with self._refresh_lock:
+                if time.monotonic() - self._updated_at > max_age:
+                    self.update(refresh())
+        with self._cond:
+            if self._json_version != self.status_version:
+                self._json = json.dumps(self._state, separators=(",", ":")).encode("utf-8")
+                self._json_version = self.status_version
+            return self._json_version, self._json
+
+    def wait(self, seen, timeout=None):
+        """Czekaj na stan nowszy niż wersja seen; zwraca (status_version, kopia stanu)."""
+        with self._cond:
+            if self.status_version == seen:
+                self._cond.wait(timeout)
+            return self.status_version, dict(self._state)
+
+    def etag(self, version):
+        return f'"{self.epoch}-{version}"'
+
+    def start_poller(self, fn, period=SSE_MIN_INTERVAL):
+        """
+        Wątek: co period wywołuj update(fn()) – tylko gdy ktoś słucha (SSE albo
+        /api/status w ostatnich STATUS_DEMAND_SEC), np. silnik RPi bez zdarzeń.
+        """
+        if self._poller is not None:
+            return
+
+        def loop():
+            while True:
+                if self.clients or time.monotonic() - self._demand_at < STATUS_DEMAND_SEC:
+                    try:
+                        self.update(fn())
+                    except Exception as e:
+                        print(f"[events] {e}")
+                time.sleep(period)
+
+        self._poller = threading.Thread(target=loop, daemon=True)
+        self._poller.start()
+
+    def stream(self):
+        """Generator tekstu SSE dla jednego klienta (Flask: Response(hub.stream(), ...))."""
+        cond = self._cond
+        with cond:
+            self.clients += 1
+            sent = dict(self._state)
+            seen = self._version
+        lines, _, cursor, _ = self.log_ring.since(max(0, self.log_ring.last_seq - SSE_LOG_BACKLOG))
+        try:
+            yield "retry: 3000\n\n"
+            yield sse_event("status", sent)
+            yield sse_event("log", {"seq": cursor, "lines": lines, "reset": True})
+            while True:
+                with cond:
+                    if self._version == seen:
+                        cond.wait(self.keepalive)
+                    if self._version == seen:
+                        idle = True
+                    else:
+                        idle = False
+                        seen = self._version
+                        cur = dict(self._state)
+                if idle:
+                    yield ": ping\n\n"
+                    continue
+                lines, _, cursor, lost = self.log_ring.since(cursor)
+                gap = lost > 0
+                delta = {k: v for k, v in cur.items() if sent.get(k, _MISSING) != v}
+                if delta:
+                    yield sse_event("status", delta)
+                    sent = cur
+                if lines or gap:
+                    yield sse_event("log", {"seq": cursor, "lines": lines, "reset": gap})
+                time.sleep(self.min_interval)   # zmiany z tego okna pójdą jednym zdarzeniem
+        finally:
+            with cond:
+                self.clients -= 1
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Brama floty: jeden adres dla wielu nawijarek (węzłów) – każdy węzeł to osobny
+winder_server.py albo winder_server_rpi.py (port 5000), także jedna maszyna
+serwera wielomaszynowego (adres z /api/machines/<id>).
+
+- Do każdego węzła pula połączeń HTTP keep-alive (http.client) – bez nowego
+  TCP na każde zapytanie.
+- /api/status bramy to stan całej floty: jedno odpytanie wszystkich węzłów
+  naraz (pula wątków; ten sam ETag co poprzednio – stanu nie parsujemy
+  ponownie), wspólne dla wszystkich klientów w oknie STATUS_MAX_AGE (StatusHub).
+  Bez If-None-Match: waitress zamyka połączenie po każdej odpowiedzi 304.
+  Węzeł nieosiągalny jest pomijany przez DOWN_RETRY s.
+- Kolejka zleceń (total, sections, auto_next, rpm, pitch, bwidth): wątek
+  dyspozytora wysyła następne zlecenie do wolnego węzła (połączony, nie RUN,
+  bez zlecenia) – rpm/pitch/bwidth, potem start – i uznaje je za skończone,
+  gdy węzeł stanie z current_turns >= total.
+
+    WINDER_NODES="a=http://192.168.1.21:5000,b=192.168.1.22:5000" python3 winder_fleet.py
+"""
+import collections
+import http.client
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from flask import Flask, Response, request, jsonify
+
+from winder_events import StatusHub
+
+NODE_TIMEOUT = 2.0      # [s] na odpowiedź węzła (/api/start serwera Arduino czeka do ~1.5 s na ack)
+POOL_SIZE = 4           # wolnych połączeń keep-alive trzymanych na węzeł
+FANOUT_WORKERS = 32     # równoległych zapytań przy odpytywaniu floty
+STATUS_MAX_AGE = 0.25   # [s] stan floty młodszy niż tyle – bez ponownego odpytania
+DISPATCH_SEC = 0.2      # okres wątku dyspozytora
+DOWN_RETRY = 5.0        # [s] węzeł nie odpowiada – następna próba po tylu
+JOBS_KEEP = 200         # ile zakończonych zleceń pamiętać
+JOB_PARAMS = ("rpm", "pitch", "bwidth")
+
+
+class NodeError(Exception):
+    pass
+
+
+class NodeRejected(NodeError):
+    """Węzeł odpowiedział, ale odrzucił komendę (ok: false / HTTP 4xx-5xx)."""
+
+
+class Node:
+    """Jeden węzeł (serwer nawijarki) + pula połączeń keep-alive do niego."""
+
+    def __init__(self, nid, url):
+        u = urlsplit(url if "//" in url else "http://" + url)
+        self.id = nid
+        self.url = f"{u.scheme}://{u.netloc}{u.path.rstrip('/')}"
+        self.host = u.hostname
+        self.port = u.port or 80
+        self.base = u.path.rstrip("/") or "/api"
+        self._pool = []
+        self._lock = threading.Lock()
+        self.status = None          # ostatni stan z /api/status
+        self.etag = None
+        self.error = None
+        self.t_seen = 0.0           # monotonic ostatniej odpowiedzi
+        self.down_until = 0.0
+        self.job = None             # zlecenie w toku (Job)
+        self.requests = 0
+        self.connects = 0
+        self.unchanged = 0
+
+    @property
+    def reachable(self):
+        return self.error is None and self.status is not None
+
+    @property
+    def idle(self):
+        st = self.status
+        return (self.job is None and self.reachable and bool(st.get("connected"))
+                and not st.get("connecting") and st.get("state") != "RUN")
+
+    def request(self, method, path, payload=None, headers=None):
+        """(status HTTP, nagłówki, bajty) – połączenie z puli; zerwane keep-alive → jedna ponowna próba."""
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        hdrs = {"Content-Type": "application/json"} if body is not None else {}
+        if headers:
+            hdrs.update(headers)
+        for attempt in (0, 1):
+            with self._lock:
+                conn = self._pool.pop() if self._pool else None
+            reused = conn is not None
+            if conn is None:
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=NODE_TIMEOUT)
+                self.connects += 1
+            try:
+                conn.request(method, self.base + path, body, hdrs)
+                r = conn.getresponse()
+                data = r.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if reused and attempt == 0:
+                    continue        # serwer zamknął bezczynne połączenie – nowe
+                raise NodeError(f"{self.id}: {e}") from e
+            self.requests += 1
+            if r.will_close:
+                conn.close()
+            else:
+                with self._lock:
+                    if len(self._pool) < POOL_SIZE:
+                        self._pool.append(conn)
+                        conn = None
+                if conn is not None:
+                    conn.close()
+            return r.status, r.headers, data
+
+    def call(self, path, payload):
+        """POST do API węzła; NodeRejected, gdy węzeł odrzuci (ok: false), NodeError – brak odpowiedzi."""
+        status, _, data = self.request("POST", path, payload)
+        try:
+            res = json.loads(data or b"{}")
+        except ValueError:
+            res = {}
+        if status >= 400 or res.get("ok") is False:
+            raise NodeRejected(f"{self.id}{path}: {res.get('error') or status}")
+        return res
+
+    def poll(self):
+        """Odśwież stan węzła (GET /api/status); nieosiągalny – pomijany przez DOWN_RETRY."""
+        now = time.monotonic()
+        if now >= self.down_until:
+            try:
+                status, headers, data = self.request("GET", "/status")
+                if status != 200:
+                    raise NodeError(f"{self.id}/status: HTTP {status}")
+                etag = headers.get("ETag")
+                if etag is not None and etag == self.etag and self.status is not None:
+                    self.unchanged += 1
+                else:
+                    self.status = json.loads(data)
+                    self.etag = etag
+                self.error = None
+                self.t_seen = now
+            except (NodeError, ValueError) as e:
+                self.error = str(e)
+                self.etag = None
+                self.down_until = now + DOWN_RETRY
+
+    def view(self):
+        st = dict(self.status or {})
+        st.pop("log", None)
+        st.update(url=self.url, reachable=self.reachable, error=self.error,
+                  job=self.job.id if self.job is not None else None)
+        return st
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for conn in pool:
+            conn.close()
+
+
+class Job:
+    __slots__ = ("id", "total", "sections", "auto_next", "params", "state", "node", "error",
+                 "turns0", "seen_run", "t_queued", "t_started", "t_done")
+
+    def __init__(self, jid, total, sections=0, auto_next=False, params=None):
+        self.id = jid
+        self.total = total
+        self.sections = sections
+        self.auto_next = auto_next
+        self.params = params or {}
+        self.state = "queued"       # queued → running → done | failed | cancelled
+        self.node = None
+        self.error = None
+        self.turns0 = None          # current_turns węzła przy wysłaniu
+        self.seen_run = False
+        self.t_queued = time.time()
+        self.t_started = None
+        self.t_done = None
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__ if k not in ("turns0", "seen_run")}
+
+
+class Fleet:
+    def __init__(self, nodes=()):
+        self.nodes = {}                         # id → Node (kolejność dodania)
+        self.queue = collections.deque()        # Job czekające na węzeł
+        self.jobs = {}                          # id → Job (kolejka, w toku i ostatnie zakończone)
+        self._finished = collections.deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(FANOUT_WORKERS, thread_name_prefix="fleet")
+        self.hub = StatusHub()
+        self._dispatcher = None
+        self.rounds = 0
+        for nid, url in nodes:
+            self.add_node(nid, url)
+
+    def add_node(self, nid, url):
+        with self._lock:
+            if nid in self.nodes:
+                raise ValueError(f"Węzeł {nid} już jest")
+            node = self.nodes[nid] = Node(nid, url)
+        return node
+
+    def remove_node(self, nid):
+        with self._lock:
+            node = self.nodes.pop(nid, None)
+            if node is not None and node.job is not None:
+                self._finish(node.job, "failed", "węzeł usunięty z floty")
+        if node is not None:
+            node.close()
+        return node
+
+    # --- stan floty ---
+    def fields(self):
+        """Jedno odpytanie wszystkich węzłów naraz → pola stanu floty (StatusHub.update)."""
+        nodes = list(self.nodes.values())
+        for _ in self._executor.map(Node.poll, nodes):
+            pass
+        self.rounds += 1
+        with self._lock:
+            self._track_jobs(nodes)
+            views = [n.view() for n in nodes]
+            counts = collections.Counter(j.state for j in self.jobs.values())
+        return {
+            "nodes": {n.id: v for n, v in zip(nodes, views)},
+            "nodes_total": len(nodes),
+            "nodes_reachable": sum(1 for v in views if v["reachable"]),
+            "nodes_running": sum(1 for v in views if v.get("state") == "RUN"),
+            "nodes_idle": sum(1 for n in nodes if n.idle),
+            "jobs": dict(counts),
+        }
+
+    def status_json(self, max_age=STATUS_MAX_AGE):
+        return self.hub.status_json(self.fields, max_age=max_age)
+
+    # --- zlecenia ---
+    def submit(self, total, sections=0, auto_next=False, params=None):
+        with self._lock:
+            job = Job(str(next(self._ids)), total, sections, auto_next, params)
+            self.jobs[job.id] = job
+            self.queue.append(job)
+        self.start()
+        return job
+
+    def cancel(self, jid):
+        """Usuń zlecenie z kolejki (wysłanego nie cofamy – STOP na węźle)."""
+        with self._lock:
+            job = self.jobs.get(jid)
+            if job is None or job.state != "queued":
+                return None
+            self.queue.remove(job)
+            self._finish(job, "cancelled")
+            return job
+
+    def start(self):
+        """Wątek dyspozytora (wielokrotne wywołanie – bez skutku)."""
+        with self._lock:
+            if self._dispatcher is not None:
+                return self
+            self._dispatcher = threading.Thread(target=self._run, name="fleet-dispatch", daemon=True)
+        self._dispatcher.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                if self.queue or any(n.job is not None for n in list(self.nodes.values())):
+                    self.status_json(max_age=DISPATCH_SEC / 2)
+                    self.dispatch()
+            except Exception as e:
+                print(f"[fleet] {e}")
+            time.sleep(DISPATCH_SEC)
+
+    def dispatch(self):
+        """Przydziel zlecenia z kolejki wolnym węzłom; wysyłka równolegle. Zwraca liczbę wysłanych."""
+        pairs = []
+        with self._lock:
+            for node in self.nodes.values():
+                if not self.queue:
+                    break
+                if node.idle:
+                    job = self.queue.popleft()
+                    job.state, job.node, job.t_started = "running", node.id, time.time()
+                    job.turns0 = (node.status or {}).get("current_turns") or 0
+                    node.job = job
+                    pairs.append((node, job))
+        for f in [self._executor.submit(self._send_job, n, j) for n, j in pairs]:
+            f.result()
+        return len(pairs)
+
+    def _send_job(self, node, job):
+        try:
+            for name in JOB_PARAMS:
+                if job.params.get(name) is not None:
+                    node.call(f"/{name}", {name: job.params[name]})
+            node.call("/start", {"total": job.total, "sections": job.sections,
+                                 "auto_next": job.auto_next})
+        except NodeRejected as e:
+            with self._lock:
+                self._finish(job, "failed", str(e))
+        except NodeError as e:
+            with self._lock:          # węzeł nie odpowiada – zlecenie wraca na początek kolejki
+                node.job = None
+                node.error = str(e)
+                node.down_until = time.monotonic() + DOWN_RETRY
+                job.state, job.node, job.t_started = "queued", None, None
+                self.queue.appendleft(job)
+
+    def _track_jobs(self, nodes):
+        """
+        Koniec zleceń: węzeł stoi (nie RUN) z current_turns >= total – pod self._lock.
+        Liczy się tylko postęp tego zlecenia: widziany RUN albo licznik zwojów inny
+        niż przy wysłaniu (krótkie zlecenie między odpytaniami). Sama zmiana ETag
+        (np. nowe linie logu) przy starym liczniku po poprzednim zleceniu – nie.
+        """
+        for node in nodes:
+            job, st = node.job, node.status
+            if job is None or st is None or not node.reachable:
+                continue
+            turns = st.get("current_turns") or 0
+            if st.get("state") == "RUN":
+                job.seen_run = True
+            elif (job.seen_run or turns != job.turns0) and turns >= job.total:
+                self._finish(job, "done")
+
+    def _finish(self, job, state, error=None):
+        job.state, job.error, job.t_done = state, error, time.time()
+        node = self.nodes.get(job.node) if job.node else None
+        if node is not None and node.job is job:
+            node.job = None
+        self._finished.append(job)
+        while len(self._finished) > JOBS_KEEP:
+            self.jobs.pop(self._finished.popleft().id, None)
+
+    def close(self):
+        for node in list(self.nodes.values()):
+            node.close()
+
+
+def nodes_from_env(spec):
+    """WINDER_NODES="a=http://10.0.0.5:5000,b=10.0.0.6:5000" → [(id, url), ...]; bez id – kolejne numery."""
+    out = []
+    for i, item in enumerate(x.strip() for x in spec.split(",") if x.strip()):
+        nid, sep, url = item.partition("=")
+        out.append((nid.strip(), url.strip()) if sep else (str(i + 1), item))
+    return out
+
+
+app = Flask(__name__)
+fleet = Fleet(nodes_from_env(os.environ.get("WINDER_NODES", "")))
+
+
+@app.route("/")
+def index():
+    return """
+<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Flota nawijarek</title>
+<style>
+body{font-family:sans-serif;margin:1rem;background:#1a1a2e;color:#eee;}
+h1{color:#0f0;} a{color:#8cf;} input{width:70px;padding:4px;} button{padding:6px 10px;border-radius:6px;}
+#grid{display:grid;grid-template-columns:repeat(auto-fill,minmax(220px,1fr));gap:8px;}
+.n{background:#252540;border-radius:6px;padding:0.5rem;border-left:6px solid #555;}
+.n.RUN{border-color:#0a0;}.n.down{border-color:#c00;opacity:0.6;}
+table{margin-top:1rem;border-collapse:collapse;} td,th{padding:2px 8px;text-align:left;}
+</style></head>
+<body>
+<h1>Flota nawijarek</h1>
+<p>Zwoje: <input id="total" type="number" value="100"> Sekcji: <input id="sections" type="number" value="0">
+   RPM: <input id="rpm" type="number" value="200"> Skok: <input id="pitch" type="number" value="0.2" step="0.01">
+   Szer.: <input id="bwidth" type="number" value="22" step="0.1"> <button id="btnQueue">Do kolejki</button></p>
+<div id="grid">Ładowanie…</div>
+<table id="jobs"></table>
+<script>
+const v=id=>+document.getElementById(id).value;
+document.getElementById('btnQueue').onclick=()=>fetch('/api/jobs',{method:'POST',headers:{'Content-Type':'application/json'},
+  body:JSON.stringify({total:v('total'),sections:v('sections'),rpm:v('rpm'),pitch:v('pitch'),bwidth:v('bwidth')})}).then(refreshJobs);
+function card(id,n){
+  const cls='n '+(n.reachable ? (n.state||'') : 'down');
+  return '<div class="'+cls+'"><b><a href="'+n.url.replace(/\\/api(\\/machines\\/([^/]+))?$/, (m,a,b)=>b ? '/?m='+b : '')+'">'+id+'</a></b> '
+    +(n.reachable ? (n.connected ? n.state : 'rozłączona') : 'brak odpowiedzi')+'<br>Zwoje: '+(n.current_turns!=null ? n.current_turns : '—')
+    +' | RPM: '+(n.current_rpm||'—')+(n.job ? '<br>Zlecenie #'+n.job : '')+'</div>';
+}
+function refresh(){ fetch('/api/status').then(r=>r.json()).then(d=>{
+  document.getElementById('grid').innerHTML=Object.entries(d.nodes||{}).map(([id,n])=>card(id,n)).join('') || 'Brak węzłów (WINDER_NODES).'; }).catch(()=>null); }
+function refreshJobs(){ fetch('/api/jobs').then(r=>r.json()).then(d=>{
+  document.getElementById('jobs').innerHTML='<tr><th>#</th><th>zwoje</th><th>stan</th><th>węzeł</th></tr>'
+    +d.jobs.slice(-20).reverse().map(j=>'<tr><td>'+j.id+'</td><td>'+j.total+'</td><td>'+j.state+(j.error ? ' – '+j.error : '')+'</td><td>'+(j.node||'')+'</td></tr>').join(''); }).catch(()=>null); }
+setInterval(()=>{ refresh(); refreshJobs(); }, 1000); refresh(); refreshJobs();
+</script>
+</body></html>
+"""
+
+
+@app.route("/api/status")
+def api_status():
+    """Stan floty: {"nodes": {id: stan węzła + url, reachable, error, job}, podsumowanie}; ETag/304."""
+    version, body = fleet.status_json()
+    etag = fleet.hub.etag(version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype="application/json", headers=headers)
+
+
+@app.route("/api/events")
+def api_events():
+    """Strumień SSE stanu floty (odpytywanie węzłów tylko, gdy ktoś słucha)."""
+    fleet.hub.start_poller(fleet.fields, period=STATUS_MAX_AGE)
+    return Response(fleet.hub.stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/api/nodes", methods=["GET", "POST"])
+def api_nodes():
+    if request.method == "POST":
+        data = request.get_json() or {}
+        nid, url = str(data.get("id") or "").strip(), str(data.get("url") or "").strip()
+        if not nid or not url:
+            return jsonify(ok=False, error="Brak id / url węzła"), 400
+        try:
+            fleet.add_node(nid, url)
+        except ValueError as e:
+            return jsonify(ok=False, error=str(e)), 400
+        return jsonify(ok=True)
+    return jsonify(nodes=[{"id": n.id, "url": n.url, "requests": n.requests, "connects": n.connects,
+                           "unchanged": n.unchanged, "error": n.error}
+                          for n in list(fleet.nodes.values())], rounds=fleet.rounds)
+
+
+@app.route("/api/nodes/<nid>", methods=["DELETE"])
+def api_node_delete(nid):
+    if fleet.remove_node(nid) is None:
+        return jsonify(ok=False, error=f"Nieznany węzeł: {nid}"), 404
+    return jsonify(ok=True)
+
+
+@app.route("/api/jobs", methods=["GET", "POST"])
+def api_jobs():
+    if request.method == "GET":
+        with fleet._lock:
+            jobs = [j.as_dict() for j in fleet.jobs.values()]
+        return jsonify(jobs=jobs, queued=len(fleet.queue))
+    data = request.get_json() or {}
+    try:
+        total = int(data.get("total") or 0)
+        sections = int(data.get("sections") or 0)
+        params = {k: float(data[k]) for k in JOB_PARAMS if data.get(k) not in (None, "")}
+    except (TypeError, ValueError):
+        return jsonify(ok=False, error="Parametry zlecenia muszą być liczbami"), 400
+    if total <= 0:
+        return jsonify(ok=False, error="Ilość zwojów musi być > 0"), 400
+    if "rpm" in params:
+        params["rpm"] = int(params["rpm"])
+    job = fleet.submit(total, sections, bool(data.get("auto_next")), params)
+    return jsonify(ok=True, id=job.id, queued=len(fleet.queue))
+
+
+@app.route("/api/jobs/<jid>", methods=["DELETE"])
+def api_job_cancel(jid):
+    if fleet.cancel(jid) is None:
+        return jsonify(ok=False, error="Zlecenia nie ma w kolejce"), 404
+    return jsonify(ok=True)
+
+
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", 5100))
+    host = "0.0.0.0"
+    print(f"Brama floty: http://<adres>:{port}  (węzły: {', '.join(fleet.nodes) or 'brak – WINDER_NODES'})")
+    try:
+        from waitress import serve   # opcjonalnie: HTTP keep-alive (brama floty trzyma połączenia)
+    except ImportError:
+        app.run(host=host, port=port, debug=False, threaded=True)
+    else:
+        serve(app, host=host, port=port, threads=int(os.environ.get("WINDER_THREADS", 16)))  # klient SSE = wątek
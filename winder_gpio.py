@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Backendy GPIO dla silnika nawijarki (winder_engine_rpi.py).
+
+- RpiGpioBackend – prawdziwe piny przez RPi.GPIO (Raspberry Pi).
+- PigpioBackend  – piny przez demona pigpio; przebiegi kroków (tryb "wave")
+  wysyłane sprzętowo przez DMA, bez Pythona na każdy impuls.
+- SimGpioBackend – symulacja: zapis każdego zbocza STEP/DIR/EN ze znacznikiem
+  czasu, model enkodera wrzeciona i krańcówki Y liczony z zadanych kroków,
+  opcjonalnie na wirtualnym zegarze (dużo szybciej niż w czasie rzeczywistym).
+
+Silnik używa tylko metod z GpioBackend, więc ten sam kod pętli kroków działa
+na RPi i na zwykłym Linuksie (benchmarki, testy regresji).
+"""
+import threading
+import time
+from array import array
+
+from winder_timer import get_timer
+from winder_wave import op_writes
+
+try:
+    import RPi.GPIO as GPIO
+    GPIO_AVAILABLE = True
+except (ImportError, RuntimeError):
+    GPIO_AVAILABLE = False
+    GPIO = None
+
+try:
+    import pigpio
+    PIGPIO_AVAILABLE = True
+except ImportError:
+    PIGPIO_AVAILABLE = False
+    pigpio = None
+
+HIGH = 1
+LOW = 0
+
+
+class GpioBackend:
+    """Interfejs backendu GPIO. Poziomy: HIGH=1 / LOW=0 (jak RPi.GPIO)."""
+
+    name = "none"
+    hardware_wave = False   # sprzętowe (DMA) wysyłanie przebiegów → domyślnie tryb "wave"
+
+    def setup_output(self, pin, level=LOW):
+        raise NotImplementedError
+
+    def setup_input(self, pin, pull_up=True):
+        raise NotImplementedError
+
+    def output(self, pin, level):
+        raise NotImplementedError
+
+    def input(self, pin):
+        raise NotImplementedError
+
+    def add_edge_callback(self, pin, callback):
+        """Wywołuj callback(pin) na każdym zboczu pinu wejściowego."""
+        raise NotImplementedError
+
+    def clock(self):
+        """Czas w sekundach (monotoniczny) – używany przez pętlę kroków."""
+        return time.perf_counter()
+
+    def sleep(self, sec):
+        time.sleep(sec)
+
+    @property
+    def timer(self):
+        return get_timer()
+
+    def wait_until(self, t):
+        """Czekaj do chwili t (skala clock()) – sleep na grubo + aktywne czekanie (winder_timer)."""
+        self.timer.wait_until_ns(int(t * 1e9))
+
+    def pulse(self, pin, sec):
+        """Impuls HIGH o szerokości sec (aktywne czekanie, bez sleep)."""
+        self.output(pin, HIGH)
+        self.timer.delay_ns(int(sec * 1e9))
+        self.output(pin, LOW)
+
+    def calibrate_timer(self):
+        """Kalibracja HybridTimer (raz na proces); None gdy backend nie czeka naprawdę."""
+        timer = self.timer
+        if not timer.calibrated:
+            timer.calibrate()
+        return timer.calibration()
+
+    def timer_report(self):
+        """Kalibracja + statystyki czekania i szerokości impulsów; None gdy nie dotyczy."""
+        return self.timer.report()
+
+    def play_waveform(self, t_ns, ops, t0, pins, duration_ns):
+        """
+        Odtwórz skompilowany fragment (winder_wave): zdarzenie i o czasie
+        t0 + t_ns[i]·1e-9 ustawia piny wg ops[i]. Wersja ogólna: czekanie
+        wait_until() na każde zdarzenie. Wraca po ostatnim zdarzeniu.
+        """
+        wait_until = self.wait_until
+        output = self.output
+        cache = self._wave_cache(pins)
+        for t, op in zip(t_ns, ops):
+            wait_until(t0 + t * 1e-9)
+            writes = cache.get(op)
+            if writes is None:
+                writes = cache[op] = op_writes(op, pins)
+            for pin, level in writes:
+                output(pin, level)
+
+    def wait_waveform(self):
+        """Poczekaj, aż wszystkie wysłane fragmenty fizycznie wyjdą na piny."""
+
+    def wave_capable(self):
+        """
+        Czy tryb wave trzyma czas: fragment N+1 kompiluje się, gdy N jeszcze wychodzi
+        (DMA). Odtwarzanie w Pythonie (play_waveform wyżej) wraca dopiero po fragmencie,
+        więc kompilacja następnego opóźniałaby jego start – seria kroków na każdej granicy.
+        """
+        return self.hardware_wave
+
+    def _wave_cache(self, pins):
+        cache = getattr(self, "_op_cache", None)
+        if cache is None or self._op_cache_pins != pins:
+            cache = self._op_cache = {}
+            self._op_cache_pins = pins
+        return cache
+
+    def cleanup(self):
+        pass
+
+
+class RpiGpioBackend(GpioBackend):
+    """Prawdziwe GPIO przez RPi.GPIO (numeracja BCM)."""
+
+    name = "rpi"
+
+    def __init__(self):
+        if not GPIO_AVAILABLE:
+            raise RuntimeError("RPi.GPIO niedostępne")
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+
+    def setup_output(self, pin, level=LOW):
+        GPIO.setup(pin, GPIO.OUT)
+        GPIO.output(pin, level)
+
+    def setup_input(self, pin, pull_up=True):
+        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP if pull_up else GPIO.PUD_OFF)
+
+    def output(self, pin, level):
+        GPIO.output(pin, level)
+
+    def input(self, pin):
+        return GPIO.input(pin)
+
+    def add_edge_callback(self, pin, callback):
+        GPIO.add_event_detect(pin, GPIO.BOTH, callback=callback, bouncetime=1)
+
+    def cleanup(self):
+        try:
+            GPIO.cleanup()
+        except Exception:
+            pass
+
+
+class PigpioBackend(GpioBackend):
+    """
+    GPIO przez demona pigpio (sudo pigpiod). Fragmenty przebiegu trafiają do
+    wave_add_generic i są nadawane przez DMA z dokładnością ~1 µs, łańcuchowo
+    (WAVE_MODE_ONE_SHOT_SYNC) – kolejny fragment startuje dokładnie po poprzednim.
+    """
+
+    name = "pigpio"
+    hardware_wave = True
+
+    def __init__(self, host=None, port=None):
+        if not PIGPIO_AVAILABLE:
+            raise RuntimeError("pigpio niedostępne (pip3 install pigpio, sudo pigpiod)")
+        kwargs = {}
+        if host:
+            kwargs["host"] = host
+        if port:
+            kwargs["port"] = port
+        self.pi = pigpio.pi(**kwargs)
+        if not self.pi.connected:
+            raise RuntimeError("Brak połączenia z demonem pigpiod")
+        self.pi.wave_clear()
+        self._wids = []
+        self._callbacks = []
+
+    def setup_output(self, pin, level=LOW):
+        self.pi.set_mode(pin, pigpio.OUTPUT)
+        self.pi.write(pin, level)
+
+    def setup_input(self, pin, pull_up=True):
+        self.pi.set_mode(pin, pigpio.INPUT)
+        self.pi.set_pull_up_down(pin, pigpio.PUD_UP if pull_up else pigpio.PUD_OFF)
+
+    def output(self, pin, level):
+        self.pi.write(pin, level)
+
+    def input(self, pin):
+        return self.pi.read(pin)
+
+    def add_edge_callback(self, pin, callback):
+        self._callbacks.append(self.pi.callback(pin, pigpio.EITHER_EDGE, lambda g, lv, tick: callback(g)))
+
+    def _masks(self, op, pins):
+        on = off = 0
+        for bit, pin in enumerate(pins):
+            if op & (1 << bit):
+                on |= 1 << pin
+            elif op & (1 << (bit + 8)):
+                off |= 1 << pin
+        return on, off
+
+    def play_waveform(self, t_ns, ops, t0, pins, duration_ns):
+        cache = self._wave_cache(pins)
+        pulses = []
+        n = len(t_ns)
+        for i in range(n):
+            op = ops[i]
+            masks = cache.get(op)
+            if masks is None:
+                masks = cache[op] = self._masks(op, pins)
+            t_next = t_ns[i + 1] if i + 1 < n else duration_ns
+            delay_us = (t_next // 1000) - (t_ns[i] // 1000)
+            pulses.append(pigpio.pulse(masks[0], masks[1], max(0, delay_us)))
+        if not pulses:
+            return
+        self.pi.wave_add_generic(pulses)
+        wid = self.pi.wave_create()
+        self.pi.wave_send_using_mode(wid, pigpio.WAVE_MODE_ONE_SHOT_SYNC)
+        self._wids.append(wid)
+        # Podwójny bufor: wróć, gdy nadawany jest już nowy fragment, i zwolnij stare.
+        while len(self._wids) > 1:
+            at = self.pi.wave_tx_at()
+            if at == wid or at == pigpio.WAVE_NOT_FOUND or at == pigpio.NO_TX_WAVE:
+                for old in self._wids[:-1]:
+                    self.pi.wave_delete(old)
+                del self._wids[:-1]
+                break
+            time.sleep(0.0005)
+
+    def wait_waveform(self):
+        while self.pi.wave_tx_busy():
+            time.sleep(0.001)
+        for wid in self._wids:
+            self.pi.wave_delete(wid)
+        self._wids = []
+
+    def cleanup(self):
+        try:
+            self.pi.wave_tx_stop()
+            for cb in self._callbacks:
+                cb.cancel()
+            self.pi.stop()
+        except Exception:
+            pass
+
+
+class SimGpioBackend(GpioBackend):
+    """
+    Symulowany sprzęt nawijarki.
+
+    Zbocza wyjść zapisywane są w zwartych tablicach (edge_t / edge_pin /
+    edge_level). Kroki X (przy EN=LOW) obracają wrzeciono → enkoder A/B
+    w kwadraturze; kroki Y przesuwają wózek → krańcówka Y aktywna (LOW),
+    gdy pozycja <= 0.
+
+    virtual=True: clock() zwraca czas wirtualny, a sleep() tylko go przesuwa –
+    pętla kroków działa tak szybko, jak pozwala CPU.
+    """
+
+    name = "sim"
+
+    def __init__(self, x_step, x_dir, y_step, y_dir, en, enc_a, enc_b, y_min,
+                 x_steps_per_rev=6400, enc_ticks_per_rev=18, y_start_steps=0,
+                 virtual=True, record=True):
+        self.pins = {
+            "x_step": x_step, "x_dir": x_dir, "y_step": y_step, "y_dir": y_dir,
+            "en": en, "enc_a": enc_a, "enc_b": enc_b, "y_min": y_min,
+        }
+        self._x_step, self._x_dir = x_step, x_dir
+        self._y_step, self._y_dir = y_step, y_dir
+        self._en = en
+        self._enc_a, self._enc_b, self._y_min = enc_a, enc_b, y_min
+
+        self.x_steps_per_rev = x_steps_per_rev
+        self.enc_ticks_per_rev = enc_ticks_per_rev
+        self.virtual = virtual
+        self.record = record
+
+        self._levels = {}
+        self._callbacks = {}
+        self._clock_lock = threading.Lock()
+        self._now = 0.0
+        self._t0 = time.perf_counter()
+
+        # Model mechaniki
+        self.x_pos_steps = 0           # kąt wrzeciona w krokach silnika X
+        self.y_pos_steps = y_start_steps
+        self.x_steps_total = 0
+        self.y_steps_total = 0
+        self._enc_phase = 0
+
+        # Zapis zboczy (czas [s], pin, poziom)
+        self.edge_t = array("d")
+        self.edge_pin = array("B")
+        self.edge_level = array("B")
+
+    def wave_capable(self):
+        return self.virtual   # na zegarze wirtualnym kompilacja nie zajmuje czasu ruchu
+
+    # --- zegar ---
+    def clock(self):
+        if self.virtual:
+            return self._now
+        return time.perf_counter() - self._t0
+
+    def sleep(self, sec):
+        if not self.virtual:
+            time.sleep(sec)
+            return
+        if sec > 0:
+            with self._clock_lock:
+                self._now += sec
+        time.sleep(0)  # oddaj GIL innym wątkom (serwer, benchmark)
+
+    def wait_until(self, t):
+        if not self.virtual:
+            self.timer.wait_until_ns(int((t + self._t0) * 1e9))
+            return
+        with self._clock_lock:
+            if t > self._now:
+                self._now = t
+
+    def pulse(self, pin, sec):
+        if not self.virtual:
+            GpioBackend.pulse(self, pin, sec)
+            return
+        self.output(pin, HIGH)
+        self._now += sec
+        self.output(pin, LOW)
+
+    def calibrate_timer(self):
+        return GpioBackend.calibrate_timer(self) if not self.virtual else None
+
+    def timer_report(self):
+        return GpioBackend.timer_report(self) if not self.virtual else None
+
+    # --- piny ---
+    def setup_output(self, pin, level=LOW):
+        self._levels[pin] = level
+
+    def setup_input(self, pin, pull_up=True):
+        if pin not in self._levels:
+            self._levels[pin] = HIGH if pull_up else LOW
+
+    def add_edge_callback(self, pin, callback):
+        self._callbacks[pin] = callback
+
+    def input(self, pin):
+        if pin == self._y_min:
+            return LOW if self.y_pos_steps <= 0 else HIGH
+        return self._levels.get(pin, LOW)
+
+    def output(self, pin, level):
+        prev = self._levels.get(pin, LOW)
+        self._levels[pin] = level
+        if prev == level:
+            return
+        if self.record:
+            self.edge_t.append(self.clock())
+            self.edge_pin.append(pin)
+            self.edge_level.append(level)
+        if level != HIGH or self._levels.get(self._en, HIGH) != LOW:
+            return  # ruch tylko na zboczu narastającym STEP przy EN=LOW
+        if pin == self._x_step:
+            self._spindle_step(1 if self._levels.get(self._x_dir, LOW) == HIGH else -1)
+        elif pin == self._y_step:
+            self.y_pos_steps += 1 if self._levels.get(self._y_dir, LOW) == HIGH else -1
+            self.y_steps_total += 1
+
+    # Kolejne stany (A, B) przy obrocie do przodu – zbocze opadające A przy B=LOW
+    # daje w silniku kierunek +1.
+    _QUAD = ((HIGH, HIGH), (HIGH, LOW), (LOW, LOW), (LOW, HIGH))
+
+    def _spindle_step(self, direction):
+        self.x_pos_steps += direction
+        self.x_steps_total += 1
+        if self.x_steps_per_rev <= 0:
+            return
+        phase = (self.x_pos_steps * self.enc_ticks_per_rev * 4) // self.x_steps_per_rev
+        while self._enc_phase != phase:
+            self._enc_phase += 1 if phase > self._enc_phase else -1
+            a, b = self._QUAD[self._enc_phase % 4]
+            self._levels[self._enc_b] = b
+            if self._levels.get(self._enc_a) != a:
+                self._levels[self._enc_a] = a
+                cb = self._callbacks.get(self._enc_a)
+                if cb is not None:
+                    cb(self._enc_a)
+
+    def play_waveform(self, t_ns, ops, t0, pins, duration_ns):
+        """Fragment przebiegu: na zegarze wirtualnym bez czekania, zbocza z czasem zdarzeń."""
+        if not self.virtual:
+            GpioBackend.play_waveform(self, t_ns, ops, t0, pins, duration_ns)
+            return
+        cache = self._wave_cache(pins)
+        output = self.output
+        for t, op in zip(t_ns, ops):
+            due = t0 + t * 1e-9
+            if due > self._now:
+                self._now = due
+            writes = cache.get(op)
+            if writes is None:
+                writes = cache[op] = op_writes(op, pins)
+            for pin, level in writes:
+                output(pin, level)
+        end = t0 + duration_ns * 1e-9
+        with self._clock_lock:
+            if end > self._now:
+                self._now = end
+        time.sleep(0)
+
+    # --- analiza zapisu ---
+    def edges(self, pin, level=HIGH):
+        """Czasy zboczy danego pinu (domyślnie narastających)."""
+        return [t for t, p, lv in zip(self.edge_t, self.edge_pin, self.edge_level)
+                if p == pin and lv == level]
+
+    def clear_edges(self):
+        self.edge_t = array("d")
+        self.edge_pin = array("B")
+        self.edge_level = array("B")
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Historia telemetrii na dysku (karta SD) – wspólna dla winder_server.py,
+winder_server_rpi.py i GUI.
+
+Próbki (czas, stan, zwoje, zwoje z enkodera, Y, RPM, krańcówka) to rekordy
+o stałym rozmiarze (REC, 28 B) dopisywane na koniec pliku segmentu. Nowy
+segment zaczyna każde zlecenie (new_segment) – plik <czas startu w ms>.wts
+z 64-bajtowym nagłówkiem (HEADER: liczba rekordów, etykieta zlecenia).
+Plik jest zmapowany w pamięci (mmap) i powiększany porcjami GROW_RECORDS –
+dopisanie próbki to pack_into w stronę pamięci; na kartę zapisuje ją jądro
+(writeback, co kilka-kilkadziesiąt s), bez fsync i bez write() na próbkę.
+
+Zapis jest rozrzedzony: najwyżej jedna próbka na MIN_INTERVAL s (zmiana stanu
+– zawsze), a bez zmian wartości – jedna na HEARTBEAT s. Przy pracy ~5 próbek/s
+to ~12 MB na 24 h ruchu; segmenty starsze niż RETENTION_DAYS są usuwane.
+
+Zapytanie o okno czasu (query) otwiera tylko segmenty, które na nie zachodzą,
+szuka granic bisekcją po czasach w mmap i czyta wyłącznie rekordy z okna
+(najwyżej MAX_SCAN – dłuższe okno co k-ty rekord), a potem zwraca serie
+zredukowane do `points` punktów: min/max w przedziałach czasu albo LTTB
+(Largest-Triangle-Three-Buckets – kształt wykresu z mniejszej liczby punktów).
+"""
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b"WTS1"
+HEADER = struct.Struct("<4sHHdQ40s")    # magic, wersja, rozmiar rekordu, czas utworzenia, liczba rekordów, etykieta
+REC = struct.Struct("<dBbhifff")        # t, stan, krańcówka, (wolne), zwoje, zwoje enkodera, Y, RPM
+COUNT_OFFSET = 16                       # liczba rekordów w nagłówku (uaktualniana przy każdym dopisaniu)
+GROW_RECORDS = 16384                    # powiększanie pliku porcjami (~450 KiB)
+SEGMENT_MAX = 2_000_000                 # dłuższe zlecenie – kolejny segment z tą samą etykietą
+MIN_INTERVAL = 0.2                      # [s] najgęściej tyle między próbkami (poza zmianą stanu)
+HEARTBEAT = 10.0                        # [s] próbka bez zmian wartości – co tyle
+RETENTION_DAYS = 60
+MAX_SCAN = 50_000                       # rekordów czytanych na zapytanie (Pi Zero: ~0.5 s)
+MAX_POINTS = 5000
+HISTORY_DIR = os.environ.get("WINDER_HISTORY_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "history")
+
+STATES = ("IDLE", "RUN", "PAUSE", "STOP", "HOME")
+STATE_CODE = {s: i for i, s in enumerate(STATES)}
+UNKNOWN_STATE = 255
+FIELDS = ("turns", "turns_real", "y", "rpm", "endstop")
+NAN = float("nan")
+_FIELD_POS = {"turns": 4, "turns_real": 5, "y": 6, "rpm": 7, "endstop": 2}
+
+
+def _num(v):
+    return NAN if v is None else float(v)
+
+
+def _json_num(v):
+    return None if v != v else round(v, 4)     # NaN → null (JSON nie zna NaN)
+
+
+class Segment:
+    """Jeden plik .wts; writable=False – tylko odczyt (zapytania o stare segmenty)."""
+
+    def __init__(self, path, label=None, writable=False):
+        self.path = path
+        self.writable = writable or label is not None
+        if label is not None:
+            with open(path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, 1, REC.size, time.time(), 0,
+                                    label.encode("utf-8")[:40]))
+                f.truncate(HEADER.size + GROW_RECORDS * REC.size)
+        self._f = open(path, "r+b" if self.writable else "rb")
+        try:
+            self.mm = mmap.mmap(self._f.fileno(), 0,
+                                access=mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ)
+        except ValueError:          # pusty plik (np. przerwane tworzenie)
+            self._f.close()
+            raise OSError(f"pusty segment: {path}")
+        magic, _, rec_size, self.t_created, count, label_b = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or rec_size != REC.size:
+            self.close()
+            raise OSError(f"nieznany format segmentu: {path}")
+        self.capacity = (len(self.mm) - HEADER.size) // REC.size
+        self.count = min(count, self.capacity)   # po awarii zasilania – nie dalej niż plik
+        self.label = label_b.rstrip(b"\0").decode("utf-8", errors="ignore")
+
+    @property
+    def t_first(self):
+        return self.time_at(0) if self.count else self.t_created
+
+    @property
+    def t_last(self):
+        return self.time_at(self.count - 1) if self.count else self.t_created
+
+    def time_at(self, i):
+        return struct.unpack_from("<d", self.mm, HEADER.size + i * REC.size)[0]
+
+    def bisect(self, t):
+        """Indeks pierwszego rekordu o czasie >= t."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.time_at(mid) < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def append(self, rec):
+        if self.count >= self.capacity:
+            size = len(self.mm) + GROW_RECORDS * REC.size
+            self._f.truncate(size)
+            self.mm.resize(size)
+            self.capacity += GROW_RECORDS
+        REC.pack_into(self.mm, HEADER.size + self.count * REC.size, *rec)
+        self.count += 1
+        struct.pack_into("<Q", self.mm, COUNT_OFFSET, self.count)
+
+    def records(self, i0, i1, stride=1):
+        mm, base, size = self.mm, HEADER.size, REC.size
+        if stride == 1:
+            return list(REC.iter_unpack(mm[base + i0 * size:base + i1 * size]))
+        unpack = REC.unpack_from
+        return [unpack(mm, base + i * size) for i in range(i0, i1, stride)]
+
+    def info(self):
+        return {"id": os.path.basename(self.path)[:-4], "label": self.label, "t_first": self.t_first,
+                "t_last": self.t_last, "count": self.count}
+
+    def close(self, trim=False):
+        """trim: obetnij niezapisaną końcówkę pliku (zamykany aktywny segment)."""
+        self.mm.close()
+        if trim and self.writable:
+            self._f.truncate(HEADER.size + self.count * REC.size)
+        self._f.close()
+
+
+class HistoryStore:
+    def __init__(self, path, min_interval=MIN_INTERVAL, heartbeat=HEARTBEAT, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+        self.retention = retention_days * 86400.0
+        self._lock = threading.Lock()
+        self._seg = None                # aktywny segment (zapis)
+        self._last = None               # (czas, wartości) ostatniej zapisanej próbki
+        self._index = {}                # id → (t_first, t_last, count, label) zamkniętych segmentów
+        self._sampler = None
+        self.appended = 0
+        self.skipped = 0
+        os.makedirs(path, exist_ok=True)
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".wts"):
+                try:
+                    seg = Segment(os.path.join(path, name))
+                except OSError as e:
+                    print(f"[history] {e}")
+                    continue
+                self._index[name[:-4]] = (seg.t_first, seg.t_last, seg.count, seg.label)
+                seg.close()
+
+    def new_segment(self, label=""):
+        """Nowe zlecenie – kolejne próbki do nowego pliku."""
+        with self._lock:
+            self._open_segment(label)
+            self._last = None
+
+    def append(self, state, turns=None, turns_real=None, y=None, rpm=None, endstop=None, t=None):
+        """Dopisz próbkę (z rozrzedzeniem); True – zapisana."""
+        t = time.time() if t is None else t
+        code = STATE_CODE.get(state, UNKNOWN_STATE)
+        key = (code, turns, turns_real, y, rpm, endstop)
+        with self._lock:
+            last = self._last
+            if last is not None:
+                t = max(t, last[0])                 # czas w segmencie nie cofa się (zmiana zegara)
+                if code == last[1][0]:
+                    dt = t - last[0]
+                    if dt < self.min_interval or (dt < self.heartbeat and key == last[1]):
+                        self.skipped += 1
+                        return False
+            seg = self._seg
+            if seg is None or seg.count >= SEGMENT_MAX:
+                seg = self._open_segment(seg.label if seg is not None else "")
+            rec = (t, code, -1 if endstop is None else int(endstop), 0, int(turns or 0),
+                   _num(turns_real), _num(y), _num(rpm))
+            try:
+                seg.append(rec)
+            except (OSError, ValueError) as e:      # pełna karta itp. – historia nie zatrzymuje pracy
+                self.skipped += 1
+                print(f"[history] {e}")
+                return False
+            self._last = (t, key)
+            self.appended += 1
+            return True
+
+    def start_sampler(self, fn, period=MIN_INTERVAL):
+        """Wątek: co period append(**fn()) – dla silnika bez zdarzeń (RPi GPIO); fn() → None = brak próbki."""
+        if self._sampler is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    row = fn()
+                    if row is not None:
+                        self.append(**row)
+                except Exception as e:
+                    print(f"[history] {e}")
+                time.sleep(period)
+
+        self._sampler = threading.Thread(target=loop, name="history", daemon=True)
+        self._sampler.start()
+
+    def segments(self):
+        with self._lock:
+            out = [{"id": sid, "label": v[3], "t_first": v[0], "t_last": v[1], "count": v[2]}
+                   for sid, v in self._index.items()]
+            if self._seg is not None:
+                out.append(self._seg.info())
+        return sorted(out, key=lambda s: s["id"])
+
+    def query(self, t0, t1, points=500, mode="minmax", fields=FIELDS):
+        """
+        Serie z okna [t0, t1] zredukowane do points punktów:
+        mode="minmax" – {"t": [środki przedziałów], "series": {pole: {"min": [...], "max": [...]}}},
+        mode="lttb"   – {"series": {pole: {"t": [...], "v": [...]}}}.
+        Zawsze "state": [[t, stan], ...] – zmiany stanu w oknie.
+        """
+        points = max(2, min(int(points), MAX_POINTS))
+        spans = []
+        with self._lock:
+            for sid in sorted(self._index):
+                v = self._index[sid]
+                if v[2] and v[0] <= t1 and v[1] >= t0:
+                    spans.append(sid)
+            active = self._seg
+            if active is not None and active.count and active.t_first <= t1 and active.t_last >= t0:
+                i0, i1 = active.bisect(t0), active.bisect(math.nextafter(t1, math.inf))
+                tail = (active, i0, i1)
+            else:
+                tail = None
+        parts = []
+        for sid in spans:
+            try:
+                seg = Segment(os.path.join(self.path, sid + ".wts"))
+            except OSError:
+                continue
+            parts.append((seg, seg.bisect(t0), seg.bisect(math.nextafter(t1, math.inf))))
+        total = sum(i1 - i0 for _, i0, i1 in parts) + (tail[2] - tail[1] if tail else 0)
+        stride = max(1, -(-total // MAX_SCAN))
+        rows = []
+        for seg, i0, i1 in parts:
+            rows += seg.records(i0, i1, stride)
+            seg.close()
+        if tail is not None:
+            with self._lock:
+                if self._seg is tail[0]:
+                    rows += tail[0].records(tail[1], tail[2], stride)
+
+        fields = [f for f in fields if f in _FIELD_POS]
+        out = {"from": t0, "to": t1, "mode": mode, "scanned": len(rows), "in_window": total,
+               "stride": stride, "state": _transitions(rows)}
+        if mode == "lttb":
+            series = {}
+            for f in fields:
+                pos = _FIELD_POS[f]
+                pts = [(r[0], r[pos]) for r in rows if r[pos] == r[pos] and (pos != 2 or r[pos] >= 0)]
+                keep = lttb(pts, points)
+                series[f] = {"t": [round(p[0], 3) for p in keep], "v": [_json_num(p[1]) for p in keep]}
+            out["series"] = series
+        else:
+            out.update(_minmax(rows, t0, t1, points, fields))
+        return out
+
+    def close(self):
+        with self._lock:
+            if self._seg is not None:
+                self._close_active()
+
+    # --- wewnętrzne (pod self._lock) ---
+    def _open_segment(self, label):
+        if self._seg is not None:
+            self._close_active()
+        now = time.time()
+        sid = f"{int(now * 1000):013d}"
+        while sid in self._index:
+            sid = f"{int(sid) + 1:013d}"
+        self._seg = Segment(os.path.join(self.path, sid + ".wts"), label=label)
+        self._expire(now)
+        return self._seg
+
+    def _close_active(self):
+        seg, self._seg = self._seg, None
+        sid = os.path.basename(seg.path)[:-4]
+        if seg.count:
+            self._index[sid] = (seg.t_first, seg.t_last, seg.count, seg.label)
+            seg.close(trim=True)
+        else:
+            seg.close()
+            os.remove(seg.path)
+
+    def _expire(self, now):
+        for sid in [s for s, v in self._index.items() if now - v[1] > self.retention]:
+            del self._index[sid]
+            try:
+                os.remove(os.path.join(self.path, sid + ".wts"))
+            except OSError:
+                pass
+
+
+def _transitions(rows):
+    out = []
+    last = None
+    for r in rows:
+        if r[1] != last:
+            last = r[1]
+            out.append([round(r[0], 3), STATES[last] if last < len(STATES) else None])
+    return out
+
+
+def _minmax(rows, t0, t1, points, fields):
+    width = (t1 - t0) / points or 1.0
+    buckets = {}
+    for r in rows:
+        b = min(points - 1, int((r[0] - t0) / width))
+        acc = buckets.get(b)
+        if acc is None:
+            acc = buckets[b] = {f: [math.inf, -math.inf] for f in fields}
+        for f in fields:
+            v = r[_FIELD_POS[f]]
+            if v == v and (f != "endstop" or v >= 0):
+                mm = acc[f]
+                if v < mm[0]:
+                    mm[0] = v
+                if v > mm[1]:
+                    mm[1] = v
+    order = sorted(buckets)
+    series = {}
+    for f in fields:
+        lo, hi = [], []
+        for b in order:
+            mn, mx = buckets[b][f]
+            lo.append(_json_num(mn) if mn != math.inf else None)
+            hi.append(_json_num(mx) if mx != -math.inf else None)
+        series[f] = {"min": lo, "max": hi}
+    return {"t": [round(t0 + (b + 0.5) * width, 3) for b in order], "series": series}
+
+
+def lttb(pts, n):
+    """Largest-Triangle-Three-Buckets: n punktów z listy (t, v) zachowujących kształt wykresu."""
+    size = len(pts)
+    if n >= size or n < 3:
+        return pts
+    out = [pts[0]]
+    every = (size - 2) / (n - 2)
+    a = 0
+    for i in range(n - 2):
+        s = int(i * every) + 1
+        e = int((i + 1) * every) + 1
+        ns, ne = e, min(int((i + 2) * every) + 1, size)
+        if ns >= ne:
+            ns, ne = size - 1, size
+        cnt = ne - ns
+        avg_t = sum(p[0] for p in pts[ns:ne]) / cnt
+        avg_v = sum(p[1] for p in pts[ns:ne]) / cnt
+        at, av = pts[a]
+        best, best_i = -1.0, s
+        for j in range(s, e):
+            t, v = pts[j]
+            area = abs((at - avg_t) * (v - av) - (at - t) * (avg_v - av))
+            if area > best:
+                best, best_i = area, j
+        out.append(pts[best_i])
+        a = best_i
+    out.append(pts[-1])
+    return out
+
+
+def query_args(store, args):
+    """
+    Parametry /api/history z request.args → store.query(...). from/to: czas unix [s]
+    albo ujemny – sekundy wstecz od teraz (domyślnie ostatnia godzina);
+    job=<id segmentu> – okno tego zlecenia. ValueError przy złych parametrach.
+    """
+    now = time.time()
+    job = args.get("job")
+    if job:
+        seg = next((s for s in store.segments() if s["id"] == job), None)
+        if seg is None:
+            raise ValueError(f"Nieznane zlecenie: {job}")
+        t0, t1 = seg["t_first"], seg["t_last"]
+    else:
+        t0 = float(args.get("from") or -3600)
+        t1 = float(args.get("to") or now)
+        t0 = now + t0 if t0 <= 0 else t0
+        t1 = now + t1 if t1 <= 0 else t1
+    if t1 < t0:
+        raise ValueError("to < from")
+    mode = args.get("mode") or "minmax"
+    if mode not in ("minmax", "lttb"):
+        raise ValueError("mode: minmax albo lttb")
+    fields = [f for f in (args.get("fields") or ",".join(FIELDS)).split(",") if f]
+    bad = [f for f in fields if f not in _FIELD_POS]
+    if bad:
+        raise ValueError(f"Nieznane pola: {', '.join(bad)}")
+    return store.query(t0, t1, int(args.get("points") or 500), mode, fields)
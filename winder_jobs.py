@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Kolejka zleceń (receptur) – wspólna dla winder_server.py i winder_server_rpi.py.
+
+Receptura to komplet parametrów jednej cewki: rpm, pitch, bwidth, xrev, ycal
+(każdy opcjonalny – brak = bez zmiany), total i plan sekcji (sections = liczba
+równych sekcji albo plan = lista zwojów na sekcję), auto_next, name.
+
+Serwer wysyła parametry receptury razem z celem i startem (jedna partia
+komend), a po zakończeniu zlecenia czeka na potwierdzenie operatora
+(POST /api/queue/next) – dopiero wtedy rusza następne. Kolejka jest zapisywana
+do pliku JSON (zapis do pliku tymczasowego + os.replace – bez połówek po
+zaniku zasilania); zlecenie przerwane restartem serwera wraca do kolejki.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+
+QUEUE_DIR = os.environ.get("WINDER_QUEUE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "queue")
+PARAMS = ("rpm", "pitch", "bwidth", "xrev", "ycal")     # kolejność wysyłania
+KEEP_FINISHED = 50
+
+
+def section_plan(total, sections):
+    """Podział total na sections prawie równych sekcji (pierwsze o 1 większe); [] bez sekcji."""
+    if sections <= 0:
+        return []
+    per, rem = divmod(total, sections)
+    return [per + (1 if i < rem else 0) for i in range(sections)]
+
+
+def recipe_from(data):
+    """Receptura z JSON-a (dict); ValueError z opisem przy złych polach."""
+    try:
+        plan = [int(v) for v in data.get("plan") or []]
+        total = int(data.get("total") or sum(plan))
+        sections = int(data.get("sections") or 0)
+        r = {"name": str(data.get("name") or "")[:60], "total": total,
+             "plan": plan or section_plan(total, sections), "auto_next": bool(data.get("auto_next"))}
+        for k, conv in (("rpm", int), ("pitch", float), ("bwidth", float), ("xrev", int), ("ycal", float)):
+            v = data.get(k)
+            r[k] = conv(float(v)) if v not in (None, "") else None
+    except (TypeError, ValueError):
+        raise ValueError("Parametry receptury muszą być liczbami")
+    if total <= 0:
+        raise ValueError("Ilość zwojów musi być > 0")
+    if plan and (min(plan) <= 0 or sum(plan) != total):
+        raise ValueError("Plan sekcji: zwoje > 0, suma = total")
+    for k in ("pitch", "bwidth", "ycal"):
+        if r[k] is not None and r[k] <= 0:
+            raise ValueError(f"{k} musi być > 0")
+    if r["rpm"] is not None and r["rpm"] < 0:
+        raise ValueError("RPM musi być >= 0")
+    if r["xrev"] == 0:
+        raise ValueError("xrev nie może być 0")
+    return r
+
+
+def recipe_commands(recipe):
+    """Komendy firmware ustawiające parametry receptury (bez celu i startu)."""
+    return [f"{k} {recipe[k]}" for k in PARAMS if recipe.get(k) is not None]
+
+
+class JobQueue:
+    """
+    Zlecenia: {"id", receptura..., "state": queued | running | done | aborted | cancelled,
+    "t_added", "t_started", "t_done"}. Najwyżej jedno running.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.jobs = []
+        self._ids = itertools.count(1)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.jobs = json.load(f).get("jobs", [])
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"[queue] {self.path}: {e}")
+            return
+        for j in self.jobs:
+            if j["state"] == "running":       # restart w trakcie – do ponownego startu
+                j["state"], j["t_started"] = "queued", None
+        self._ids = itertools.count(max((int(j["id"]) for j in self.jobs), default=0) + 1)
+
+    def _save(self):
+        """Pod self._lock."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"jobs": self.jobs}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def add(self, recipe):
+        with self._lock:
+            job = dict(recipe, id=str(next(self._ids)), state="queued", t_added=time.time(),
+                       t_started=None, t_done=None)
+            self.jobs.append(job)
+            self._save()
+            return job
+
+    def remove(self, jid):
+        """Usuń zlecenie czekające w kolejce; None – nie ma takiego (albo już ruszyło)."""
+        with self._lock:
+            job = self._find(jid)
+            if job is None or job["state"] != "queued":
+                return None
+            job["state"], job["t_done"] = "cancelled", time.time()
+            self._trim()
+            self._save()
+            return job
+
+    def move(self, jid, index):
+        """Przestaw czekające zlecenie na pozycję index wśród czekających."""
+        with self._lock:
+            job = self._find(jid)
+            if job is None or job["state"] != "queued":
+                return None
+            self.jobs.remove(job)
+            queued = [j for j in self.jobs if j["state"] == "queued"]
+            if index < len(queued):
+                self.jobs.insert(self.jobs.index(queued[max(0, index)]), job)
+            else:
+                self.jobs.append(job)
+            self._save()
+            return job
+
+    def current(self):
+        with self._lock:
+            return next((j for j in self.jobs if j["state"] == "running"), None)
+
+    def next_queued(self):
+        with self._lock:
+            return next((j for j in self.jobs if j["state"] == "queued"), None)
+
+    def start_next(self):
+        """Następne czekające → running; None, gdy kolejka pusta albo coś już trwa."""
+        with self._lock:
+            if any(j["state"] == "running" for j in self.jobs):
+                return None
+            job = next((j for j in self.jobs if j["state"] == "queued"), None)
+            if job is not None:
+                job["state"], job["t_started"] = "running", time.time()
+                self._save()
+            return job
+
+    def finish(self, state="done", jid=None):
+        """Zakończ bieżące zlecenie (jid – tylko gdy to ono); zwraca je albo None."""
+        with self._lock:
+            job = next((j for j in self.jobs if j["state"] == "running"), None)
+            if job is None or (jid is not None and job["id"] != jid):
+                return None
+            job["state"], job["t_done"] = state, time.time()
+            self._trim()
+            self._save()
+            return job
+
+    def summary(self):
+        """Pola do /api/status: bieżące i następne zlecenie, liczba czekających."""
+        with self._lock:
+            cur = next((j for j in self.jobs if j["state"] == "running"), None)
+            queued = [j for j in self.jobs if j["state"] == "queued"]
+        return {"queue_current": cur["id"] if cur else None,
+                "queue_next": queued[0]["id"] if queued else None,
+                "queue_len": len(queued)}
+
+    def as_dict(self):
+        with self._lock:
+            return {"jobs": [dict(j) for j in self.jobs]}
+
+    def _find(self, jid):
+        return next((j for j in self.jobs if j["id"] == jid), None)
+
+    def _trim(self):
+        finished = [j for j in self.jobs if j["state"] not in ("queued", "running")]
+        for j in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            self.jobs.remove(j)
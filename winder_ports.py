@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Lista portów szeregowych w tle + wykrywanie podłączenia/odłączenia (hot-plug).
+
+serial.tools.list_ports.comports() przegląda sysfs dla każdego tty – na Pi Zero
+to setki ms. PortWatcher trzyma gotową listę (ports()) i odświeża ją tylko,
+gdy w /dev coś się zmieni:
+
+- Linux: inotify na /dev (ctypes, bez dodatkowych pakietów) – zdarzenia
+  IN_CREATE/IN_DELETE/IN_ATTRIB dla ttyACM*/ttyUSB*/..., potem krótka pauza
+  (udev zakłada węzeł, a uprawnienia ustawia chwilę później),
+- bez inotify: co POLL_SEC porównanie os.listdir("/dev") (tanie), a gdy i tego
+  nie ma (Windows) – comports() co POLL_SEC.
+
+Subskrybenci dostają fn(added, removed) (zbiory nazw urządzeń) z wątku watchera.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+
+import serial.tools.list_ports
+
+POLL_SEC = 2.0          # fallback bez inotify
+RESCAN_SEC = 30.0       # z inotify – i tak pełne odświeżenie co tyle (zgubione zdarzenia)
+SETTLE_SEC = 0.3        # po zdarzeniu: udev kończy zakładanie węzła
+TTY_PREFIXES = ("ttyACM", "ttyUSB", "ttyAMA", "ttyS", "rfcomm", "cu.", "tty.usb")
+
+IN_ATTRIB = 0x004
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+_EVENT = struct.Struct("iIII")
+
+
+def _inotify(path):
+    """Deskryptor inotify obserwujący path albo None (nie-Linux, brak uprawnień)."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, path.encode(), IN_CREATE | IN_DELETE | IN_ATTRIB) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _tty_names(data):
+    """Nazwy plików tty z bufora zdarzeń inotify."""
+    names = []
+    off = 0
+    while off + _EVENT.size <= len(data):
+        _, _, _, n = _EVENT.unpack_from(data, off)
+        off += _EVENT.size
+        name = data[off:off + n].split(b"\0", 1)[0].decode(errors="ignore")
+        off += n
+        if name.startswith(TTY_PREFIXES):
+            names.append(name)
+    return names
+
+
+class PortWatcher:
+    def __init__(self, dev="/dev", list_fn=None):
+        self.dev = dev
+        self.list_fn = list_fn or (lambda: [p.device for p in serial.tools.list_ports.comports()])
+        self._ports = []
+        self._lock = threading.Lock()
+        self._subs = []
+        self._thread = None
+        self.mode = None            # "inotify" | "listdir" | "comports"
+        self.refreshes = 0
+
+    def start(self):
+        """Pierwsza lista synchronicznie, potem wątek w tle (wielokrotne wywołanie – bez skutku)."""
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._thread = threading.Thread(target=self._run, name="port-watcher", daemon=True)
+        self.refresh()
+        self._thread.start()
+        return self
+
+    def ports(self):
+        with self._lock:
+            return list(self._ports)
+
+    def subscribe(self, fn):
+        self._subs.append(fn)
+
+    def refresh(self):
+        """Odczytaj listę portów teraz; subskrybenci dostają różnicę."""
+        try:
+            new = sorted(self.list_fn())
+        except Exception as e:
+            print(f"[ports] {e}")
+            return self.ports()
+        with self._lock:
+            old = set(self._ports)
+            self._ports = new
+            self.refreshes += 1
+        added, removed = set(new) - old, old - set(new)
+        if added or removed:
+            for fn in list(self._subs):
+                try:
+                    fn(added, removed)
+                except Exception as e:
+                    print(f"[ports] {e}")
+        return new
+
+    def _run(self):
+        fd = _inotify(self.dev)
+        if fd is not None:
+            self.mode = "inotify"
+            self._run_inotify(fd)
+        elif os.path.isdir(self.dev):
+            self.mode = "listdir"
+            self._run_listdir()
+        else:
+            self.mode = "comports"
+            while True:
+                time.sleep(POLL_SEC)
+                self.refresh()
+
+    def _run_inotify(self, fd):
+        while True:
+            r, _, _ = select.select([fd], [], [], RESCAN_SEC)
+            if not r:
+                self.refresh()
+                continue
+            hit = False
+            while True:
+                try:
+                    data = os.read(fd, 4096)
+                except BlockingIOError:
+                    break
+                hit = hit or bool(_tty_names(data))
+            if hit:
+                time.sleep(SETTLE_SEC)
+                self.refresh()
+
+    def _run_listdir(self):
+        seen = None
+        while True:
+            try:
+                names = {n for n in os.listdir(self.dev) if n.startswith(TTY_PREFIXES)}
+            except OSError:
+                names = None
+            if names != seen:
+                if seen is not None:
+                    time.sleep(SETTLE_SEC)
+                    self.refresh()
+                seen = names
+            time.sleep(POLL_SEC)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Profile rozpędzania / hamowania wrzeciona (oś X) dla WinderEngineRPi.
+
+ramp_table() zwraca tablicę odstępów między krokami [s] od prędkości
+startowej (RAMP_START_RPM) do zadanego RPM – trapez (stałe przyspieszenie)
+albo S-curve (gładki start i dojście, bez skoku przyspieszenia). Tablice są
+liczone raz i trzymane w cache per (rpm, accel, kroki/obrót, profil), więc
+w trakcie pracy pętla kroków tylko indeksuje gotową tablicę.
+
+Długość tablicy rośnie z v²/a – RAMP_MAX_STEPS ją ogranicza (przyspieszenie
+podnoszone do min_accel), a set_accel odrzuca wartości poniżej ACCEL_MIN_RPM_S.
+
+RampPlanner prowadzi indeks po tablicy: rozpędza, zwalnia przy zmianie RPM
+w dół i planuje hamowanie tak, żeby ostatni krok wypadł dokładnie na celu.
+"""
+from functools import lru_cache
+
+RAMP_START_RPM = 20          # prędkość, od której rusza wrzeciono (bez rampy poniżej)
+ACCEL_MIN_RPM_S = 10.0       # mniejsze przyspieszenie (poza 0 = bez rampy) – odrzucane
+RAMP_MAX_STEPS = 100_000     # najdłuższa tablica: ~3 MB, budowa w kilkadziesiąt ms
+PROFILES = ("trap", "scurve")
+
+
+def rpm_to_sps(rpm, steps_per_rev):
+    return max(1.0, rpm * steps_per_rev / 60.0)
+
+
+def min_accel(rpm, steps_per_rev, profile="trap"):
+    """Najmniejsze przyspieszenie [RPM/s], przy którym rampa do rpm mieści się w RAMP_MAX_STEPS."""
+    if rpm <= RAMP_START_RPM or steps_per_rev <= 0:
+        return 0.0
+    v0 = rpm_to_sps(RAMP_START_RPM, steps_per_rev)
+    v1 = rpm_to_sps(rpm, steps_per_rev)
+    if profile == "scurve":
+        a = 1.5 * (v1 - v0) * 0.5 * (v0 + v1) / RAMP_MAX_STEPS   # kroki = średnia v × T
+    else:
+        a = (v1 * v1 - v0 * v0) / (2.0 * RAMP_MAX_STEPS)
+    return a * 60.0 / steps_per_rev
+
+
+@lru_cache(maxsize=4)
+def ramp_table(rpm, accel_rpm_s, steps_per_rev, profile="trap"):
+    """
+    Odstępy między kolejnymi krokami [s] podczas rozpędzania od RAMP_START_RPM
+    do rpm, z przyspieszeniem accel_rpm_s [RPM/s] (S-curve: szczytowym), nie
+    mniejszym niż min_accel – tablica ma najwyżej RAMP_MAX_STEPS pozycji.
+    Pusta krotka = bez rampy (accel <= 0 albo rpm <= prędkości startowej).
+    """
+    if accel_rpm_s <= 0 or rpm <= RAMP_START_RPM or steps_per_rev <= 0:
+        return ()
+    v0 = rpm_to_sps(RAMP_START_RPM, steps_per_rev)
+    v1 = rpm_to_sps(rpm, steps_per_rev)
+    accel_rpm_s = max(accel_rpm_s, min_accel(rpm, steps_per_rev, profile))
+    a = accel_rpm_s * steps_per_rev / 60.0      # [kroki/s²]
+    out = []
+    if profile == "scurve":
+        # v(t) = v0 + (v1-v0)·(3τ² - 2τ³), τ = t/T; szczytowe a = 1.5·(v1-v0)/T
+        dv = v1 - v0
+        T = 1.5 * dv / a
+        t = 0.0
+        while t < T and len(out) < RAMP_MAX_STEPS:
+            v = v0 + dv * _smoothstep(t / T)
+            dt = 1.0 / v
+            v = v0 + dv * _smoothstep(min(1.0, (t + 0.5 * dt) / T))   # punkt środkowy
+            dt = 1.0 / v
+            out.append(dt)
+            t += dt
+    else:
+        # trapez: v_k = sqrt(v0² + 2·a·k)
+        v0_sq = v0 * v0
+        n = min(int((v1 * v1 - v0_sq) / (2.0 * a)), RAMP_MAX_STEPS)
+        for k in range(n):
+            out.append(1.0 / (v0_sq + 2.0 * a * k) ** 0.5)
+    return tuple(out)
+
+
+def _smoothstep(x):
+    return x * x * (3.0 - 2.0 * x)
+
+
+def _count_slower(table, interval):
+    """Ile początkowych wpisów tablicy (malejącej) ma odstęp > interval."""
+    lo, hi = 0, len(table)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if table[mid] > interval:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class RampPlanner:
+    """
+    Stan rampy w pętli kroków. i = bieżąca pozycja w tablicy (prędkość),
+    n = pozycja docelowa (n == len(table) → dalej prędkość przelotowa cruise).
+    fresh = od reset() nie było kroku; bez tablicy (accel=0) pętla nie woła
+    next_interval, więc sama zeruje fresh po pierwszym kroku / fragmencie.
+    """
+
+    __slots__ = ("table", "i", "n", "cruise", "fresh")
+
+    def __init__(self, table=(), cruise=0.0):
+        self.table = table
+        self.i = 0
+        self.n = len(table)
+        self.cruise = cruise
+        self.fresh = True
+
+    def reset(self):
+        """Start od zatrzymania (run / resume)."""
+        self.i = 0
+        self.fresh = True
+
+    @property
+    def cruising(self):
+        return self.i == self.n
+
+    def retarget(self, table, cruise):
+        """Nowe RPM / przyspieszenie w trakcie ruchu – kontynuuj od bieżącej prędkości."""
+        if not table:
+            self.table, self.i, self.n, self.cruise = (), 0, 0, cruise
+            return
+        if self.fresh:
+            self.table, self.i, self.n, self.cruise = table, 0, len(table), cruise
+            return
+        if self.table:
+            cur = self.table[self.i - 1] if self.i > 0 else self.table[0]
+        else:
+            cur = self.cruise   # jazda bez rampy (accel=0) – bieżąca prędkość to cruise
+        if cur > cruise or not self.table:
+            # szybciej niż teraz – rozpędzaj dalej po nowej tablicy
+            self.table, self.n, self.cruise = table, len(table), cruise
+            self.i = _count_slower(table, cur)
+        else:
+            # wolniej – zjedź po bieżącej tablicy do nowej prędkości
+            self.n = _count_slower(self.table, cruise)
+            self.cruise = cruise
+            if self.n == len(self.table):
+                self.table, self.i, self.n = table, len(table), len(table)
+
+    def next_interval(self, rem=None):
+        """
+        Odstęp po bieżącym kroku [s]. rem = kroki X do celu (łącznie z tym);
+        gdy rem <= i, hamuj po tablicy tak, by zatrzymać się na celu.
+        """
+        table = self.table
+        self.fresh = False
+        if rem is not None and rem <= self.i:
+            self.i = rem - 1 if rem > 1 else 0
+            return table[self.i]
+        i = self.i
+        if i < self.n:
+            self.i = i + 1
+            return table[i]
+        if i > self.n:
+            self.i = i - 1
+            return table[i - 1]
+        return self.cruise
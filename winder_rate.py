@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Rzeczywista prędkość wrzeciona i czas do końca – z próbek zwojów (enkoder
+X_turns_real / _enc_ticks, bez enkodera zliczone kroki X_turns).
+
+RateEstimator trzyma dwa bufory (t, zwoje) ze znacznikiem czasu:
+- krótki (ostatnie RATE_WINDOW s, każda próbka): nachylenie prostej
+  najmniejszych kwadratów, wygładzane EWMA (stała RATE_TAU) – measured_rpm;
+  kwantyzacja enkodera i nierówne odstępy linii stanu nie szarpią wyniku,
+- długi (punkt co THROUGHPUT_STEP s, ostatnie THROUGHPUT_WINDOW s): zwoje
+  nawinięte na minutę łącznie z postojami (wymiana sekcji, operator) –
+  turns_per_min, z tego ETA całego planu.
+
+Licznik zwojów cofnięty (nowy start, reset Arduino) nie psuje pomiaru:
+sumujemy tylko przyrosty. Czas: time.monotonic().
+"""
+import math
+import time
+from collections import deque
+
+RATE_WINDOW = 3.0            # [s] okno dopasowania prędkości
+RATE_TAU = 1.5               # [s] stała czasowa EWMA
+RATE_MIN_SPAN = 0.3          # [s] minimalna rozpiętość próbek do dopasowania
+RATE_MAX_SAMPLES = 256
+THROUGHPUT_STEP = 5.0        # [s] odstęp punktów bufora wydajności
+THROUGHPUT_WINDOW = 600.0    # [s] okno wydajności (10 min)
+MIN_TURNS_PER_SEC = 0.01     # poniżej – stoi (brak ETA)
+
+
+def plan_left(turns, goal, plan=(), section_ptr=0):
+    """
+    Zwoje do końca całego zlecenia: do bieżącego celu + sekcje po nim.
+    Po osiągnięciu celu section_ptr wskazuje już następną sekcję (jeszcze nie ruszyła).
+    """
+    if goal is None or turns is None:
+        return None
+    left = max(0, goal - turns)
+    rest = plan[section_ptr:] if left == 0 else plan[section_ptr + 1:]
+    return left + sum(rest)
+
+
+def fmt_eta(seconds):
+    """ETA do wyświetlenia: "1:02:03" / "2:03"; "—" gdy brak."""
+    if seconds is None:
+        return "—"
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+
+class RateEstimator:
+    """Bufor próbek (t, zwoje) → zmierzone RPM, zwoje/min, ETA celu, sekcji i planu."""
+
+    def __init__(self):
+        self._samples = deque(maxlen=RATE_MAX_SAMPLES)   # (t, zwoje) z ostatnich RATE_WINDOW s
+        self._progress = deque()                         # (t, nawinięte łącznie) co THROUGHPUT_STEP s
+        self._done = 0.0                                 # suma przyrostów zwojów
+        self._rate = None                                # [zwoje/s] EWMA nachylenia
+        self._t_rate = None
+
+    def add(self, turns, t=None):
+        """Nowa próbka licznika zwojów (enkoder, gdy jest)."""
+        if turns is None:
+            return
+        t = time.monotonic() if t is None else t
+        s = self._samples
+        if s:
+            t_last, last = s[-1]
+            if t <= t_last:
+                return
+            if turns < last:          # licznik od zera – nowe zlecenie albo reset firmware
+                s.clear()
+                self._rate = None
+                self._done += max(0.0, turns)
+            else:
+                self._done += turns - last
+        s.append((t, turns))
+        while t - s[0][0] > RATE_WINDOW:
+            s.popleft()
+        p = self._progress
+        if len(p) == 1 and p[0][1] == self._done:
+            p[0] = (t, self._done)    # stoi – punkt odniesienia idzie za ostatnią próbką
+        elif not p or t - p[-1][0] >= THROUGHPUT_STEP:
+            p.append((t, self._done))
+            while t - p[0][0] > THROUGHPUT_WINDOW:
+                p.popleft()
+            while len(p) >= 2 and p[1][1] == p[0][1]:   # postój przed startem nie zaniża wydajności
+                p.popleft()
+        slope = self._slope()
+        if slope is None:
+            return
+        if self._rate is None:
+            self._rate = slope
+        else:
+            self._rate += (1.0 - math.exp(-(t - self._t_rate) / RATE_TAU)) * (slope - self._rate)
+        self._t_rate = t
+
+    def _slope(self):
+        s = self._samples
+        n = len(s)
+        if n < 2 or s[-1][0] - s[0][0] < RATE_MIN_SPAN:
+            return None
+        t0 = s[0][0]
+        mt = sum(t - t0 for t, _ in s) / n
+        my = sum(y for _, y in s) / n
+        sxx = sum((t - t0 - mt) ** 2 for t, _ in s)
+        sxy = sum((t - t0 - mt) * (y - my) for t, y in s)
+        return sxy / sxx if sxx > 0 else None
+
+    def rate(self, t=None):
+        """Zmierzona prędkość [zwoje/s]; 0 gdy od RATE_WINDOW s nie było próbki, None – za mało danych."""
+        t = time.monotonic() if t is None else t
+        if not self._samples or t - self._samples[-1][0] > RATE_WINDOW:
+            return 0.0 if self._rate is not None else None
+        return max(0.0, self._rate) if self._rate is not None else None
+
+    def throughput(self, t=None):
+        """Zwoje/s z ostatnich THROUGHPUT_WINDOW s, z postojami w trakcie pracy; None – brak postępu."""
+        t = time.monotonic() if t is None else t
+        p = self._progress
+        if not p or self._done <= p[0][1] or t - p[0][0] < RATE_MIN_SPAN:
+            return None
+        return (self._done - p[0][1]) / (t - p[0][0])
+
+    def fields(self, turns, goal=None, plan=(), section_ptr=0, sections_mode=False, t=None):
+        """
+        Pola do /api/status: measured_rpm, turns_per_min, eta_goal_s (do celu firmware),
+        eta_section_s (koniec bieżącej sekcji, tylko w trybie sekcji), eta_plan_s (całe zlecenie).
+        """
+        t = time.monotonic() if t is None else t
+        rate, thr = self.rate(t), self.throughput(t)
+        goal_left = max(0, goal - turns) if goal is not None and turns is not None else None
+        eta_goal = None
+        if goal_left == 0:
+            eta_goal = 0
+        elif goal_left is not None and rate is not None and rate > MIN_TURNS_PER_SEC:
+            eta_goal = round(goal_left / rate)
+        left = plan_left(turns, goal, plan, section_ptr)
+        speed = thr if thr is not None and thr > MIN_TURNS_PER_SEC else rate
+        eta_plan = None
+        if left == 0:
+            eta_plan = 0
+        elif left is not None and speed is not None and speed > MIN_TURNS_PER_SEC:
+            eta_plan = round(left / speed)
+        return {
+            "measured_rpm": round(rate * 60.0, 1) if rate is not None else None,
+            "turns_per_min": round(thr * 60.0, 1) if thr is not None else None,
+            "eta_goal_s": eta_goal,
+            "eta_section_s": eta_goal if sections_mode else None,
+            "eta_plan_s": eta_plan,
+        }
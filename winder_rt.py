@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tryb czasu rzeczywistego dla pętli kroków (opcjonalny, WINDER_RT=1).
+
+apply_rt() woła wątek pętli kroków na starcie:
+- SCHED_FIFO (os.sched_setscheduler) – wymaga roota albo CAP_SYS_NICE / limitu rtprio,
+- przypięcie do rdzenia (os.sched_setaffinity) – najlepiej izolowanego
+  (isolcpus=3 w /boot/cmdline.txt), inaczej ostatni dostępny,
+- mlockall() – bez page faultów na stronach kodu/danych w trakcie ruchu.
+
+Każdy krok może się nie udać (brak uprawnień, inny system) – wtedy działamy
+dalej bez niego, a zwrócony słownik mówi, co faktycznie zostało ustawione.
+
+GcGuard wyłącza garbage collector na czas RUN (gc.freeze + gc.disable) i
+przywraca go po zatrzymaniu – pauza GC nie trafia w przebieg kroków.
+"""
+import ctypes
+import ctypes.util
+import gc
+import os
+
+RT_PRIORITY = 80            # priorytet SCHED_FIFO (1–99); wątki IRQ jądra mają zwykle 50
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+
+def isolated_cpus():
+    """Rdzenie wyłączone z planisty (isolcpus=...), np. {3}; pusty zbiór gdy brak."""
+    try:
+        with open("/sys/devices/system/cpu/isolated") as f:
+            text = f.read().strip()
+    except OSError:
+        return set()
+    cpus = set()
+    for part in text.split(","):
+        if not part:
+            continue
+        if "-" in part:
+            a, b = part.split("-")
+            cpus.update(range(int(a), int(b) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def pick_cpu(cpu=None):
+    """Rdzeń dla pętli kroków: zadany, pierwszy izolowany albo ostatni dostępny."""
+    if cpu is not None:
+        return int(cpu)
+    iso = isolated_cpus()
+    if iso:
+        return min(iso)
+    if hasattr(os, "sched_getaffinity"):
+        return max(os.sched_getaffinity(0))
+    return None
+
+
+def _mlockall():
+    """mlockall(MCL_CURRENT | MCL_FUTURE) przez libc; None = OK, inaczej opis błędu."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+            return os.strerror(ctypes.get_errno())
+    except (OSError, AttributeError) as e:
+        return str(e)
+    return None
+
+
+def apply_rt(priority=RT_PRIORITY, cpu=None, lock_memory=True):
+    """
+    Ustaw tryb RT dla bieżącego wątku (pid 0 = wywołujący wątek w Linuksie).
+    Zwraca słownik z efektywnymi ustawieniami i listą błędów.
+    """
+    info = {"enabled": True, "sched": "SCHED_OTHER", "priority": 0, "cpu": None,
+            "mlock": False, "errors": []}
+
+    if hasattr(os, "sched_setscheduler"):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+            info["sched"] = "SCHED_FIFO"
+            info["priority"] = os.sched_getparam(0).sched_priority
+        except (OSError, ValueError) as e:
+            info["errors"].append(f"SCHED_FIFO: {e}")
+    else:
+        info["errors"].append("SCHED_FIFO: niedostępne w tym systemie")
+
+    target = pick_cpu(cpu)
+    if target is not None and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {target})
+            info["cpu"] = sorted(os.sched_getaffinity(0))
+        except (OSError, ValueError) as e:
+            info["errors"].append(f"affinity {target}: {e}")
+    elif target is None:
+        info["errors"].append("affinity: niedostępne w tym systemie")
+
+    if lock_memory:
+        err = _mlockall()
+        if err is None:
+            info["mlock"] = True
+        else:
+            info["errors"].append(f"mlockall: {err}")
+    return info
+
+
+def rt_from_env():
+    """Ustawienia RT z env: WINDER_RT=1, WINDER_RT_CPU, WINDER_RT_PRIO. None = tryb wyłączony."""
+    if os.environ.get("WINDER_RT") != "1":
+        return None
+    cpu = os.environ.get("WINDER_RT_CPU")
+    return {
+        "priority": int(os.environ.get("WINDER_RT_PRIO", RT_PRIORITY)),
+        "cpu": int(cpu) if cpu not in (None, "") else None,
+    }
+
+
+class GcGuard:
+    """
+    GC wyłączony na czas RUN. hold() – zbierz śmieci teraz (przed ruchem),
+    zamroź przeżyte obiekty i wyłącz GC; release() – przywróć stan sprzed hold().
+    Uwaga: GC jest wspólny dla procesu (także wątków serwera).
+    """
+
+    __slots__ = ("enabled", "held", "_was_enabled")
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.held = False
+        self._was_enabled = True
+
+    def hold(self):
+        if self.held:
+            return
+        self.held = True
+        if not self.enabled:
+            return
+        self._was_enabled = gc.isenabled()
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+
+    def release(self):
+        if not self.held:
+            return
+        self.held = False
+        if not self.enabled:
+            return
+        gc.unfreeze()
+        if self._was_enabled:
+            gc.enable()
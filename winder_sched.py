@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Opóźnione komendy bez usypiania wątków (koło czasowe / timer wheel).
+
+Serwer po "[goal] reached" musi np. wysłać motoff po 120 ms albo start
+następnej sekcji po 300 ms. Zamiast time.sleep() w wątku czytającym port
+(albo nowego wątku na każde opóźnienie) zadania trafiają do TimerWheel:
+jeden wątek tyka co `tick` sekund i uruchamia zadania z bieżącego slotu.
+
+    wheel = TimerWheel()
+    wheel.schedule(0.12, send, "motoff", tag="job")
+    wheel.cancel_tag("job")        # np. operator wcisnął STOP
+
+Dodanie i anulowanie zadania to O(1). cancel_tag sięga przez indeks tag → zadania,
+więc kosztuje tyle, ile zadań ma ten tag, bez przeglądania slotów koła. Bez
+zadań wątek śpi na Condition.
+"""
+import math
+import threading
+import time
+
+WHEEL_TICK = 0.01      # rozdzielczość 10 ms – wystarcza dla opóźnień 100+ ms
+WHEEL_SLOTS = 128      # jeden obrót koła = 1.28 s; dłuższe opóźnienia liczą obroty
+
+
+class Timer:
+    __slots__ = ("fn", "args", "tag", "rounds", "cancelled")
+
+    def __init__(self, fn, args, tag, rounds):
+        self.fn = fn
+        self.args = args
+        self.tag = tag
+        self.rounds = rounds
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    def __init__(self, tick=WHEEL_TICK, slots=WHEEL_SLOTS):
+        self.tick = tick
+        self._slots = [[] for _ in range(slots)]
+        self._pos = 0
+        self._count = 0
+        self._by_tag = {}            # tag → set(Timer) oczekujących w kole
+        self._next_tick = 0.0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def schedule(self, delay, fn, *args, tag=None):
+        """Wywołaj fn(*args) za delay sekund (zaokrąglone w górę do ticku). Zwraca Timer."""
+        n = len(self._slots)
+        ticks = max(1, math.ceil(delay / self.tick - 1e-9))
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="winder-timers", daemon=True)
+                self._thread.start()
+            if self._count == 0:
+                self._next_tick = time.monotonic() + self.tick   # koło startuje od "teraz"
+            t = Timer(fn, args, tag, (ticks - 1) // n)
+            self._slots[(self._pos + ticks) % n].append(t)
+            self._count += 1
+            if tag is not None:
+                self._by_tag.setdefault(tag, set()).add(t)
+            self._cond.notify()
+        return t
+
+    def cancel_tag(self, tag):
+        """Anuluj wszystkie oczekujące zadania z danym tagiem; zwraca ich liczbę."""
+        cancelled = 0
+        with self._cond:
+            for t in self._by_tag.pop(tag, ()):
+                if not t.cancelled:
+                    t.cancelled = True
+                    cancelled += 1
+        return cancelled
+
+    def pending(self, tag=None):
+        with self._cond:
+            if tag is not None:
+                return sum(1 for t in self._by_tag.get(tag, ()) if not t.cancelled)
+            return sum(1 for slot in self._slots for t in slot if not t.cancelled)
+
+    def _untag(self, t):
+        """Zadanie opuszcza koło (wykonane / anulowane) – usuń z indeksu tagów (pod self._cond)."""
+        timers = self._by_tag.get(t.tag)
+        if timers is not None:
+            timers.discard(t)
+            if not timers:
+                del self._by_tag[t.tag]
+
+    def _run(self):
+        slots = self._slots
+        n = len(slots)
+        while True:
+            with self._cond:
+                while self._count == 0:
+                    self._cond.wait()
+                wait = self._next_tick - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                self._pos = pos = (self._pos + 1) % n
+                self._next_tick += self.tick
+                slot = slots[pos]
+                due = []
+                keep = []
+                for t in slot:
+                    if t.cancelled:
+                        if t.tag is not None:
+                            self._untag(t)
+                        continue
+                    if t.rounds:
+                        t.rounds -= 1
+                        keep.append(t)
+                    else:
+                        due.append(t)
+                        if t.tag is not None:
+                            self._untag(t)
+                self._count -= len(slot) - len(keep)
+                slots[pos] = keep
+            for t in due:
+                try:
+                    t.fn(*t.args)
+                except Exception as e:
+                    print(f"[timers] {getattr(t.fn, '__name__', t.fn)}: {e}")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Transport portu szeregowego – wspólny dla GUI (winder4.py) i serwera WWW
+(winder_server.py).
+
+Odczyt: jeden wątek czyta naraz wszystko, co zgłasza in_waiting (min. 1 bajt –
+read() wraca przy pierwszym bajcie, a nie po timeout jak readline()), tnie
+linie w jednym, ponownie używanym buforze i woła on_line(linia, t), gdzie t to
+time.monotonic() przyjścia porcji danych z tą linią.
+
+Zapis: jedna kolejka i jeden wątek piszący. Komendy dodane, zanim wątek się
+obudzi (np. "goal N" + "moton" z send_many), idą jednym write() – maks.
+WRITE_MAX bajtów naraz, żeby nie przepełnić 64-bajtowego bufora RX Arduino.
+
+    tr = SerialTransport(serial.Serial(port, 115200, timeout=1), on_line, on_error).start()
+    tr.send_many(("goal 120", "moton"))
+    tr.close()                    # port zamyka właściciel
+"""
+import collections
+import threading
+import time
+
+WRITE_MAX = 64        # bufor RX Arduino UNO
+READ_MAX = 4096       # maks. bajtów na jedno read()
+LINE_MAX = 4096       # dłuższy "wiersz" bez \n to śmieci (zła prędkość portu) – odrzucamy
+
+# Łączenie bez stałego sleep(2): gotowe po banerze / linii stanu (winder_telemetry.is_ready_line)
+CONNECT_PROBE = 2.5     # [s] bez banera (płytka bez resetu przy otwarciu) – wyślij "status"
+CONNECT_TIMEOUT = 5.0   # [s] brak odpowiedzi firmware – rezygnujemy z połączenia
+
+
+class SerialTransport:
+    def __init__(self, port, on_line, on_error=None):
+        self.port = port
+        self.on_line = on_line        # on_line(line: str, t: float) – z wątku czytającego
+        self.on_error = on_error      # on_error(exc) – raz, po błędzie portu
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._reader = None
+        self._writer = None
+        # statystyki (bench_serial, diagnostyka)
+        self.lines_in = 0
+        self.bytes_in = 0
+        self.reads = 0
+        self.cmds_out = 0
+        self.writes = 0
+
+    @property
+    def is_open(self):
+        return not self._closed
+
+    def start(self):
+        self._reader = threading.Thread(target=self._read_loop, name="serial-rx", daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, name="serial-tx", daemon=True)
+        self._reader.start()
+        self._writer.start()
+        return self
+
+    def send(self, cmd):
+        return self.send_many((cmd,))
+
+    def send_many(self, cmds):
+        """Komendy w podanej kolejności, wysłane razem (jeden write, jeśli się mieszczą)."""
+        with self._cond:
+            if self._closed:
+                return False
+            self._queue.extend(cmds)
+            self._cond.notify()
+        return True
+
+    def close(self):
+        """Zatrzymaj wątki (niewysłane komendy przepadają); portu nie zamyka."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.clear()
+            self._cond.notify()
+        cancel = getattr(self.port, "cancel_read", None)
+        if cancel is not None:
+            try:
+                cancel()
+            except Exception:
+                pass
+
+    def _fail(self, exc):
+        with self._cond:
+            if self._closed:
+                return          # zamknięte przez właściciela – błąd oczekiwany
+            self._closed = True
+            self._cond.notify()
+        if self.on_error is not None:
+            self.on_error(exc)
+
+    def _read_loop(self):
+        port = self.port
+        on_line = self.on_line
+        buf = bytearray()
+        try:
+            while not self._closed:
+                data = port.read(min(max(1, port.in_waiting), READ_MAX))
+                if not data:
+                    continue
+                t = time.monotonic()
+                self.reads += 1
+                self.bytes_in += len(data)
+                buf += data
+                start = 0
+                while True:
+                    end = buf.find(b"\n", start)
+                    if end < 0:
+                        break
+                    line = buf[start:end].decode("utf-8", errors="ignore").rstrip("\r")
+                    start = end + 1
+                    if line:
+                        self.lines_in += 1
+                        on_line(line, t)
+                if start:
+                    del buf[:start]
+                if len(buf) > LINE_MAX:
+                    buf.clear()
+        except (OSError, TypeError) as e:   # TypeError: in_waiting na zamkniętym porcie
+            self._fail(e)
+
+    def _write_loop(self):
+        q = self._queue
+        cond = self._cond
+        while True:
+            with cond:
+                while not q and not self._closed:
+                    cond.wait()
+                if self._closed:
+                    return
+                out = bytearray()
+                n = 0
+                while q:
+                    b = (q[0] + "\n").encode("utf-8")
+                    if out and len(out) + len(b) > WRITE_MAX:
+                        break
+                    out += b
+                    q.popleft()
+                    n += 1
+            try:
+                self.port.write(out)
+            except (OSError, TypeError) as e:
+                self._fail(e)
+                return
+            self.writes += 1
+            self.cmds_out += n
@@ -2,13 +2,28 @@
 """
 Serwer WWW sterownika nawijarki – do uruchomienia na RPi (bez pulpitu).
 Arduino podłączone przez USB. Sterowanie z przeglądarki (telefon, laptop).
+
+Kilka nawijarek naraz: każda to Machine (własny port, transport, kanał komend,
+log i StatusHub). /api/... – maszyna domyślna, /api/machines/<id>/... – wybrana,
+/api/machines – stan wszystkich. Lista maszyn: WINDER_MACHINES="a=/dev/ttyACM0,b".
 """
-import re
+import json
+import os
 import threading
 import time
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 import serial
-import serial.tools.list_ports
+
+from winder_commands import CommandChannel, CommandError
+from winder_design import design_args
+from winder_events import LogRing, StatusHub
+from winder_history import HISTORY_DIR, HistoryStore, query_args
+from winder_jobs import QUEUE_DIR, JobQueue, recipe_commands, recipe_from, section_plan
+from winder_ports import PortWatcher
+from winder_rate import RateEstimator
+from winder_sched import TimerWheel
+from winder_serial import CONNECT_PROBE, CONNECT_TIMEOUT, SerialTransport
+from winder_telemetry import is_ready_line, parse_line
 
 app = Flask(__name__, static_folder="static", static_url_path="")
 
@@ -18,7 +33,12 @@ class WinderState:
         self.lock = threading.Lock()
         self.serial_port = None
         self.connected = False
-        self.read_thread = None
+        self.connecting = False  # port otwarty, czekamy na baner / linię stanu firmware
+        self.port_name = None
+        self.connect_t0 = 0.0
+        self.resync = None      # po zerwaniu łącza: {"port", "turns", "t_lost"} – auto-reconnect
+        self.transport = None   # SerialTransport: wątek odczytu + kolejka zapisu
+        self.channel = None     # CommandChannel: potwierdzenia komend + czasy odpowiedzi
         self.state = "IDLE"
         self.current_turns = 0
         self.current_turns_real = None
@@ -27,8 +47,7 @@ class WinderState:
         self.eff_w = None
         self.turns_per_layer = None
         self.endstop = None
-        self.log_lines = []
-        self.max_log = 200
+        self.log = LogRing(200)  # linie z Arduino z numerami (seq) – /api/log?since=
         # Sekcje
         self.sections_mode = False
         self.section_plan = []
@@ -36,103 +55,386 @@ class WinderState:
         self.last_goal = None
         self.auto_next_section = False
 
-winder = WinderState()
+timers = TimerWheel()   # opóźnione komendy (motoff / następna sekcja) – bez sleep w wątkach
+MOTOFF_DELAY = 0.12     # silnik dojeżdża, zanim zdejmiemy prąd
+NEXT_SECTION_DELAY = 0.3
+ACK_WAIT = 1.5          # /api/start czeka na potwierdzenie goal/moton (z ponowieniem)
+RECONNECT_RETRY = 1.0   # port jest, ale się nie otwiera / milczy – kolejna próba po tylu s
+ports = PortWatcher()   # lista portów w tle (inotify na /dev) – /api/ports i powrót kabla
 
 
-def _send_raw(cmd: str):
-    if not (winder.connected and winder.serial_port and winder.serial_port.is_open):
-        return
+def _wait_acks(pending):
+    """None, gdy wszystkie komendy potwierdzone; inaczej opis błędu."""
     try:
-        winder.serial_port.write((cmd + "\n").encode("utf-8"))
-    except serial.SerialException:
-        winder.connected = False
-
-
-def _handle_line(line: str):
-    with winder.lock:
-        m = re.search(r"\[state=(\w+)", line)
-        if m:
-            winder.state = m.group(1)
-        m = re.search(r"X_turns=(\d+)", line) or re.search(r"\bturns=(\d+)\b", line)
-        if m:
-            try:
-                winder.current_turns = int(m.group(1))
-            except ValueError:
-                pass
-        m = re.search(r"X_turns_real=([-\d\.]+)", line)
-        if m:
-            try:
-                winder.current_turns_real = float(m.group(1))
-            except ValueError:
-                winder.current_turns_real = None
-        m = re.search(r"(?i)\brpm=(\d+)\b", line)
-        if m:
-            try:
-                winder.current_rpm = int(m.group(1))
-            except ValueError:
-                winder.current_rpm = None
-        m = re.search(r"\bY=([-\d\.]+)", line)
-        if m:
-            try:
-                winder.current_y = float(m.group(1))
-            except ValueError:
-                pass
-        m = re.search(r"\b(?:Y_HOME|ENDSTOP_Y)=(\d)\b", line)
-        if m:
-            try:
-                winder.endstop = int(m.group(1))
-            except ValueError:
-                winder.endstop = None
-        m = re.search(r"eff_w=([\d\.]+)\s*mm", line)
-        if m:
-            try:
-                winder.eff_w = float(m.group(1))
-            except ValueError:
-                pass
-
-        winder.log_lines.append(line)
-        if len(winder.log_lines) > winder.max_log:
-            winder.log_lines.pop(0)
-
-    # Reakcja na [goal] reached (poza lock żeby nie blokować)
-    if "[goal] reached" in line:
-        with winder.lock:
-            if winder.sections_mode and winder.section_ptr < len(winder.section_plan):
-                winder.section_ptr += 1
-                if winder.section_ptr < len(winder.section_plan):
-                    _send_raw("motoff")
-                    _send_raw("yzero")
-                    if winder.auto_next_section:
-                        time.sleep(0.3)
-                        _run_next_section()
-                else:
-                    time.sleep(0.12)
-                    _send_raw("motoff")
+        for p in pending:
+            p.wait(ACK_WAIT)
+    except CommandError as e:
+        return str(e)
+    return None
+
+
+
+class Machine(WinderState):
+    """
+    Jedna nawijarka: stan (WinderState) + własny port, transport, kanał komend
+    i StatusHub (SSE, ETag). Serwer trzyma ich dowolnie wiele w `machines`;
+    opóźnione komendy wszystkich idą przez jeden TimerWheel (tagi per maszyna).
+    """
+
+    def __init__(self, mid):
+        super().__init__()
+        self.id = mid
+        self.hub = StatusHub(log=self.log)
+        self.history = HistoryStore(os.path.join(HISTORY_DIR, mid))   # próbki stanu na dysku
+        self.queue = JobQueue(os.path.join(QUEUE_DIR, f"{mid}.json"))  # receptury do nawinięcia
+        self.speed = RateEstimator()   # zmierzone RPM / ETA z próbek zwojów (enkoder)
+
+    def tag(self, name):
+        return (self.id, name)
+
+    def send(self, *cmds: str):
+        """
+        Komendy do Arduino (kilka naraz – jeden zapis). Nie czeka na potwierdzenia;
+        zwraca listę PendingCommand (pusta bez połączenia) – .wait() gdy trzeba.
+        """
+        ch = self.channel
+        if self.connected and ch is not None:
+            return ch.submit_many(cmds)
+        return []
+
+    def _on_command_fail(self, p):
+        self.hub.log(f"[cmd] {p.error}")
+        self.publish()
+
+    def _handle_line(self, line: str, t_rx=None):
+        ch = self.channel
+        if ch is not None:
+            ch.on_line(line, t_rx)  # potwierdzenie komendy w locie?
+        t = parse_line(line)  # poza lock – jedno przejście po linii
+        with self.lock:
+            if t.state is not None:
+                self.state = t.state
+            if t.turns is not None:
+                self.current_turns = t.turns
+            if t.turns_real is not None:
+                self.current_turns_real = t.turns_real
+            if t.rpm is not None:
+                self.current_rpm = t.rpm
+            if t.y is not None:
+                self.current_y = t.y
+            if t.endstop is not None:
+                self.endstop = t.endstop
+            if t.eff_w is not None:
+                self.eff_w = t.eff_w
+            sample = ((self.state, self.current_turns, self.current_turns_real, self.current_y,
+                       self.current_rpm, self.endstop) if t.kind == "status" else None)
+            if sample is not None:
+                self.speed.add(self.current_turns if self.current_turns_real is None
+                               else self.current_turns_real, t_rx)
+        if sample is not None:
+            self.history.append(*sample)
+        self.hub.log(line)
+        if self.connecting and is_ready_line(line):
+            self._connect_ready()
+        if t.kind == "status" and self.resync is not None and self.connected:
+            self._resync(t.turns)
+        self.publish()
+
+        # Reakcja na [goal] reached: decyzja pod lock, opóźnienia w timers (wątek czytający nie śpi)
+        if t.goal_reached:
+            with self.lock:
+                next_section = False
+                if self.sections_mode and self.section_ptr < len(self.section_plan):
+                    self.section_ptr += 1
+                    next_section = self.section_ptr < len(self.section_plan)
+                auto_next = next_section and self.auto_next_section
+            if next_section:
+                self.send("motoff", "yzero")
+                if auto_next:
+                    timers.schedule(NEXT_SECTION_DELAY, self.run_next_section, tag=self.tag("job"))
             else:
-                time.sleep(0.12)
-                _send_raw("motoff")
-
-
-def _run_next_section():
-    with winder.lock:
-        if winder.section_ptr >= len(winder.section_plan):
+                timers.schedule(MOTOFF_DELAY, self.send, "motoff", tag=self.tag("job"))
+                self._job_finished()
+            self.publish()
+
+    def start_job(self, total, plan=(), auto_next=False, params=(), label=None):
+        """
+        Zlecenie: komendy parametrów (params), cel (całość albo pierwsza sekcja planu)
+        i moton jedną partią; czeka na potwierdzenia. None albo opis błędu.
+        """
+        plan = list(plan)
+        self.cancel_delayed()
+        self.history.new_segment(label or (f"total={total} sections={len(plan)}" if plan else f"total={total}"))
+        with self.lock:
+            self.auto_next_section = auto_next
+            self.sections_mode = bool(plan)
+            self.section_plan = plan
+            self.section_ptr = 0
+            self.last_goal = plan[0] if plan else total   # cel do ponownego uzbrojenia po zerwaniu łącza
+            goal = self.last_goal
+        error = _wait_acks(self.send(*params, f"goal {goal}", "moton"))
+        self.publish()
+        return error
+
+    def start_next_job(self):
+        """Następne zlecenie z kolejki – parametry receptury, cel i start; (zlecenie, błąd)."""
+        job = self.queue.start_next()
+        if job is None:
+            return None, None
+        self.hub.log(f"[kolejka] Start #{job['id']} {job['name']}".rstrip())
+        error = self.start_job(job["total"], job["plan"], job["auto_next"], recipe_commands(job),
+                               label=f"#{job['id']} {job['name']}".rstrip())
+        if error:
+            self.queue.finish("aborted", job["id"])
+            self.hub.log(f"[kolejka] #{job['id']} przerwane: {error}")
+        return job, error
+
+    def _job_finished(self):
+        """Koniec zlecenia z kolejki – następne rusza dopiero po potwierdzeniu (/api/queue/next)."""
+        job = self.queue.finish()
+        if job is None:
             return
-        next_size = winder.section_plan[winder.section_ptr]
-        winder.last_goal = winder.current_turns + next_size
-    _send_raw(f"goal {winder.last_goal}")
-    _send_raw("moton")
+        nxt = self.queue.next_queued()
+        self.hub.log(f"[kolejka] #{job['id']} zakończone – "
+                     + (f"następne #{nxt['id']} {nxt['name']} czeka na potwierdzenie" if nxt else "kolejka pusta"))
+
+    def status_fields(self):
+        """Pola /api/status (bez logu) – wołać pod self.lock."""
+        return dict(
+            connected=self.connected,
+            connecting=self.connecting,
+            reconnecting=self.resync is not None,
+            state=self.state,
+            current_turns=self.current_turns,
+            current_turns_real=self.current_turns_real,
+            current_y=self.current_y,
+            current_rpm=self.current_rpm,
+            eff_w=self.eff_w,
+            turns_per_layer=self.turns_per_layer,
+            endstop=self.endstop,
+            sections_mode=self.sections_mode,
+            section_ptr=self.section_ptr,
+            section_plan_len=len(self.section_plan),
+            **self.queue.summary(),
+            **self.speed.fields(self.current_turns, self.last_goal, self.section_plan, self.section_ptr,
+                                self.sections_mode),
+        )
 
+    def publish(self):
+        """Przekaż bieżący stan do klientów /api/events (tylko zmienione pola)."""
+        with self.lock:
+            fields = self.status_fields()
+        self.hub.update(fields)
+
+    def cancel_delayed(self):
+        timers.cancel_tag(self.tag("job"))
+        timers.cancel_tag(self.tag("stop"))
+
+    def run_next_section(self):
+        with self.lock:
+            if self.section_ptr >= len(self.section_plan):
+                return
+            next_size = self.section_plan[self.section_ptr]
+            self.last_goal = self.current_turns + next_size
+        self.send(f"goal {self.last_goal}", "moton")
+
+    def open_port(self, port, resync=False):
+        """
+        Otwórz port i od razu wróć – połączenie jest gotowe (connected), gdy przyjdzie
+        baner firmware albo linia stanu (_connect_ready), najpóźniej po CONNECT_TIMEOUT.
+        resync: ponowne połączenie po zerwaniu – log zostaje, cel odtwarza _resync().
+        """
+        ports.start()
+        ser = serial.Serial(port, 115200, timeout=1)
+        tr = SerialTransport(ser, self._handle_line, self._on_serial_error)
+        with self.lock:
+            self.serial_port = ser
+            self.port_name = port
+            self.connecting = True
+            self.connected = False
+            self.state = "IDLE"
+            self.current_turns = 0
+            self.current_turns_real = None
+            self.current_y = None
+            self.current_rpm = None
+            self.speed = RateEstimator()
+            if not resync:
+                self.log.clear()
+            self.transport = tr
+            self.channel = CommandChannel(tr, timers, on_fail=self._on_command_fail)
+            self.connect_t0 = time.monotonic()
+        tr.start()
+        timers.schedule(CONNECT_PROBE, tr.send, "status", tag=self.tag("connect"))
+        timers.schedule(CONNECT_TIMEOUT, self._connect_timeout, tr, tag=self.tag("connect"))
+        self.hub.log(f"Łączenie z {port}…")
+        self.publish()
+
+    def _connect_ready(self):
+        with self.lock:
+            if not self.connecting:
+                return
+            self.connecting = False
+            self.connected = True
+            dt = time.monotonic() - self.connect_t0
+            resync = self.resync is not None
+        timers.cancel_tag(self.tag("connect"))
+        if resync:
+            self.send("motoff", "status")   # odpowiedź (linia stanu) → _resync()
+        else:
+            self.send("motoff")
+        self.hub.log(f"Połączono z {self.port_name} ({dt:.2f} s)")
+        self.publish()
+
+    def _resync(self, turns_now):
+        """
+        Pierwsza linia stanu po ponownym połączeniu: uzbrój z powrotem cel bieżącej
+        sekcji / zadania z WinderState. Po resecie Arduino (otwarcie portu zwykle go
+        resetuje) licznik zwojów startuje od 0 – cel liczymy wtedy od nowa.
+        """
+        with self.lock:
+            rs, self.resync = self.resync, None
+            if rs is None:
+                return
+            goal = None
+            if self.last_goal is not None and turns_now is not None:
+                left = self.last_goal - rs["turns"]
+                if left > 0:
+                    goal = self.last_goal if turns_now >= rs["turns"] else turns_now + left
+                    self.last_goal = goal
+            down = time.monotonic() - rs["t_lost"]
+            plan = (f", sekcja {self.section_ptr + 1}/{len(self.section_plan)}"
+                    if self.sections_mode else "")
+        if goal is not None:
+            self.send(f"goal {goal}")
+        self.hub.log(f"Połączenie przywrócone po {down:.1f} s – cel {goal if goal is not None else '—'}{plan}")
+
+    def _connect_timeout(self, tr):
+        with self.lock:
+            if not self.connecting or self.transport is not tr:
+                return
+        self.hub.log(f"Brak odpowiedzi firmware na {self.port_name} – rozłączono")
+        self.close_port()
+        if self.resync is not None:
+            timers.schedule(RECONNECT_RETRY, self._try_reconnect, tag=self.tag("reconnect"))
+        self.publish()
+
+    def close_port(self):
+        """Zamknij kanał, transport i port; stan jak po rozłączeniu."""
+        self.cancel_delayed()
+        timers.cancel_tag(self.tag("connect"))
+        with self.lock:
+            ch, tr, ser = self.channel, self.transport, self.serial_port
+            self.transport = None
+            self.serial_port = None
+            self.connecting = False
+            self.connected = False
+            self.state = "IDLE"
+            self.current_turns = 0
+            self.current_turns_real = None
+            self.current_y = None
+            self.current_rpm = None
+        if ch is not None:
+            ch.close()
+        if tr is not None:
+            tr.close()
+        if ser is not None and ser.is_open:
+            try:
+                ser.close()
+            except Exception:
+                pass
 
-def read_serial_thread():
-    while winder.connected and winder.serial_port and winder.serial_port.is_open:
+    def _on_serial_error(self, e):
+        """Zerwane łącze (np. kabel USB): zamknij port i czekaj na powrót urządzenia."""
+        with self.lock:
+            if self.connected and self.resync is None:
+                self.resync = {"port": self.port_name, "turns": self.current_turns,
+                               "t_lost": time.monotonic()}
+            rs = self.resync
+        self.hub.log(f"Błąd portu szeregowego: {e}")
+        self.close_port()
+        if rs is not None:
+            self.hub.log(f"Czekam na {rs['port']} – połączę ponownie automatycznie")
+            if rs["port"] in ports.ports():
+                timers.schedule(RECONNECT_RETRY, self._try_reconnect, tag=self.tag("reconnect"))
+        self.publish()
+
+    def _try_reconnect(self):
+        with self.lock:
+            rs = self.resync
+            busy = self.connected or self.connecting
+        if rs is None or busy:
+            return
         try:
-            line = winder.serial_port.readline().decode("utf-8", errors="ignore").rstrip("\r\n")
-            if line:
-                _handle_line(line)
-        except (serial.SerialException, OSError):
-            with winder.lock:
-                winder.connected = False
-            break
+            self.open_port(rs["port"], resync=True)
+        except serial.SerialException as e:
+            self.hub.log(f"Ponowne połączenie: {e}")
+            if rs["port"] in ports.ports():   # węzeł jest (udev/uprawnienia) – ponów; inaczej czekamy na watcher
+                timers.schedule(RECONNECT_RETRY, self._try_reconnect, tag=self.tag("reconnect"))
+            self.publish()
+
+    def _on_ports_changed(self, added, removed):
+        rs = self.resync
+        if rs is not None and rs["port"] in added:
+            self._try_reconnect()
+
+
+# --- Maszyny: jeden proces, wiele nawijarek (każda na swoim porcie) ---
+DEFAULT_ID = "1"
+machines = {}               # id → Machine (kolejność dodania)
+machines_lock = threading.Lock()
+machines_gen = 0            # rośnie przy dodaniu/usunięciu maszyny (ETag /api/machines)
+
+
+def add_machine(mid):
+    """Maszyna o danym id (tworzona, jeśli jej nie ma)."""
+    global machines_gen
+    with machines_lock:
+        m = machines.get(mid)
+        if m is None:
+            m = machines[mid] = Machine(mid)
+            machines_gen += 1
+    m.publish()
+    return m
+
+
+def remove_machine(mid):
+    global machines_gen
+    with machines_lock:
+        m = machines.pop(mid, None)
+        if m is not None:
+            machines_gen += 1
+    if m is not None:
+        with m.lock:
+            m.resync = None
+        timers.cancel_tag(m.tag("reconnect"))
+        m.close_port()
+        m.history.close()
+    return m
+
+
+def machines_from_env(spec):
+    """WINDER_MACHINES="a=/dev/ttyUSB0,b=/dev/ttyUSB1,c" → [(id, port albo None), ...]."""
+    out = []
+    for item in spec.split(","):
+        mid, _, port = item.strip().partition("=")
+        if mid.strip():
+            out.append((mid.strip(), port.strip() or None))
+    return out
+
+
+def _on_ports_changed(added, removed):
+    for m in list(machines.values()):
+        m._on_ports_changed(added, removed)
+
+
+ports.subscribe(_on_ports_changed)
+MACHINES_ENV = machines_from_env(os.environ.get("WINDER_MACHINES", ""))
+if MACHINES_ENV:
+    DEFAULT_ID = MACHINES_ENV[0][0]
+    for _mid, _ in MACHINES_ENV:
+        add_machine(_mid)
+winder = add_machine(DEFAULT_ID)   # maszyna domyślna – trasy /api/... bez id (jak dotąd)
+hub = winder.hub
 
 
 # --- API ---
@@ -159,7 +461,8 @@ button{margin:4px;padding:8px 12px;border-radius:6px;cursor:pointer;}
 #log{height:120px;overflow-y:auto;font-size:12px;font-family:monospace;}
 </style></head>
 <body>
-<h1>Sterownik nawijarki (RPi)</h1>
+<h1 id="title">Sterownik nawijarki (RPi)</h1>
+<p><a href="/machines" style="color:#8cf">Wszystkie maszyny</a></p>
 <p>Port: <select id="port"></select> <button id="btnConn">Połącz</button> <span id="connStatus">—</span></p>
 <p>
   <button class="run" id="btnRun">START</button>
@@ -173,200 +476,443 @@ button{margin:4px;padding:8px 12px;border-radius:6px;cursor:pointer;}
 <p>Zwoje (całość): <input type="number" id="total" value="100"> 
    Sekcji: <input type="number" id="sections" value="0"> 
    <label><input type="checkbox" id="autoNext"> Auto następna sekcja</label></p>
+<p>Kolejka: <span id="queue">—</span>
+   <button class="sec" id="btnQueueAdd">+ Do kolejki</button> <button class="run" id="btnQueueNext">NASTĘPNE ZLECENIE</button></p>
 <div id="status">Ładowanie…</div>
 <pre id="log"></pre>
 <script>
+// ?m=<id> – panel jednej z maszyn (/api/machines/<id>/...); bez – maszyna domyślna
+const M=new URLSearchParams(location.search).get('m'); const B=M ? '/api/machines/'+encodeURIComponent(M) : '/api';
+if(M) document.getElementById('title').textContent+=' – maszyna '+M;
 const api = path => fetch(path).then(r=>r.json()).catch(()=>null);
 const post = (path, body) => fetch(path, {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(body)}).then(r=>r.json()).catch(()=>null);
 function refreshPorts(){ api('/api/ports').then(d=>{ const s=document.getElementById('port'); s.innerHTML=(d.ports||[]).map(p=>'<option>'+p+'</option>').join(''); }); }
-function refreshStatus(){ api('/api/status').then(d=>{ if(!d) return; document.getElementById('status').innerHTML='Stan: '+d.state+' | Zwoje: '+d.current_turns+(d.current_turns_real!=null ? ' (enc: '+d.current_turns_real.toFixed(2)+')' : '')+' | Y: '+(d.current_y!=null ? d.current_y.toFixed(2) : '—')+' mm | RPM: '+(d.current_rpm||'—'); document.getElementById('log').textContent=(d.log||[]).slice(-30).join('\\n'); document.getElementById('connStatus').textContent=d.connected?'Połączono':'Rozłączono'; document.getElementById('btnConn').textContent=d.connected?'Rozłącz':'Połącz'; }); }
-document.getElementById('btnConn').onclick = ()=>{ const port=document.getElementById('port').value; const btn=document.getElementById('btnConn'); if(btn.textContent==='Rozłącz'){ post('/api/disconnect',{}).then(()=>{ refreshStatus(); btn.textContent='Połącz'; }); return; } if(!port) return; post('/api/connect', {port}).then(d=>{ refreshStatus(); if(d && d.ok) btn.textContent='Rozłącz'; }); };
-document.getElementById('btnRun').onclick = ()=>{ post('/api/start', { total: +document.getElementById('total').value, sections: +document.getElementById('sections').value, auto_next: document.getElementById('autoNext').checked }); };
-document.getElementById('btnStop').onclick = ()=>{ post('/api/command', {cmd:'stop'}); };
-document.getElementById('btnResume').onclick = ()=>{ post('/api/command', {cmd:'resume'}); };
-document.getElementById('btnYzero').onclick = ()=>{ post('/api/command', {cmd:'yzero'}); };
-document.getElementById('rpm').onchange = ()=>{ post('/api/rpm', {rpm: document.getElementById('rpm').value}); };
-document.getElementById('pitch').onchange = ()=>{ post('/api/pitch', {pitch: document.getElementById('pitch').value}); };
-document.getElementById('bwidth').onchange = ()=>{ post('/api/bwidth', {bwidth: document.getElementById('bwidth').value}); };
-refreshPorts(); setInterval(refreshStatus, 1500); refreshStatus();
+const eta = s => s==null ? '—' : (s>=3600 ? Math.floor(s/3600)+':'+String(Math.floor(s%3600/60)).padStart(2,'0') : Math.floor(s/60))+':'+String(s%60).padStart(2,'0');
+function render(d){ document.getElementById('status').innerHTML='Stan: '+d.state+' | Zwoje: '+d.current_turns+(d.current_turns_real!=null ? ' (enc: '+d.current_turns_real.toFixed(2)+')' : '')+' | Y: '+(d.current_y!=null ? d.current_y.toFixed(2) : '—')+' mm | RPM: '+(d.current_rpm||'—')+' (zmierz.: '+(d.measured_rpm!=null ? d.measured_rpm : '—')+')<br>Zwoje/min: '+(d.turns_per_min!=null ? d.turns_per_min : '—')+' | ETA cel: '+eta(d.eta_goal_s)+(d.sections_mode ? ' | sekcja: '+eta(d.eta_section_s) : '')+' | całość: '+eta(d.eta_plan_s); document.getElementById('connStatus').textContent=d.connected?'Połączono':(d.connecting?'Łączenie…':(d.reconnecting?'Zerwane – czekam na port…':'Rozłączono')); document.getElementById('btnConn').textContent=(d.connected||d.connecting||d.reconnecting)?'Rozłącz':'Połącz'; document.getElementById('queue').textContent=(d.queue_current ? '#'+d.queue_current+' w toku, ' : '')+'czeka: '+(d.queue_len||0)+(d.queue_next ? ' (następne #'+d.queue_next+')' : ''); }
+let logLines=[], logSeq=0;
+function renderLog(){ document.getElementById('log').textContent=logLines.slice(-30).join('\\n'); }
+function refreshLog(){ api(B+'/log?since='+logSeq).then(d=>{ if(!d) return; logLines=((d.reset||d.lost) ? [] : logLines).concat(d.lines).slice(-30); logSeq=d.last_seq; renderLog(); }); }
+function refreshStatus(){ fetch(B+'/status').then(r=>{ if(+r.headers.get('X-Log-Seq')!==logSeq) refreshLog(); return r.json(); }).then(render).catch(()=>null); }
+document.getElementById('btnConn').onclick = ()=>{ const port=document.getElementById('port').value; const btn=document.getElementById('btnConn'); if(btn.textContent==='Rozłącz'){ post(B+'/disconnect',{}).then(()=>{ refreshStatus(); btn.textContent='Połącz'; }); return; } if(!port) return; post(B+'/connect', {port}).then(d=>{ refreshStatus(); if(d && d.ok) btn.textContent='Rozłącz'; }); };
+document.getElementById('btnRun').onclick = ()=>{ post(B+'/start', { total: +document.getElementById('total').value, sections: +document.getElementById('sections').value, auto_next: document.getElementById('autoNext').checked }); };
+document.getElementById('btnQueueAdd').onclick = ()=>{ const v=id=>document.getElementById(id).value; post(B+'/queue', { total: +v('total'), sections: +v('sections'), auto_next: document.getElementById('autoNext').checked, rpm: v('rpm'), pitch: v('pitch'), bwidth: v('bwidth') }).then(d=>{ if(d && !d.ok) alert(d.error); }); };
+document.getElementById('btnQueueNext').onclick = ()=>{ post(B+'/queue/next', {}).then(d=>{ if(d && !d.ok) alert(d.error); }); };
+document.getElementById('btnStop').onclick = ()=>{ post(B+'/command', {cmd:'stop'}); };
+document.getElementById('btnResume').onclick = ()=>{ post(B+'/command', {cmd:'resume'}); };
+document.getElementById('btnYzero').onclick = ()=>{ post(B+'/command', {cmd:'yzero'}); };
+document.getElementById('rpm').onchange = ()=>{ post(B+'/rpm', {rpm: document.getElementById('rpm').value}); };
+document.getElementById('pitch').onchange = ()=>{ post(B+'/pitch', {pitch: document.getElementById('pitch').value}); };
+document.getElementById('bwidth').onchange = ()=>{ post(B+'/bwidth', {bwidth: document.getElementById('bwidth').value}); };
+// Stan i log na żywo przez /api/events (SSE); odpytywanie co 1.5 s tylko gdy strumień niedostępny
+let poll=null; const st={};
+function startPolling(){ if(!poll){ poll=setInterval(refreshStatus, 1500); refreshStatus(); } }
+function stopPolling(){ if(poll){ clearInterval(poll); poll=null; } }
+if(window.EventSource){
+  const es=new EventSource(B+'/events');
+  es.addEventListener('status', e=>{ Object.assign(st, JSON.parse(e.data)); render(st); stopPolling(); });
+  es.addEventListener('log', e=>{ const d=JSON.parse(e.data); logLines=d.reset ? d.lines : logLines.concat(d.lines).slice(-30); logSeq=d.seq; renderLog(); });
+  es.onerror=startPolling;
+} else startPolling();
+refreshPorts();
+</script>
+</body></html>
+"""
+
+
+def machine_route(rule, **options):
+    """
+    Trasa jednej maszyny pod dwoma adresami: /api/<rule> (maszyna domyślna – jak
+    dotąd) i /api/machines/<mid>/<rule>. Widok dostaje Machine jako argument.
+    """
+    def register(view):
+        def default_view(**kw):
+            return view(machines[DEFAULT_ID], **kw)
+
+        def machine_view(mid, **kw):
+            m = machines.get(mid)
+            if m is None:
+                return jsonify(ok=False, error=f"Nieznana maszyna: {mid}"), 404
+            return view(m, **kw)
+
+        app.add_url_rule(f"/api/{rule}", view.__name__, default_view, **options)
+        app.add_url_rule(f"/api/machines/<mid>/{rule}", view.__name__ + "_m", machine_view, **options)
+        return view
+    return register
+
+
+@app.route("/machines")
+def machines_page():
+    return _machines_html()
+
+
+def _machines_html():
+    return """
+<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Nawijarki</title>
+<style>
+body{font-family:sans-serif;margin:1rem;background:#1a1a2e;color:#eee;}
+h1{color:#0f0;} a{color:#8cf;}
+#grid{display:grid;grid-template-columns:repeat(auto-fill,minmax(220px,1fr));gap:8px;}
+.m{background:#252540;border-radius:6px;padding:0.5rem;border-left:6px solid #555;}
+.m.RUN{border-color:#0a0;}.m.off{opacity:0.6;}.m.lost{border-color:#c80;}
+.m b{font-size:1.2em;} .m small{color:#aaa;}
+</style></head>
+<body>
+<h1>Nawijarki</h1>
+<div id="grid">Ładowanie…</div>
+<script>
+// Jedno zapytanie na wszystkie maszyny; ETag – 304, gdy nic się nie zmieniło
+let etag=null;
+const eta = s => s==null ? '—' : (s>=3600 ? Math.floor(s/3600)+':'+String(Math.floor(s%3600/60)).padStart(2,'0') : Math.floor(s/60))+':'+String(s%60).padStart(2,'0');
+function card(m){
+  const conn=m.connected ? '' : (m.connecting ? ' (łączenie…)' : (m.reconnecting ? ' (zerwane)' : ' (rozłączona)'));
+  const sec=m.sections_mode ? ' | sekcja '+Math.min(m.section_ptr+1, m.section_plan_len)+'/'+m.section_plan_len : '';
+  const cls='m '+(m.state||'')+(m.connected ? '' : (m.reconnecting ? ' lost' : ' off'));
+  return '<div class="'+cls+'"><b><a href="/?m='+encodeURIComponent(m.id)+'">'+m.id+'</a></b> <small>'+(m.port||'—')+conn+'</small><br>'
+    +'Stan: '+m.state+' | Zwoje: '+m.current_turns+sec+'<br>RPM: '+(m.current_rpm||'—')+(m.measured_rpm ? ' (zmierz.: '+m.measured_rpm+')' : '')+' | Y: '+(m.current_y!=null ? m.current_y.toFixed(2) : '—')+' mm'
+    +(m.eta_plan_s ? '<br>Do końca: '+eta(m.eta_plan_s) : '')
+    +(m.queue_current ? '<br>Zlecenie #'+m.queue_current : '')+(m.queue_len ? ' | w kolejce: '+m.queue_len : '')+'</div>';
+}
+function refresh(){
+  fetch('/api/machines', {headers: etag ? {'If-None-Match': etag} : {}}).then(r=>{
+    if(r.status===304) return null;
+    etag=r.headers.get('ETag'); return r.json();
+  }).then(d=>{ if(d) document.getElementById('grid').innerHTML=d.machines.map(card).join(''); }).catch(()=>null);
+}
+setInterval(refresh, 1000); refresh();
 </script>
 </body></html>
 """
 
 
+@app.route("/api/machines", methods=["GET", "POST"])
+def api_machines():
+    """
+    GET: stan wszystkich maszyn naraz {"machines": [{"id", "port", ...pola /api/status}]}
+    – z gotowych bajtów JSON każdego huba, ETag z wersji wszystkich (304 bez zmian).
+    POST {"id", "port"?}: dodaj maszynę (i połącz, gdy podano port).
+    """
+    if request.method == "POST":
+        data = request.get_json() or {}
+        mid = str(data.get("id") or "").strip()
+        if not mid or "/" in mid:
+            return jsonify(ok=False, error="Brak / złe id maszyny"), 400
+        if mid in machines:
+            return jsonify(ok=False, error=f"Maszyna {mid} już jest"), 400
+        m = add_machine(mid)
+        port = data.get("port")
+        if port:
+            try:
+                m.open_port(port)
+            except serial.SerialException as e:
+                return jsonify(ok=True, id=mid, error=str(e))
+        return jsonify(ok=True, id=mid, connecting=bool(port))
+
+    ms = list(machines.values())
+    versions = [m.hub.status_json() for m in ms]
+    etag = f'"{winder.hub.epoch}-{machines_gen}-{sum(v for v, _ in versions)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    items = []
+    for m, (_, body) in zip(ms, versions):
+        head = json.dumps({"id": m.id, "port": m.port_name}, separators=(",", ":")).encode("utf-8")
+        items.append(head[:-1] + b"," + body[1:] if body != b"{}" else head)
+    return Response(b'{"machines":[' + b",".join(items) + b"]}",
+                    mimetype="application/json", headers=headers)
+
+
+@app.route("/api/machines/<mid>", methods=["DELETE"])
+def api_machine_delete(mid):
+    if mid == DEFAULT_ID:
+        return jsonify(ok=False, error="Maszyny domyślnej nie można usunąć"), 400
+    if remove_machine(mid) is None:
+        return jsonify(ok=False, error=f"Nieznana maszyna: {mid}"), 404
+    return jsonify(ok=True)
+
+
 @app.route("/api/ports")
 def api_ports():
-    ports = [p.device for p in serial.tools.list_ports.comports()]
-    return jsonify(ports=ports)
-
-
-@app.route("/api/status")
-def api_status():
-    with winder.lock:
-        return jsonify(
-            connected=winder.connected,
-            state=winder.state,
-            current_turns=winder.current_turns,
-            current_turns_real=winder.current_turns_real,
-            current_y=winder.current_y,
-            current_rpm=winder.current_rpm,
-            eff_w=winder.eff_w,
-            turns_per_layer=winder.turns_per_layer,
-            endstop=winder.endstop,
-            sections_mode=winder.sections_mode,
-            section_ptr=winder.section_ptr,
-            section_plan_len=len(winder.section_plan),
-            log=winder.log_lines[-50:],
-        )
+    """Lista z pamięci (PortWatcher odświeża ją przy zmianach w /dev)."""
+    return jsonify(ports=ports.start().ports())
+
+
+def _cached_status(m):
+    """Gotowy JSON stanu z huba (raz na zmianę) + ETag; 304 gdy klient ma tę wersję."""
+    version, body = m.hub.status_json()
+    etag = m.hub.etag(version)
+    # numer ostatniej linii logu – poza ETagiem, także przy 304 (klient dociąga /api/log?since=)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Log-Seq": str(m.hub.log_seq)}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype="application/json", headers=headers)
+
+
+@machine_route("status")
+def api_status(m):
+    """Stan bez logu (log: /api/log?since=); ?log=1 – dołącz 50 ostatnich linii jak dawniej."""
+    if request.args.get("log") not in ("1", "true"):
+        return _cached_status(m)
+    with m.lock:
+        st = m.status_fields()
+    st["log_seq"] = m.log.last_seq
+    st["log"] = m.log.tail(50)
+    return jsonify(st)
+
+
+@machine_route("commands")
+def api_commands(m):
+    """Potwierdzenia komend: w locie, w kolejce, per komenda czasy odpowiedzi [ms] (histogram), timeouty."""
+    ch = m.channel
+    if ch is None:
+        return jsonify(connected=False, sent=0, inflight=0, queued=0, commands={})
+    st = ch.stats()
+    st["connected"] = m.connected
+    return jsonify(st)
+
+
+@machine_route("log")
+def api_log(m):
+    """
+    Nowe linie logu po numerze since: {"lines", "first_seq", "last_seq", "lost", "reset"}.
+    Następne zapytanie: since=last_seq. lost > 0 – część linii wypadła z bufora;
+    reset – since spoza numeracji (np. restart serwera), zwrócono bufor od początku.
+    """
+    try:
+        since = int(request.args.get("since") or 0)
+        limit = int(request.args["limit"]) if request.args.get("limit") else None
+    except ValueError:
+        return jsonify(ok=False, error="since/limit muszą być liczbami"), 400
+    log = m.log
+    reset = since > log.last_seq
+    if reset:
+        since = 0
+    lines, first, last, lost = log.since(since, limit)
+    return jsonify(lines=lines, first_seq=first, last_seq=last, lost=lost, reset=reset)
+
+
+@machine_route("history")
+def api_history(m):
+    """
+    Historia telemetrii z dysku: ?from=&to= (czas unix albo ujemny – s wstecz, domyślnie
+    ostatnia godzina) lub ?job=<id>, points=500, mode=minmax|lttb, fields=turns,rpm,...
+    """
+    try:
+        return jsonify(query_args(m.history, request.args))
+    except ValueError as e:
+        return jsonify(ok=False, error=str(e)), 400
+
+
+@machine_route("history/jobs")
+def api_history_jobs(m):
+    """Segmenty historii (jeden na zlecenie): id, etykieta, pierwsza/ostatnia próbka, liczba próbek."""
+    return jsonify(jobs=m.history.segments())
+
+
+@app.route("/api/design")
+def api_design():
+    """
+    Projekt cewki (winder_design): ?h=&w=&l= (karkas [mm]), wires=0.2,0.25 (domyślnie szereg IEC),
+    packing=0.9,1, turns=100:2000:50, rpm=, ohm= (docelowa rezystancja), limit=20, all=1.
+    """
+    try:
+        return jsonify(design_args(request.args))
+    except ValueError as e:
+        return jsonify(ok=False, error=str(e)), 400
+
+
+@machine_route("events")
+def api_events(m):
+    """Strumień SSE: różnice stanu i nowe linie logu (winder_events.StatusHub)."""
+    return Response(m.hub.stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
-@app.route("/api/connect", methods=["POST"])
-def api_connect():
+@machine_route("connect", methods=["POST"])
+def api_connect(m):
+    """Otwiera port i wraca od razu; gotowość (connected) widać w /api/status i /api/events."""
     port = (request.get_json() or {}).get("port") or request.form.get("port")
     if not port:
         return jsonify(ok=False, error="Brak portu"), 400
-    if winder.connected:
+    if m.connected:
         return jsonify(ok=False, error="Już połączono"), 400
+    if m.connecting:
+        return jsonify(ok=False, error="Łączenie w toku"), 400
+    owner = next((o.id for o in machines.values()
+                  if o is not m and o.port_name == port and (o.connected or o.connecting)), None)
+    if owner is not None:
+        return jsonify(ok=False, error=f"Port {port} zajęty przez maszynę {owner}"), 400
+    rs = m.resync
+    resync = rs is not None and rs["port"] == port
+    if not resync:
+        m.resync = None
+        timers.cancel_tag(m.tag("reconnect"))
     try:
-        winder.serial_port = serial.Serial(port, 115200, timeout=1)
-        time.sleep(2)
-        with winder.lock:
-            winder.connected = True
-            winder.state = "IDLE"
-            winder.current_turns = 0
-            winder.current_turns_real = None
-            winder.current_y = None
-            winder.current_rpm = None
-            winder.log_lines.clear()
-        _send_raw("motoff")
-        winder.read_thread = threading.Thread(target=read_serial_thread, daemon=True)
-        winder.read_thread.start()
-        return jsonify(ok=True)
+        m.open_port(port, resync=resync)
     except serial.SerialException as e:
         return jsonify(ok=False, error=str(e)), 500
+    return jsonify(ok=True, connecting=True)
 
 
-@app.route("/api/disconnect", methods=["POST"])
-def api_disconnect():
-    with winder.lock:
-        if winder.serial_port and winder.serial_port.is_open:
-            try:
-                winder.serial_port.close()
-            except Exception:
-                pass
-        winder.serial_port = None
-        winder.connected = False
-        winder.state = "IDLE"
-        winder.current_turns = 0
-        winder.current_turns_real = None
-        winder.current_y = None
-        winder.current_rpm = None
+@machine_route("disconnect", methods=["POST"])
+def api_disconnect(m):
+    with m.lock:
+        m.resync = None         # operator rozłącza – bez automatycznego powrotu
+    timers.cancel_tag(m.tag("reconnect"))
+    m.close_port()
+    m.publish()
     return jsonify(ok=True)
 
 
-@app.route("/api/command", methods=["POST"])
-def api_command():
+@machine_route("command", methods=["POST"])
+def api_command(m):
     data = request.get_json() or {}
     cmd = (data.get("cmd") or "").strip().lower()
     if not cmd:
         return jsonify(ok=False, error="Brak komendy"), 400
-    if not winder.connected:
+    if not m.connected:
         return jsonify(ok=False, error="Brak połączenia"), 400
+    if cmd in ("run", "resume"):
+        m.cancel_delayed()  # spóźniony motoff (po STOP / [goal]) nie może zatrzymać startu
     if cmd == "run":
-        _send_raw("moton")
-        with winder.lock:
-            winder.sections_mode = False
+        m.send("moton")
+        with m.lock:
+            m.sections_mode = False
     elif cmd == "resume":
-        with winder.lock:
-            if winder.sections_mode and winder.section_ptr < len(winder.section_plan):
-                _run_next_section()
-                return jsonify(ok=True)
-        _send_raw("moton")
+        with m.lock:
+            next_section = m.sections_mode and m.section_ptr < len(m.section_plan)
+        if next_section:
+            m.run_next_section()
+        else:
+            m.send("moton")
     elif cmd == "stop":
-        def do():
-            time.sleep(0.12)
-            _send_raw("motoff")
-        threading.Thread(target=do, daemon=True).start()
+        timers.cancel_tag(m.tag("job"))  # STOP wygrywa z zaplanowanym startem następnej sekcji
+        timers.schedule(MOTOFF_DELAY, m.send, "motoff", tag=m.tag("stop"))
     elif cmd == "yzero":
-        _send_raw("yzero")
+        m.send("yzero")
     else:
-        _send_raw(cmd)
+        m.send(cmd)
+    m.publish()
     return jsonify(ok=True)
 
 
-@app.route("/api/start", methods=["POST"])
-def api_start():
+@machine_route("start", methods=["POST"])
+def api_start(m):
     data = request.get_json() or {}
     total = int(data.get("total") or 0)
     sections = int(data.get("sections") or 0)
-    winder.auto_next_section = bool(data.get("auto_next"))
     if total <= 0:
         return jsonify(ok=False, error="Ilość zwojów musi być > 0"), 400
-    if not winder.connected:
+    if not m.connected:
         return jsonify(ok=False, error="Brak połączenia"), 400
+    job = m.queue.finish("aborted")     # ręczny start zastępuje zlecenie z kolejki
+    if job is not None:
+        m.hub.log(f"[kolejka] #{job['id']} przerwane ręcznym startem")
+    error = m.start_job(total, section_plan(total, sections), bool(data.get("auto_next")))
+    if error:
+        return jsonify(ok=False, error=error), 504
+    return jsonify(ok=True)
 
-    with winder.lock:
-        winder.sections_mode = False
-        winder.section_plan = []
-        winder.section_ptr = 0
-        winder.last_goal = None
-
-    if sections > 0:
-        per = total // sections
-        rem = total % sections
-        plan = [per + (1 if i < rem else 0) for i in range(sections)]
-        with winder.lock:
-            winder.sections_mode = True
-            winder.section_plan = plan
-            winder.section_ptr = 0
-            winder.last_goal = plan[0]
-        _send_raw(f"goal {plan[0]}")
-        _send_raw("moton")
-    else:
-        _send_raw(f"goal {total}")
-        _send_raw("moton")
+
+@machine_route("queue", methods=["GET", "POST"])
+def api_queue(m):
+    """GET: zlecenia (czekające, bieżące, ostatnie zakończone). POST: receptura do kolejki."""
+    if request.method == "GET":
+        return jsonify(dict(m.queue.as_dict(), **m.queue.summary()))
+    try:
+        recipe = recipe_from(request.get_json() or {})
+    except ValueError as e:
+        return jsonify(ok=False, error=str(e)), 400
+    job = m.queue.add(recipe)
+    m.publish()
+    return jsonify(ok=True, id=job["id"])
+
+
+@machine_route("queue/next", methods=["POST"])
+def api_queue_next(m):
+    """Potwierdzenie operatora: start następnego zlecenia z kolejki."""
+    if not m.connected:
+        return jsonify(ok=False, error="Brak połączenia"), 400
+    if m.state == "RUN":
+        return jsonify(ok=False, error="Nawijarka pracuje"), 409
+    job, error = m.start_next_job()
+    if job is None:
+        cur = m.queue.current()
+        return jsonify(ok=False, error=f"Zlecenie #{cur['id']} w toku" if cur else "Kolejka pusta"), 409
+    if error:
+        return jsonify(ok=False, id=job["id"], error=error), 504
+    return jsonify(ok=True, id=job["id"])
+
+
+@machine_route("queue/<jid>", methods=["DELETE"])
+def api_queue_remove(m, jid):
+    if m.queue.remove(jid) is None:
+        return jsonify(ok=False, error="Zlecenia nie ma w kolejce"), 404
+    m.publish()
     return jsonify(ok=True)
 
 
-@app.route("/api/rpm", methods=["POST"])
-def api_rpm():
+@machine_route("queue/<jid>/move", methods=["POST"])
+def api_queue_move(m, jid):
+    try:
+        index = int((request.get_json() or {}).get("index"))
+    except (TypeError, ValueError):
+        return jsonify(ok=False, error="index musi być liczbą"), 400
+    if m.queue.move(jid, index) is None:
+        return jsonify(ok=False, error="Zlecenia nie ma w kolejce"), 404
+    m.publish()
+    return jsonify(ok=True)
+
+
+@machine_route("rpm", methods=["POST"])
+def api_rpm(m):
     data = request.get_json() or request.form
     try:
         rpm = int(data.get("rpm") or 0)
     except (TypeError, ValueError):
         return jsonify(ok=False, error="RPM musi być liczbą"), 400
-    if winder.connected and rpm >= 0:
-        _send_raw(f"rpm {rpm}")
+    if m.connected and rpm >= 0:
+        m.send(f"rpm {rpm}")
     return jsonify(ok=True)
 
 
-@app.route("/api/pitch", methods=["POST"])
-def api_pitch():
+@machine_route("pitch", methods=["POST"])
+def api_pitch(m):
     data = request.get_json() or request.form
     try:
         v = float(data.get("pitch") or 0)
     except (TypeError, ValueError):
         return jsonify(ok=False, error="Pitch musi być liczbą"), 400
-    if winder.connected and v > 0:
-        _send_raw(f"pitch {v}")
+    if m.connected and v > 0:
+        m.send(f"pitch {v}")
     return jsonify(ok=True)
 
 
-@app.route("/api/bwidth", methods=["POST"])
-def api_bwidth():
+@machine_route("bwidth", methods=["POST"])
+def api_bwidth(m):
     data = request.get_json() or request.form
     try:
         v = float(data.get("bwidth") or 0)
     except (TypeError, ValueError):
         return jsonify(ok=False, error="Szerokość musi być liczbą"), 400
-    if winder.connected and v > 0:
-        _send_raw(f"bwidth {v}")
+    if m.connected and v > 0:
+        m.send(f"bwidth {v}")
     return jsonify(ok=True)
 
 
 if __name__ == "__main__":
-    import os
     port = int(os.environ.get("PORT", 5000))
     host = "0.0.0.0"  # nasłuch na wszystkich interfejsach (LAN, WiFi)
-    print(f"Serwer nawijarki: http://<adres-RPi>:{port}")
-    app.run(host=host, port=port, debug=False, threaded=True)
+    for mid, dev in MACHINES_ENV:
+        if dev:
+            try:
+                machines[mid].open_port(dev)
+            except serial.SerialException as e:
+                print(f"[{mid}] {dev}: {e}")
+    print(f"Serwer nawijarki: http://<adres-RPi>:{port}  (maszyny: {', '.join(machines)})")
+    try:
+        from waitress import serve   # opcjonalnie: HTTP keep-alive (brama floty trzyma połączenia)
+    except ImportError:
+        app.run(host=host, port=port, debug=False, threaded=True)
+    else:
+        serve(app, host=host, port=port, threads=int(os.environ.get("WINDER_THREADS", 16)))  # klient SSE = wątek
@@ -4,15 +4,55 @@ Serwer WWW nawijarki – **tylko Raspberry Pi, bez Arduino**.
 Sterowanie przez GPIO (silniki + enkoder + krańcówka). Uruchom na RPi.
 """
 import os
-from flask import Flask, request, jsonify
+import threading
+from flask import Flask, Response, request, jsonify
 
+from winder_design import design_args
 from winder_engine_rpi import get_engine
+from winder_events import StatusHub
+from winder_history import HISTORY_DIR, HistoryStore, query_args
+from winder_jobs import QUEUE_DIR, JobQueue, recipe_from, section_plan
+from winder_rate import RateEstimator
 
 app = Flask(__name__)
+hub = StatusHub()
+history = HistoryStore(os.path.join(HISTORY_DIR, "rpi"))
+queue = JobQueue(os.path.join(QUEUE_DIR, "rpi.json"))
+_job_run_seen = [False]   # bieżące zlecenie z kolejki było już w RUN (start idzie przez kolejkę komend)
+_job_goals0 = [None]      # goals_reached silnika przy starcie zlecenia – zmiana = cel osiągnięty
+speed = RateEstimator()   # zmierzone RPM / ETA z enkodera (próbki z wątku historii)
+_speed_lock = threading.Lock()   # add() z wątku historii, fields() z żądań HTTP
+_job_plan = []            # plan sekcji bieżącego zlecenia (do ETA całości)
+STATUS_MAX_AGE = 0.25   # starszy stan (poller uśpiony) – odśwież przy żądaniu
 
 
 def _engine():
-    return get_engine()
+    eng = get_engine()
+    history.start_sampler(_sample)   # silnik nie zgłasza zdarzeń – próbkujemy stan
+    return eng
+
+
+def _sample():
+    """
+    Próbka do historii i pomiaru prędkości + koniec zlecenia z kolejki (PAUSE po osiągnięciu celu).
+    None, dopóki proces silnika nie opublikował pierwszego stanu.
+    """
+    st = get_engine().get_status()
+    if "current_turns" not in st:
+        return None
+    with _speed_lock:
+        speed.add(st["current_turns"] if st["current_turns_real"] is None else st["current_turns_real"])
+    job = queue.current()
+    if job is not None:
+        if st["state"] == "RUN":
+            _job_run_seen[0] = True
+        elif st["current_turns"] >= job["total"] and (
+                _job_run_seen[0] or st.get("goals_reached", _job_goals0[0]) != _job_goals0[0]):
+            queue.finish(jid=job["id"])
+            nxt = queue.next_queued()
+            print(f"[kolejka] #{job['id']} zakończone" + (f" – następne #{nxt['id']} czeka na potwierdzenie" if nxt else ""))
+    return dict(state=st["state"], turns=st["current_turns"], turns_real=st["current_turns_real"],
+                y=st["current_y"], rpm=st["current_rpm"], endstop=st["endstop"])
 
 
 def _html():
@@ -40,22 +80,36 @@ button{margin:4px;padding:8px 12px;border-radius:6px;cursor:pointer;}
 <p>RPM: <input type="number" id="rpm" value="200" min="1"> 
    Skok [mm]: <input type="number" id="pitch" value="0.2" step="0.01"> 
    Szer. [mm]: <input type="number" id="bwidth" value="22" step="0.1"></p>
+<p>Przysp. [RPM/s]: <input type="number" id="accel" value="0" min="0" step="10"> 
+   Profil: <select id="profile"><option value="trap">trapez</option><option value="scurve">S-curve</option></select></p>
 <p>Zwoje (całość): <input type="number" id="total" value="100"> 
    Sekcji: <input type="number" id="sections" value="0"> 
    <label><input type="checkbox" id="autoNext"> Auto następna sekcja</label></p>
+<p>Kolejka: <span id="queue">—</span>
+   <button class="sec" id="btnQueueAdd">+ Do kolejki</button> <button class="run" id="btnQueueNext">NASTĘPNE ZLECENIE</button></p>
 <div id="status">Ładowanie…</div>
 <script>
 const api = path => fetch(path).then(r=>r.json()).catch(()=>null);
 const post = (path, body) => fetch(path, {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(body)}).then(r=>r.json()).catch(()=>null);
-function refreshStatus(){ api('/api/status').then(d=>{ if(!d) return; document.getElementById('status').innerHTML='Stan: '+d.state+' | Zwoje: '+d.current_turns+(d.current_turns_real!=null ? ' (enc: '+d.current_turns_real.toFixed(2)+')' : '')+' | Y: '+(d.current_y!=null ? d.current_y.toFixed(2) : '—')+' mm | RPM: '+(d.current_rpm||'—'); }); }
+const eta = s => s==null ? '—' : (s>=3600 ? Math.floor(s/3600)+':'+String(Math.floor(s%3600/60)).padStart(2,'0') : Math.floor(s/60))+':'+String(s%60).padStart(2,'0');
+function render(d){ document.getElementById('status').innerHTML='Stan: '+d.state+' | Zwoje: '+d.current_turns+(d.current_turns_real!=null ? ' (enc: '+d.current_turns_real.toFixed(2)+')' : '')+' | Y: '+(d.current_y!=null ? d.current_y.toFixed(2) : '—')+' mm | RPM: '+(d.current_rpm||'—')+' (zmierz.: '+(d.measured_rpm!=null ? d.measured_rpm : '—')+')<br>Zwoje/min: '+(d.turns_per_min!=null ? d.turns_per_min : '—')+' | ETA cel: '+eta(d.eta_goal_s)+(d.sections_mode ? ' | sekcja: '+eta(d.eta_section_s) : '')+' | całość: '+eta(d.eta_plan_s); document.getElementById('queue').textContent=(d.queue_current ? '#'+d.queue_current+' w toku, ' : '')+'czeka: '+(d.queue_len||0)+(d.queue_next ? ' (następne #'+d.queue_next+')' : ''); }
+function refreshStatus(){ api('/api/status').then(d=>{ if(d) render(d); }); }
 document.getElementById('btnRun').onclick = ()=>{ post('/api/start', { total: +document.getElementById('total').value, sections: +document.getElementById('sections').value, auto_next: document.getElementById('autoNext').checked }); };
+document.getElementById('btnQueueAdd').onclick = ()=>{ const v=id=>document.getElementById(id).value; post('/api/queue', { total: +v('total'), sections: +v('sections'), auto_next: document.getElementById('autoNext').checked, rpm: v('rpm'), pitch: v('pitch'), bwidth: v('bwidth') }).then(d=>{ if(d && !d.ok) alert(d.error); }); };
+document.getElementById('btnQueueNext').onclick = ()=>{ post('/api/queue/next', {}).then(d=>{ if(d && !d.ok) alert(d.error); }); };
 document.getElementById('btnStop').onclick = ()=>{ post('/api/command', {cmd:'stop'}); };
 document.getElementById('btnResume').onclick = ()=>{ post('/api/command', {cmd:'resume'}); };
 document.getElementById('btnYzero').onclick = ()=>{ post('/api/command', {cmd:'yzero'}); };
 document.getElementById('rpm').onchange = ()=>{ post('/api/rpm', {rpm: document.getElementById('rpm').value}); };
 document.getElementById('pitch').onchange = ()=>{ post('/api/pitch', {pitch: document.getElementById('pitch').value}); };
 document.getElementById('bwidth').onchange = ()=>{ post('/api/bwidth', {bwidth: document.getElementById('bwidth').value}); };
-setInterval(refreshStatus, 1500); refreshStatus();
+const sendAccel = ()=>{ post('/api/accel', {accel: document.getElementById('accel').value, profile: document.getElementById('profile').value}); };
+document.getElementById('accel').onchange = sendAccel; document.getElementById('profile').onchange = sendAccel;
+// Stan na żywo przez /api/events (SSE); odpytywanie co 1.5 s tylko gdy strumień niedostępny
+let poll=null; const st={};
+function startPolling(){ if(!poll){ poll=setInterval(refreshStatus, 1500); refreshStatus(); } }
+function stopPolling(){ if(poll){ clearInterval(poll); poll=null; } }
+if(window.EventSource){ const es=new EventSource('/api/events'); es.addEventListener('status', e=>{ Object.assign(st, JSON.parse(e.data)); render(st); stopPolling(); }); es.onerror=startPolling; } else startPolling();
 </script>
 </body></html>
 """
@@ -66,12 +120,65 @@ def index():
     return _html()
 
 
+def _status_fields():
+    st = _engine().get_status()
+    st.pop("log", None)
+    st.update(queue.summary())
+    if "current_turns" in st:
+        with _speed_lock:
+            st.update(speed.fields(st["current_turns"], st["goal_turns"], _job_plan, st["section_ptr"],
+                                   st["sections_mode"]))
+    return st
+
+
 @app.route("/api/status")
 def api_status():
+    """
+    Stan z huba: silnik odpytywany przez jeden wątek (co 0.1 s, póki ktoś pyta),
+    JSON budowany raz na zmianę – koszt nie zależy od liczby klientów. ETag/304.
+    """
+    hub.start_poller(_status_fields)
     try:
-        return jsonify(_engine().get_status())
+        version, body = hub.status_json(_status_fields, max_age=STATUS_MAX_AGE)
     except Exception as e:
         return jsonify(connected=False, state="IDLE", error=str(e)), 500
+    etag = hub.etag(version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype="application/json", headers=headers)
+
+
+@app.route("/api/events")
+def api_events():
+    """Strumień SSE: różnice stanu silnika (odpytywanego co 0.1 s, tylko gdy ktoś słucha)."""
+    hub.start_poller(_status_fields)
+    return Response(hub.stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/api/history")
+def api_history():
+    """Historia telemetrii z dysku (parametry jak w winder_server.py: from, to, job, points, mode, fields)."""
+    _engine()
+    try:
+        return jsonify(query_args(history, request.args))
+    except ValueError as e:
+        return jsonify(ok=False, error=str(e)), 400
+
+
+@app.route("/api/history/jobs")
+def api_history_jobs():
+    return jsonify(jobs=history.segments())
+
+
+@app.route("/api/design")
+def api_design():
+    """Projekt cewki (winder_design; parametry jak w winder_server.py: h, w, l, wires, packing, turns, rpm, ohm)."""
+    try:
+        return jsonify(design_args(request.args))
+    except ValueError as e:
+        return jsonify(ok=False, error=str(e)), 400
 
 
 @app.route("/api/command", methods=["POST"])
@@ -84,10 +191,7 @@ def api_command():
     if cmd == "run":
         eng.run()
     elif cmd == "resume":
-        if eng.sections_mode and eng.section_ptr < len(eng.section_plan):
-            eng._start_next_section()
-        else:
-            eng.resume()
+        eng.resume_or_next()
     elif cmd == "stop":
         eng.stop()
     elif cmd == "yzero":
@@ -104,25 +208,70 @@ def api_start():
     sections = int(data.get("sections") or 0)
     if total <= 0:
         return jsonify(ok=False, error="Ilość zwojów musi być > 0"), 400
+    queue.finish("aborted")   # ręczny start przerywa zlecenie z kolejki
+    history.new_segment(f"total={total} sections={sections}" if sections > 0 else f"total={total}")
+    _job_plan[:] = section_plan(total, sections)
+    _engine().start_job(total, sections, bool(data.get("auto_next")))
+    return jsonify(ok=True)
+
+
+@app.route("/api/queue", methods=["GET", "POST"])
+def api_queue():
+    """GET: zlecenia; POST: dopisz recepturę (name, total, sections|plan, auto_next, rpm, pitch, bwidth, xrev, ycal)."""
+    if request.method == "GET":
+        return jsonify(dict(queue.as_dict(), **queue.summary()))
+    try:
+        recipe = recipe_from(request.get_json() or {})
+    except ValueError as e:
+        return jsonify(ok=False, error=str(e)), 400
+    job = queue.add(recipe)
+    return jsonify(ok=True, id=job["id"])
+
+
+@app.route("/api/queue/next", methods=["POST"])
+def api_queue_next():
+    """Potwierdzenie operatora: start następnego zlecenia (parametry receptury + cel + start)."""
     eng = _engine()
-    eng.auto_next_section = bool(data.get("auto_next"))
-    eng.sections_mode = False
-    eng.section_plan = []
-    eng.section_ptr = 0
-    eng.last_goal = None
-    if sections > 0:
-        per = total // sections
-        rem = total % sections
-        plan = [per + (1 if i < rem else 0) for i in range(sections)]
-        eng.sections_mode = True
-        eng.section_plan = plan
-        eng.section_ptr = 0
-        eng.last_goal = plan[0]
-        eng.goal(plan[0])
-        eng.run()
-    else:
-        eng.goal(total)
-        eng.run()
+    if eng.get_status()["state"] == "RUN":
+        return jsonify(ok=False, error="Nawijarka pracuje"), 409
+    cur = queue.current()
+    if cur is not None:
+        return jsonify(ok=False, error=f"Zlecenie #{cur['id']} w toku"), 409
+    job = queue.start_next()
+    if job is None:
+        return jsonify(ok=False, error="Kolejka pusta"), 409
+    _job_run_seen[0] = False
+    _job_goals0[0] = eng.get_status().get("goals_reached")
+    setters = {"rpm": eng.set_rpm, "pitch": eng.set_pitch, "bwidth": eng.set_bwidth,
+               "xrev": eng.set_xrev, "ycal": eng.set_ycal}
+    try:
+        for k, fn in setters.items():
+            if job[k] is not None:
+                fn(job[k])
+        history.new_segment(f"#{job['id']} {job['name']} total={job['total']}".strip())
+        _job_plan[:] = job["plan"]
+        eng.start_job(job["total"], len(job["plan"]), job["auto_next"], job["plan"])
+    except (RuntimeError, ValueError) as e:
+        queue.finish("aborted", job["id"])
+        return jsonify(ok=False, error=str(e)), 503
+    return jsonify(ok=True, id=job["id"])
+
+
+@app.route("/api/queue/<jid>", methods=["DELETE"])
+def api_queue_remove(jid):
+    if queue.remove(jid) is None:
+        return jsonify(ok=False, error="Zlecenia nie ma w kolejce"), 404
+    return jsonify(ok=True)
+
+
+@app.route("/api/queue/<jid>/move", methods=["POST"])
+def api_queue_move(jid):
+    try:
+        index = int((request.get_json() or {}).get("index"))
+    except (TypeError, ValueError):
+        return jsonify(ok=False, error="index musi być liczbą"), 400
+    if queue.move(jid, index) is None:
+        return jsonify(ok=False, error="Zlecenia nie ma w kolejce"), 404
     return jsonify(ok=True)
 
 
@@ -161,9 +310,29 @@ def api_bwidth():
     return jsonify(ok=True)
 
 
+@app.route("/api/accel", methods=["POST"])
+def api_accel():
+    data = request.get_json() or request.form
+    try:
+        v = float(data.get("accel") or 0)
+    except (TypeError, ValueError):
+        return jsonify(ok=False, error="Przyspieszenie musi być liczbą"), 400
+    profile = data.get("profile") or None
+    try:
+        _engine().set_accel(v, profile)
+    except ValueError as e:
+        return jsonify(ok=False, error=str(e)), 400
+    return jsonify(ok=True)
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     host = "0.0.0.0"
     print("Nawijarka – RPi GPIO (bez Arduino)")
     print(f"Serwer: http://<adres-RPi>:{port}")
-    app.run(host=host, port=port, debug=False, threaded=True)
+    try:
+        from waitress import serve   # opcjonalnie: HTTP keep-alive (brama floty trzyma połączenia)
+    except ImportError:
+        app.run(host=host, port=port, debug=False, threaded=True)
+    else:
+        serve(app, host=host, port=port, threads=int(os.environ.get("WINDER_THREADS", 16)))  # klient SSE = wątek
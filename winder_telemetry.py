@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Parser linii telemetrii z firmware nawijarki (5.ino) – wspólny dla GUI
+(winder4.py) i serwera WWW (winder_server.py).
+
+Jedno przejście po linii zamiast kilku re.search na każdą linię:
+
+- linia stanu  "[state=RUN, rpm=200, X_turns=12, X_turns_real=11.944, x_steps=320,
+                 D11=0, ENDSTOP_Y=0, Y=1.250]"  → split po ", " i "=",
+- "[goal] reached", "RPM=200"                   → szybkie ścieżki bez tokenizacji,
+- linia kalibracji "pitch=0.2000 mm | X_steps/rev=6400 | ... | eff_w=21.850 mm | ..."
+                                                → split po " | ",
+- pozostałe linie z "=" → jeden regex (findall) po parach klucz=wartość
+  (zgodność ze starszymi firmware, np. "turns=", "Y_HOME=").
+
+parse_line() zwraca Telemetry (namedtuple); pola, których linia nie zawiera, są None.
+is_ready_line() – czy linia świadczy, że firmware już działa (baner po resecie
+albo linia stanu) – na tym kończy się łączenie zamiast stałego sleep(2).
+"""
+import re
+from collections import namedtuple
+
+Telemetry = namedtuple("Telemetry", (
+    "kind",          # "status" | "goal" | "rpm" | "calib" | "kv" | "text"
+    "state", "rpm", "turns", "turns_real", "x_steps", "endstop", "y",
+    "pitch", "eff_w", "goal_reached",
+), defaults=(None,) * 10)
+
+GOAL_REACHED = Telemetry("goal", goal_reached=True)
+_TEXT = Telemetry("text")
+
+BANNER_PREFIX = "UNO+CNC DDA"   # "UNO+CNC DDA. Użyj: ..." po resecie płytki
+
+_KV = re.compile(r"([A-Za-z_][\w/]*)=([-+\w.]+)")
+
+# klucz firmware → (pole Telemetry, konwersja)
+_FIELDS = {
+    "state": ("state", str),
+    "rpm": ("rpm", int),
+    "X_turns": ("turns", int),
+    "turns": ("turns", int),
+    "X_turns_real": ("turns_real", float),
+    "x_steps": ("x_steps", int),
+    "ENDSTOP_Y": ("endstop", int),
+    "Y_HOME": ("endstop", int),
+    "Y": ("y", float),
+    "pitch": ("pitch", float),
+    "eff_w": ("eff_w", float),
+}
+# ten sam słownik, ale z indeksem pola w krotce – szybka ścieżka linii stanu
+_SLOTS = {key: (Telemetry._fields.index(name), conv) for key, (name, conv) in _FIELDS.items()}
+_N = len(Telemetry._fields)
+
+
+def _record(kind, pairs):
+    """Telemetry z par (klucz, tekst wartości); błędne wartości pomijane."""
+    vals = [None] * _N
+    vals[0] = kind
+    found = False
+    slots = _SLOTS
+    for key, raw in pairs:
+        spec = slots.get(key)
+        if spec is None:
+            if key.lower() != "rpm":
+                continue
+            spec = slots["rpm"]  # "RPM=", "Rpm=" – jak (?i)rpm= w starych parserach
+        try:
+            vals[spec[0]] = spec[1](raw)
+            found = True
+        except ValueError:
+            pass
+    return Telemetry._make(vals) if found or kind != "kv" else _TEXT
+
+
+def is_ready_line(line):
+    return line.startswith(BANNER_PREFIX) or line.startswith("[state=")
+
+
+def parse_line(line):
+    """Rozbierz jedną linię z firmware na Telemetry."""
+    if line.startswith("[state=") and line.endswith("]"):
+        vals = [None] * _N
+        vals[0] = "status"
+        slots = _SLOTS
+        for tok in line[1:-1].split(", "):
+            key, _, raw = tok.partition("=")
+            spec = slots.get(key)
+            if spec is not None:
+                try:
+                    vals[spec[0]] = spec[1](raw)
+                except ValueError:
+                    pass
+        return Telemetry._make(vals)
+    if line.startswith("[goal] reached"):
+        return GOAL_REACHED
+    if line.startswith("RPM="):
+        try:
+            return Telemetry("rpm", rpm=int(line[4:]))
+        except ValueError:
+            pass
+    elif line.startswith("pitch=") and " | " in line:
+        pairs = []
+        for tok in line.split(" | "):
+            key, _, raw = tok.partition("=")
+            pairs.append((key, raw.split(" ", 1)[0]))  # "0.2000 mm" → "0.2000"
+        return _record("calib", pairs)
+    if "=" not in line:
+        return _TEXT
+    return _record("kv", _KV.findall(line))
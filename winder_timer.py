@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Precyzyjne czekanie dla pętli kroków: sleep na grubo + aktywne czekanie na końcu.
+
+time.sleep() w Linuksie zasypia co najmniej kilkadziesiąt µs dłużej niż
+zadano, więc sam sleep(2e-6) na impuls kroku ogranicza prędkość, a sleep do
+terminu kroku go przestrzela. HybridTimer:
+
+- wait_until_ns(t) – śpi do (t - zapas), resztę dokręca pętlą na perf_counter_ns,
+- delay_ns(ns)     – tylko aktywne czekanie (szerokość impulsu STEP),
+- calibrate()      – mierzy przestrzał sleep() i koszt jednego obrotu pętli
+                     czekania; zapas = p99 przestrzału + margines.
+
+Statystyki (TimerStats): błąd dotrzymania terminu i faktyczna szerokość
+impulsu – silnik pokazuje je w get_status()["timer"].
+"""
+import time
+
+SLEEP_PROBE_NS = 100_000        # sleep używany do kalibracji przestrzału (100 µs)
+CALIBRATE_SAMPLES = 200
+SPIN_MARGIN_NS = 20_000         # zapas aktywnego czekania ponad zmierzony przestrzał
+DEFAULT_OVERSHOOT_NS = 100_000  # przed kalibracją – bezpieczna wartość dla RPi
+
+
+class TimerStats:
+    """Sumy i maksima (liczby całkowite w ns) – bez alokacji list w pętli."""
+
+    __slots__ = ("waits", "err_sum_ns", "err_max_ns", "late_waits",
+                 "pulses", "pulse_sum_ns", "pulse_max_ns", "pulse_min_ns")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.waits = 0
+        self.err_sum_ns = 0
+        self.err_max_ns = 0
+        self.late_waits = 0         # wywołanie już po terminie (pętla nie nadąża)
+        self.pulses = 0
+        self.pulse_sum_ns = 0
+        self.pulse_max_ns = 0
+        self.pulse_min_ns = 0
+
+    def as_dict(self):
+        return {
+            "waits": self.waits,
+            "late_waits": self.late_waits,
+            "err_mean_us": round(self.err_sum_ns / self.waits / 1000, 3) if self.waits else None,
+            "err_max_us": round(self.err_max_ns / 1000, 3),
+            "pulses": self.pulses,
+            "pulse_mean_us": round(self.pulse_sum_ns / self.pulses / 1000, 3) if self.pulses else None,
+            "pulse_min_us": round(self.pulse_min_ns / 1000, 3),
+            "pulse_max_us": round(self.pulse_max_ns / 1000, 3),
+        }
+
+
+class HybridTimer:
+    def __init__(self, clock_ns=time.perf_counter_ns):
+        self.clock_ns = clock_ns
+        self.sleep_overshoot_ns = DEFAULT_OVERSHOOT_NS
+        self.spin_overhead_ns = 0
+        self.spin_threshold_ns = DEFAULT_OVERSHOOT_NS + SPIN_MARGIN_NS
+        self.calibrated = False
+        self.stats = TimerStats()
+
+    def calibrate(self, samples=CALIBRATE_SAMPLES):
+        """Zmierz przestrzał sleep() i koszt obrotu pętli czekania (woła wątek pętli kroków)."""
+        clock_ns = self.clock_ns
+        over = []
+        for _ in range(samples):
+            t = clock_ns()
+            time.sleep(SLEEP_PROBE_NS * 1e-9)
+            over.append(clock_ns() - t - SLEEP_PROBE_NS)
+        over.sort()
+        self.sleep_overshoot_ns = max(0, over[min(len(over) - 1, int(len(over) * 0.99))])
+
+        gaps = []
+        for _ in range(samples):
+            t = clock_ns()
+            gaps.append(clock_ns() - t)
+        gaps.sort()
+        self.spin_overhead_ns = gaps[len(gaps) // 2]
+
+        self.spin_threshold_ns = self.sleep_overshoot_ns + SPIN_MARGIN_NS
+        self.calibrated = True
+        self.stats.reset()
+        return self.calibration()
+
+    def calibration(self):
+        return {
+            "calibrated": self.calibrated,
+            "sleep_overshoot_us": round(self.sleep_overshoot_ns / 1000, 3),
+            "spin_overhead_ns": self.spin_overhead_ns,
+            "spin_threshold_us": round(self.spin_threshold_ns / 1000, 3),
+        }
+
+    def wait_until_ns(self, deadline_ns):
+        """Czekaj do deadline_ns (skala clock_ns): sleep na grubo, końcówka aktywnie."""
+        clock_ns = self.clock_ns
+        now = clock_ns()
+        st = self.stats
+        st.waits += 1
+        if now >= deadline_ns:
+            st.late_waits += 1
+            err = now - deadline_ns
+        else:
+            rest = deadline_ns - now
+            if rest > self.spin_threshold_ns:
+                time.sleep((rest - self.sleep_overshoot_ns - SPIN_MARGIN_NS) * 1e-9)
+            now = clock_ns()
+            while now < deadline_ns:
+                now = clock_ns()
+            err = now - deadline_ns
+        st.err_sum_ns += err
+        if err > st.err_max_ns:
+            st.err_max_ns = err
+
+    def delay_ns(self, ns):
+        """Krótkie opóźnienie (impuls STEP) – wyłącznie aktywne czekanie."""
+        clock_ns = self.clock_ns
+        t = clock_ns()
+        end = t + ns
+        now = t
+        while now < end:
+            now = clock_ns()
+        width = now - t
+        st = self.stats
+        if st.pulses == 0 or width < st.pulse_min_ns:
+            st.pulse_min_ns = width
+        st.pulses += 1
+        st.pulse_sum_ns += width
+        if width > st.pulse_max_ns:
+            st.pulse_max_ns = width
+
+    def report(self):
+        out = self.calibration()
+        out.update(self.stats.as_dict())
+        return out
+
+
+_timer = None
+
+
+def get_timer():
+    """Wspólny timer procesu (kalibracja raz, statystyki dla wszystkich backendów)."""
+    global _timer
+    if _timer is None:
+        _timer = HybridTimer()
+    return _timer
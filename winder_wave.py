@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Prekompilowany przebieg kroków (tryb "wave") dla WinderEngineRPi.
+
+Zamiast impulsu GPIO z Pythona dla każdego kroku, silnik kompiluje
+najbliższy fragment ruchu (kilkanaście ms) do tablic zdarzeń:
+
+    t_ns[i]  – czas zdarzenia od początku fragmentu [ns]
+    ops[i]   – maska: młodszy bajt = bity ustawiane na HIGH,
+               starszy bajt = bity ustawiane na LOW
+
+Bity (WAVE_*) odpowiadają pinom X_STEP, X_DIR, Y_STEP, Y_DIR – mapowanie na
+numery pinów robi backend (play_waveform). Dzięki temu Python planuje
+fragmenty, a nie pojedyncze impulsy; backend pigpio wysyła je przez DMA.
+"""
+from array import array
+
+WAVE_X_STEP = 1
+WAVE_X_DIR = 2
+WAVE_Y_STEP = 4
+WAVE_Y_DIR = 8
+
+WAVE_CHUNK_SEC = 0.02      # długość jednego fragmentu ruchu
+DIR_SETUP_NS = 1000        # DIR przed STEP (A4988/DRV8825 wymagają ≥200–650 ns)
+
+
+class WaveState:
+    """Stan ruchu przenoszony między fragmentami (jak zmienne w pętli firmware)."""
+
+    __slots__ = ("x_steps_mod", "turns", "y_acc", "y_dir", "y_pos", "x_dir_level", "y_dir_level")
+
+    def __init__(self, x_steps_mod=0, turns=0, y_acc=0, y_dir=1, y_pos=0):
+        self.x_steps_mod = x_steps_mod
+        self.turns = turns
+        self.y_acc = y_acc
+        self.y_dir = y_dir
+        self.y_pos = y_pos
+        self.x_dir_level = None   # ostatnio wysłany poziom DIR (None = nieznany)
+        self.y_dir_level = None
+
+
+class WaveChunk:
+    """Skompilowany fragment: tablice zdarzeń + wynik (ile kroków, czy cel)."""
+
+    __slots__ = ("t_ns", "ops", "duration_ns", "x_steps", "y_steps", "goal_reached")
+
+    def __init__(self):
+        self.t_ns = array("q")
+        self.ops = array("H")
+        self.duration_ns = 0
+        self.x_steps = 0
+        self.y_steps = 0
+        self.goal_reached = False
+
+    def clear(self):
+        del self.t_ns[:]
+        del self.ops[:]
+        self.duration_ns = 0
+        self.x_steps = 0
+        self.y_steps = 0
+        self.goal_reached = False
+
+
+def compile_chunk(chunk, st, n_steps, interval_ns, pulse_ns, x_steps_per_rev, x_dir_sign,
+                  dda_num, dda_den, y_limit, goal_turns, ramp=None):
+    """
+    Wypełnij chunk zdarzeniami dla maks. n_steps kroków X (całkowite DDA X→Y:
+    akumulator += dda_num, krok Y co dda_den; odbicie warstwy przy y_limit
+    krokach), aktualizując st. Kończy wcześniej na kroku, który osiąga goal_turns.
+    ramp (winder_ramp.RampPlanner) – odstępy z tablicy rampy zamiast interval_ns,
+    gdy trwa rozpędzanie/zwalnianie albo cel wypada w zasięgu hamowania.
+    """
+    chunk.clear()
+    t_ns = chunk.t_ns
+    ops = chunk.ops
+    add_t = t_ns.append
+    add_op = ops.append
+
+    x_lvl = 1 if x_dir_sign > 0 else 0
+    if st.x_dir_level != x_lvl:
+        add_t(0)
+        add_op(WAVE_X_DIR if x_lvl else WAVE_X_DIR << 8)
+        st.x_dir_level = x_lvl
+        base = DIR_SETUP_NS
+    else:
+        base = 0
+
+    x_mod = st.x_steps_mod
+    turns = st.turns
+    y_acc = st.y_acc
+    y_dir = st.y_dir
+    y_pos = st.y_pos
+    y_dir_level = st.y_dir_level
+    y_steps = 0
+    x_done = 0
+    goal = goal_turns if goal_turns > 0 else 0
+    x_high = WAVE_X_STEP
+    x_low = WAVE_X_STEP << 8
+
+    if ramp is not None and ramp.cruising:
+        rem0 = (goal - turns) * x_steps_per_rev - x_mod if goal else None
+        if rem0 is None or rem0 - n_steps > ramp.i:
+            ramp = None   # cały fragment w prędkości przelotowej
+
+    t = base
+    max_ns = base + n_steps * interval_ns   # na rampie fragment ograniczony czasem, nie liczbą kroków
+    for k in range(n_steps):
+        if ramp is not None:
+            rem = (goal - turns) * x_steps_per_rev - x_mod if goal else None
+            iv = int(ramp.next_interval(rem) * 1e9)
+        else:
+            iv = interval_ns
+        add_t(t)
+        add_op(x_high)
+        add_t(t + pulse_ns)
+        add_op(x_low)
+        x_done += 1
+
+        x_mod += 1
+        if x_mod >= x_steps_per_rev:
+            x_mod -= x_steps_per_rev
+            turns += 1
+            if goal and turns >= goal:
+                chunk.goal_reached = True
+                t += iv
+                break
+
+        y_acc += dda_num
+        ty = t + 2 * pulse_ns
+        while y_acc >= dda_den:
+            y_acc -= dda_den
+            if y_dir > 0 and y_pos >= y_limit:
+                y_dir = -1
+            elif y_dir < 0 and y_pos <= 0:
+                y_dir = 1
+            lvl = 1 if y_dir > 0 else 0
+            if lvl != y_dir_level:
+                add_t(ty)
+                add_op(WAVE_Y_DIR if lvl else WAVE_Y_DIR << 8)
+                y_dir_level = lvl
+                ty += DIR_SETUP_NS
+            add_t(ty)
+            add_op(WAVE_Y_STEP)
+            add_t(ty + pulse_ns)
+            add_op(WAVE_Y_STEP << 8)
+            ty += 2 * pulse_ns
+            y_pos += y_dir
+            y_steps += 1
+        t += iv
+        if ramp is not None and t >= max_ns:
+            break
+
+    st.x_steps_mod = x_mod
+    st.turns = turns
+    st.y_acc = y_acc
+    st.y_dir = y_dir
+    st.y_pos = y_pos
+    st.y_dir_level = y_dir_level
+    chunk.x_steps = x_done
+    chunk.y_steps = y_steps
+    chunk.duration_ns = t
+    return chunk
+
+
+def op_writes(op, pins):
+    """Rozpisz maskę op na listę (pin, poziom) dla pinów (X_STEP, X_DIR, Y_STEP, Y_DIR)."""
+    writes = []
+    for bit, pin in enumerate(pins):
+        if op & (1 << bit):
+            writes.append((pin, 1))
+        elif op & (1 << (bit + 8)):
+            writes.append((pin, 0))
+    return tuple(writes)